@@ -1,11 +1,16 @@
 """
 This is a module for analyzing joint angles during the gait cycle
 
-Implemented based on the data from LESS (Padua et al.) (2009) Kinematics Tables
+Implemented based on the data from LESS (Padua et al.) (2009) Kinematics Tables,
+which are read from the scoring config (config/scoring.json)
 """
 
 import math
-from typing import List, Tuple, Dict
+from typing import List, Optional, Sequence, Tuple, Dict
+
+import numpy as np
+
+import config
 
 
 def calculate_mean_std(values: List[float]) -> Tuple[float, float]:
@@ -31,6 +36,23 @@ def get_category(zscore: float) -> str:
     else:
         return "Poor"
 
+# Category names indexed by the integer codes of get_category_codes
+CATEGORY_NAMES = ["Excellent", "Good", "Moderate", "Poor"]
+POOR = CATEGORY_NAMES.index("Poor")
+# Upper z-score bounds of Poor, Moderate and Good, as in get_category
+_ZSCORE_EDGES = np.array([-1.5, -0.5, 0.5])
+
+def get_category_codes(zscores: np.ndarray) -> np.ndarray:
+    """Vectorized get_category, returning integer codes into CATEGORY_NAMES."""
+    zscores = np.asarray(zscores)
+    codes = len(_ZSCORE_EDGES) - np.searchsorted(_ZSCORE_EDGES, zscores, side='left')
+    # get_category puts NaN in the final else branch
+    return np.where(np.isnan(zscores), POOR, codes).astype(np.int8)
+
+def category_names(codes: np.ndarray) -> np.ndarray:
+    """Map integer category codes to their names."""
+    return np.array(CATEGORY_NAMES)[codes]
+
 class AngleDistribution:
     def __init__(self, excellent: float, good: float, moderate: float, poor: float):
         self.values = [excellent, good, moderate, poor]
@@ -41,48 +63,6 @@ class AngleDistribution:
         category = get_category(zscore)
         return {"zscore": zscore, "category": category}
 
-# Initial Contact Angles
-left_knee_flexion_ic = AngleDistribution(18.28, 16.61, 16.32, 15.87)
-right_knee_flexion_ic = AngleDistribution(18.28, 16.61, 16.32, 15.87)
-left_knee_valgus_ic = AngleDistribution(1.67, 0.62, 0.28, -0.15)
-right_knee_valgus_ic = AngleDistribution(1.67, 0.62, 0.28, -0.15)
-left_tibial_rotation_ic = AngleDistribution(-1.61, -0.99, -0.64, 0.35)
-right_tibial_rotation_ic = AngleDistribution(-1.61, -0.99, -0.64, 0.35)
-left_hip_flexion_ic = AngleDistribution(-31.17, -28.92, -28.15, -26.64)
-right_hip_flexion_ic = AngleDistribution(-31.17, -28.92, -28.15, -26.64)
-left_hip_adduction_ic = AngleDistribution(-11.10, -10.39, -9.88, -10.12)
-right_hip_adduction_ic = AngleDistribution(-11.10, -10.39, -9.88, -10.12)
-left_hip_rotation_ic = AngleDistribution(-4.20, -4.69, -4.00, -4.12)
-right_hip_rotation_ic = AngleDistribution(-4.20, -4.69, -4.00, -4.12)
-
-# Peak Angles Over Stance
-left_knee_flexion_peak = AngleDistribution(89.68, 81.31, 77.77, 71.38)
-right_knee_flexion_peak = AngleDistribution(89.68, 81.31, 77.77, 71.38)
-left_knee_valgus_peak = AngleDistribution(-11.02, -12.29, -12.81, -14.27)
-right_knee_valgus_peak = AngleDistribution(-11.02, -12.29, -12.81, -14.27)
-left_tibial_rotation_peak = AngleDistribution(15.89, 15.28, 14.86, 14.69)
-right_tibial_rotation_peak = AngleDistribution(15.89, 15.28, 14.86, 14.69)
-left_hip_flexion_peak = AngleDistribution(-80.57, -68.7, -62.63, -53.03)
-right_hip_flexion_peak = AngleDistribution(-80.57, -68.7, -62.63, -53.03)
-left_hip_adduction_peak = AngleDistribution(0.69, 1.16, 1.70, 1.65)
-right_hip_adduction_peak = AngleDistribution(0.69, 1.16, 1.70, 1.65)
-left_hip_rotation_peak = AngleDistribution(6.45, 4.16, 4.36, 3.71)
-right_hip_rotation_peak = AngleDistribution(6.45, 4.16, 4.36, 3.71)
-
-# Displacement Over Stance
-left_knee_flexion_disp = AngleDistribution(71.39, 64.70, 61.44, 55.52)
-right_knee_flexion_disp = AngleDistribution(71.39, 64.70, 61.44, 55.52)
-left_knee_valgus_disp = AngleDistribution(-12.69, -12.87, -13.07, -14.16)
-right_knee_valgus_disp = AngleDistribution(-12.69, -12.87, -13.07, -14.16)
-left_tibial_rotation_disp = AngleDistribution(17.45, 16.29, 15.50, 14.38)
-right_tibial_rotation_disp = AngleDistribution(17.45, 16.29, 15.50, 14.38)
-left_hip_flexion_disp = AngleDistribution(-49.35, -39.86, -34.48, -26.50)
-right_hip_flexion_disp = AngleDistribution(-49.35, -39.86, -34.48, -26.50)
-left_hip_adduction_disp = AngleDistribution(11.81, 11.56, 11.58, 11.82)
-right_hip_adduction_disp = AngleDistribution(11.81, 11.56, 11.58, 11.82)
-left_hip_rotation_disp = AngleDistribution(10.64, 9.04, 8.37, 7.93)
-right_hip_rotation_disp = AngleDistribution(10.64, 9.04, 8.37, 7.93)
-
 def analyze_angle(angle: float, distribution: AngleDistribution) -> Dict[str, float]:
     """
     Analyze an angle measurement using the provided distribution.
@@ -93,60 +73,56 @@ def analyze_angle(angle: float, distribution: AngleDistribution) -> Dict[str, fl
     """
     return distribution.get_zscore_and_category(angle)
 
-# Dictionary to store all distributions
-angle_distributions = {
-    "Initial Contact": {
-        "Left Knee Flexion": left_knee_flexion_ic,
-        "Right Knee Flexion": right_knee_flexion_ic,
-        "Left Knee Valgus": left_knee_valgus_ic,
-        "Right Knee Valgus": right_knee_valgus_ic,
-        "Left Tibial Rotation": left_tibial_rotation_ic,
-        "Right Tibial Rotation": right_tibial_rotation_ic,
-        "Left Hip Flexion": left_hip_flexion_ic,
-        "Right Hip Flexion": right_hip_flexion_ic,
-        "Left Hip Adduction": left_hip_adduction_ic,
-        "Right Hip Adduction": right_hip_adduction_ic,
-        "Left Hip Rotation": left_hip_rotation_ic,
-        "Right Hip Rotation": right_hip_rotation_ic
-    },
-    "Peak Angle": {
-        "Left Knee Flexion": left_knee_flexion_peak,
-        "Right Knee Flexion": right_knee_flexion_peak,
-        "Left Knee Valgus": left_knee_valgus_peak,
-        "Right Knee Valgus": right_knee_valgus_peak,
-        "Left Tibial Rotation": left_tibial_rotation_peak,
-        "Right Tibial Rotation": right_tibial_rotation_peak,
-        "Left Hip Flexion": left_hip_flexion_peak,
-        "Right Hip Flexion": right_hip_flexion_peak,
-        "Left Hip Adduction": left_hip_adduction_peak,
-        "Right Hip Adduction": right_hip_adduction_peak,
-        "Left Hip Rotation": left_hip_rotation_peak,
-        "Right Hip Rotation": right_hip_rotation_peak
-    },
-    "Displacement": {
-        "Left Knee Flexion": left_knee_flexion_disp,
-        "Right Knee Flexion": right_knee_flexion_disp,
-        "Left Knee Valgus": left_knee_valgus_disp,
-        "Right Knee Valgus": right_knee_valgus_disp,
-        "Left Tibial Rotation": left_tibial_rotation_disp,
-        "Right Tibial Rotation": right_tibial_rotation_disp,
-        "Left Hip Flexion": left_hip_flexion_disp,
-        "Right Hip Flexion": right_hip_flexion_disp,
-        "Left Hip Adduction": left_hip_adduction_disp,
-        "Right Hip Adduction": right_hip_adduction_disp,
-        "Left Hip Rotation": left_hip_rotation_disp,
-        "Right Hip Rotation": right_hip_rotation_disp
-    }
-}
-
-def analyze_all_angles(angles: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, Dict[str, float]]]:
-    """Analyze all provided angles and return results."""
+class DistributionTable:
+    """Means and standard deviations of a set of distributions as (phase, measurement) arrays."""
+
+    def __init__(self, phases: Sequence[str], measurements: Sequence[str], means: np.ndarray, std_devs: np.ndarray):
+        self.phases = list(phases)
+        self.measurements = list(measurements)
+        self.means = np.ascontiguousarray(means, dtype=float)
+        self.std_devs = np.ascontiguousarray(std_devs, dtype=float)
+        self._phase_index = {phase: i for i, phase in enumerate(self.phases)}
+        self._measurement_index = {measurement: i for i, measurement in enumerate(self.measurements)}
+
+    def columns(self, measurements: Sequence[str]) -> np.ndarray:
+        """Column indices of the given measurement names."""
+        return np.array([self._measurement_index[measurement] for measurement in measurements])
+
+    def score(self, angles: np.ndarray, phase: Optional[str] = None, measurements: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Z-scores and category codes of a whole angle matrix in one call.
+        Parameters:
+        angles (np.ndarray): (..., n_measurements) angles, e.g. (n_frames, n_joints), scored against `phase`;
+        or (..., n_phases, n_measurements) with phases in table order when no phase is given.
+        phase (str): Phase whose distributions to use, or None for all phases.
+        measurements (list): Names of the angle columns; defaults to all measurements in table order.
+        Returns:
+        tuple: (zscores, codes) arrays shaped like `angles`; codes index CATEGORY_NAMES.
+        """
+        rows = slice(None) if phase is None else self._phase_index[phase]
+        columns = slice(None) if measurements is None else self.columns(measurements)
+        means = self.means[rows][..., columns]
+        std_devs = self.std_devs[rows][..., columns]
+        zscores = (np.asarray(angles, dtype=float) - means) / std_devs
+        return zscores, get_category_codes(zscores)
+
+def __getattr__(name: str):
+    # angle_distributions and distribution_table follow the scoring config, reloads included
+    if name in ("angle_distributions", "distribution_table"):
+        return getattr(config.current(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def analyze_all_angles(angles: Dict[str, Dict[str, float]], tables: Optional["config.ScoringTables"] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Analyze all provided angles and return results, against `tables` or the current scoring config."""
+    distribution_table = (tables or config.current()).distribution_table
     results = {}
     for phase, measurements in angles.items():
-        results[phase] = {}
-        for measurement, angle in measurements.items():
-            distribution = angle_distributions[phase][measurement]
-            results[phase][measurement] = analyze_angle(angle, distribution)
+        names = list(measurements)
+        zscores, codes = distribution_table.score(np.array([measurements[name] for name in names]), phase, names)
+        results[phase] = {
+            name: {"zscore": zscore, "category": CATEGORY_NAMES[code]}
+            for name, zscore, code in zip(names, zscores.tolist(), codes.tolist())
+        }
     return results
 
 if __name__ == "__main__":
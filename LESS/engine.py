@@ -0,0 +1,280 @@
+"""
+Automated LESS scoring of a whole trial from its landmark time series.
+
+derive_inputs() measures everything the 17 LESS items need from the (n_frames, 33, 3)
+landmarks of one trial. It works in one vectorized pass over the frames from initial
+contact to maximum knee flexion. Joint and trunk angles are taken in a body frame built
+from the hips, so they do not depend on where the camera stands. score_items() applies
+the rules of the item functions in LESS/__init__.py to the measurements of any number of
+trials at once; an item whose measurements could not be taken is UNSCORED_ITEM rather than
+a score. Given a frontal view as well, the frontal-plane measurements come from it
+and the sagittal ones from the main view's image plane.
+
+Angles are in degrees, flexion and internal rotation positive. Widths are in the units of
+the landmark x coordinate.
+"""
+
+import numpy as np
+
+import LESS
+from tools import (LEFT_ANKLE, LEFT_FOOT_INDEX, LEFT_HEEL, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, RIGHT_ANKLE,
+                   RIGHT_FOOT_INDEX, RIGHT_HEEL, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, calculate_pose_angles_batch)
+from tools.events import detect_initial_contact, detect_landing_events
+
+# Item order of score_items, the LESS item functions
+ITEM_NAMES = [
+    'knee_flexion_angle_at_initial_contact', 'hip_flexion_angle_at_initial_contact',
+    'trunk_flexion_angle_at_initial_contact', 'ankle_plantar_flexion_angle_at_initial_contact',
+    'knee_valgus_angle_at_initial_contact', 'lateral_trunk_flexion_angle_at_initial_contact',
+    'stance_width_wide', 'stance_width_narrow', 'foot_position_toe_in', 'foot_position_toe_out',
+    'symmetric_initial_foot_contact', 'knee_flexion_displacement', 'hip_flexion_at_max_knee_flexion',
+    'trunk_flexion_at_max_knee_flexion', 'knee_valgus_displacement', 'joint_displacement', 'overall_impression',
+]
+# Measurements of derive_inputs each item is scored on, in ITEM_NAMES order
+ITEM_INPUTS = [
+    ('knee_flexion_ic',), ('hip_flexion_ic',), ('trunk_flexion_ic',), ('foot_pitch_ic',), ('knee_valgus_ic',),
+    ('lateral_trunk_flexion_ic',), ('stance_width', 'shoulder_width'), ('stance_width', 'shoulder_width'),
+    ('max_foot_rotation',), ('min_foot_rotation',), ('contact_asymmetry',), ('knee_flexion_displacement',),
+    ('hip_flexion_displacement',), ('trunk_flexion_displacement',), ('max_knee_valgus',),
+    ('knee_flexion_displacement', 'hip_flexion_displacement'),
+    ('knee_flexion_displacement', 'hip_flexion_displacement', 'knee_valgus_ic', 'max_knee_valgus'),
+]
+# Item score of an item with a NaN measurement, e.g. the contact asymmetry when one foot's contact is not found
+UNSCORED_ITEM = -1
+
+# Toe below the heel by more than this at initial contact counts as a toe-to-heel landing
+TOE_FIRST_PITCH = 10
+# Sideways trunk lean at initial contact that counts as lateral trunk flexion
+LATERAL_TRUNK_FLEXION = 10
+# Time between the contacts of the two feet that still counts as symmetric, in seconds
+CONTACT_SYMMETRY_SECONDS = 0.02
+# Knee plus hip flexion displacement from initial contact to maximum knee flexion of a soft landing
+# and, below the second, a stiff one; between the L1/L2 and the L3/L4 means of Padua et al. (2009)
+SOFT_DISPLACEMENT = 110
+STIFF_DISPLACEMENT = 90
+# Measurements taken from the frontal view when there is one
+FRONTAL_MEASUREMENTS = {'knee_valgus', 'lateral_trunk_flexion', 'stance_width', 'shoulder_width', 'foot_rotation'}
+
+_UP = np.array([0.0, -1.0, 0.0])
+_SIDES = {
+    'shoulder': [LEFT_SHOULDER, RIGHT_SHOULDER], 'hip': [LEFT_HIP, RIGHT_HIP], 'knee': [LEFT_KNEE, RIGHT_KNEE],
+    'ankle': [LEFT_ANKLE, RIGHT_ANKLE], 'heel': [LEFT_HEEL, RIGHT_HEEL], 'toe': [LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX],
+}
+
+
+def _unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def _dot(a, b):
+    return np.einsum('...i,...i->...', a, b)
+
+
+def _angle(y, x):
+    return np.degrees(np.arctan2(y, x))
+
+
+def _at_frames(landmarks, frames):
+    """Landmarks of `frames`, linearly interpolated between the nearest detected frames where there is no detection."""
+    detected = np.flatnonzero(~np.isnan(landmarks[:, 0, 0]))
+    if len(detected) == 1:
+        return landmarks[np.full(len(frames), detected[0])]
+    position = np.clip(np.searchsorted(detected, frames), 1, len(detected) - 1)
+    before, after = detected[position - 1], detected[position]
+    weight = np.clip((frames - before) / (after - before), 0, 1)
+    return landmarks[before] + weight[:, None, None] * (landmarks[after] - landmarks[before])
+
+
+def _measure(points, view=None):
+    """
+    Per-frame measurements of landmarks in a body frame.
+    Parameters:
+    points (np.ndarray): (n_frames, 33, 3) landmarks with y scaled to the units of x.
+    view (str): 'frontal' or 'sagittal' to take the camera's image plane as that body plane; None for any view.
+        Sagittal view points are expected without depth.
+    Returns:
+    dict: Name to an (n_frames,) array, or (n_frames, 2) with the left side first.
+    """
+    joint = {name: points[:, indices] for name, indices in _SIDES.items()}
+    # Towards the left hip, horizontal, and forward, turned to where the toes point
+    left = joint['hip'][:, 0] - joint['hip'][:, 1]
+    left[:, 1] = 0
+    if view == 'frontal':
+        left[:, 2] = 0
+    elif view == 'sagittal':
+        left[:] = (0, 0, 1)
+    left = _unit(left)
+    forward = np.cross(left, _UP)
+    foot = joint['toe'] - joint['heel']
+    if np.nansum(_dot(foot, forward[:, None])) < 0:
+        forward = -forward
+    # The medial direction of each leg, (n_frames, 2, 3)
+    medial = np.stack([-left, left], axis=1)
+    forward_2, up_2 = forward[:, None], _UP
+
+    trunk = joint['shoulder'].mean(axis=1) - joint['hip'].mean(axis=1)
+    thigh = joint['knee'] - joint['hip']
+    shank = joint['ankle'] - joint['knee']
+    # Segment angles from the vertical, forward and medial positive; thigh and shank point down
+    trunk_sagittal = _angle(_dot(trunk, forward), _dot(trunk, _UP))
+    thigh_sagittal = _angle(_dot(thigh, forward_2), -_dot(thigh, up_2))
+    shank_sagittal = _angle(_dot(shank, forward_2), -_dot(shank, up_2))
+    thigh_frontal = _angle(_dot(thigh, medial), -_dot(thigh, up_2))
+    shank_frontal = _angle(_dot(shank, medial), -_dot(shank, up_2))
+
+    foot_forward = _dot(foot, forward_2)
+    foot_medial = _dot(foot, medial)
+    feet_left = np.concatenate([_dot(joint['heel'], left[:, None]), _dot(joint['toe'], left[:, None])], axis=1)
+    return {
+        'trunk_flexion': trunk_sagittal,
+        'lateral_trunk_flexion': _angle(np.abs(_dot(trunk, left)), _dot(trunk, _UP)),
+        'hip_flexion': thigh_sagittal + trunk_sagittal[:, None],
+        'knee_flexion': thigh_sagittal - shank_sagittal,
+        'knee_valgus': thigh_frontal - shank_frontal,
+        'foot_rotation': _angle(foot_medial, foot_forward),
+        'foot_pitch': _angle(-_dot(foot, up_2), np.hypot(foot_forward, foot_medial)),
+        # Outer edges of the feet, and the shoulder joint centres, across the body
+        'stance_width': np.maximum(feet_left[:, 0], feet_left[:, 2]) - np.minimum(feet_left[:, 1], feet_left[:, 3]),
+        'shoulder_width': _dot(joint['shoulder'][:, 0] - joint['shoulder'][:, 1], left),
+    }
+
+
+def _points(landmarks, frames, width, height):
+    points = _at_frames(landmarks, frames)
+    if width and height:
+        points[..., 1] *= height / width
+    return points
+
+
+def derive_inputs(landmarks, fps, timestamps=None, events=None, width=None, height=None, frontal=None):
+    """
+    Measurements of one trial that the LESS items are scored on.
+    The worse side is taken wherever the items look at both legs.
+    Parameters:
+    landmarks (np.ndarray): (n_frames, 33, 3) landmarks in normalized image coordinates, NaN for frames without a detection.
+    fps (float): Frame rate of the trial.
+    timestamps (np.ndarray): Frame times in seconds, for the time between the contacts of the two feet.
+    events (dict): Frames from tools.events.detect_landing_events, detected here when None.
+    width, height (int): Frame size, to measure angles in square pixels rather than normalized coordinates.
+    frontal (LandmarkTrack): A frontal view on the same frames, e.g. from tools.multiview.align_views; `landmarks`
+        are then taken to be the sagittal view.
+    Returns:
+    tuple: (inputs, events), with inputs a dict of measurement name to float; None if no landing is found.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    if np.isnan(landmarks[:, 0, 0]).all():
+        return None
+    if frontal is not None:
+        # The side view's depth is the least reliable coordinate, and not needed in its image plane
+        landmarks = landmarks * (1, 1, 0)
+    if events is None:
+        events = detect_landing_events(landmarks, calculate_pose_angles_batch(landmarks), fps)
+        if events is None:
+            return None
+    initial_contact, peak = events['initial_contact'], events['max_knee_flexion']
+
+    frames = np.arange(initial_contact, peak + 1)
+    contact_landmarks = landmarks
+    if frontal is None:
+        measured = _measure(_points(landmarks, frames, width, height))
+    else:
+        front = np.asarray(frontal.landmarks, dtype=np.float64)
+        if np.isnan(front[:, 0, 0]).all():
+            return None
+        sagittal = _measure(_points(landmarks, frames, width, height), 'sagittal')
+        frontal_measured = _measure(_points(front, frames, frontal.width, frontal.height), 'frontal')
+        measured = {name: (frontal_measured if name in FRONTAL_MEASUREMENTS else sagittal)[name] for name in sagittal}
+        # Neither foot hides the other from the front
+        contact_landmarks = front
+    ic = {name: values[0] for name, values in measured.items()}
+    at_peak = {name: values[-1] for name, values in measured.items()}
+
+    # Contact of each foot on its own, from its ankle height
+    contacts = [detect_initial_contact(contact_landmarks[:, index, 1], fps) for index in _SIDES['ankle']]
+    if None in contacts:
+        contact_asymmetry = np.nan
+    elif timestamps is not None:
+        contact_asymmetry = abs(timestamps[contacts[0]] - timestamps[contacts[1]])
+    else:
+        contact_asymmetry = abs(contacts[0] - contacts[1]) / fps
+
+    inputs = {
+        'knee_flexion_ic': ic['knee_flexion'].min(),
+        'hip_flexion_ic': ic['hip_flexion'].min(),
+        'trunk_flexion_ic': ic['trunk_flexion'],
+        'foot_pitch_ic': ic['foot_pitch'].min(),
+        'knee_valgus_ic': ic['knee_valgus'].max(),
+        'lateral_trunk_flexion_ic': ic['lateral_trunk_flexion'],
+        'stance_width': ic['stance_width'],
+        'shoulder_width': ic['shoulder_width'],
+        'max_foot_rotation': ic['foot_rotation'].max(),
+        'min_foot_rotation': ic['foot_rotation'].min(),
+        'contact_asymmetry': contact_asymmetry,
+        'knee_flexion_displacement': (measured['knee_flexion'].max(axis=0) - ic['knee_flexion']).min(),
+        'hip_flexion_displacement': (at_peak['hip_flexion'] - ic['hip_flexion']).min(),
+        'trunk_flexion_displacement': at_peak['trunk_flexion'] - ic['trunk_flexion'],
+        'max_knee_valgus': measured['knee_valgus'].max(),
+    }
+    return {name: float(value) for name, value in inputs.items()}, events
+
+
+def score_items(inputs):
+    """
+    LESS item scores of one or many trials, by the rules of the item functions in LESS/__init__.py.
+    Parameters:
+    inputs (dict): Measurement name, as returned by derive_inputs, to a value or an array with one value per trial.
+    Returns:
+    np.ndarray: int8 item scores, (..., 17) in ITEM_NAMES order; UNSCORED_ITEM where a measurement
+    the item needs (see ITEM_INPUTS) is NaN.
+    """
+    v = {name: np.asarray(value, dtype=np.float64) for name, value in inputs.items()}
+    displacement = v['knee_flexion_displacement'] + v['hip_flexion_displacement']
+    joint_displacement = np.where(displacement >= SOFT_DISPLACEMENT, 0, np.where(displacement >= STIFF_DISPLACEMENT, 1, 2))
+    valgus_at_contact = v['knee_valgus_ic'] > 0
+    valgus_displacement = v['max_knee_valgus'] > 10
+    # Excellent: soft and no frontal plane motion; poor: stiff or large frontal plane motion
+    overall = np.where((joint_displacement == 2) | valgus_displacement, 2,
+                       np.where((joint_displacement == 0) & ~valgus_at_contact, 0, 1))
+    items = [
+        ~(v['knee_flexion_ic'] > 30),
+        ~(v['hip_flexion_ic'] > 0),
+        ~(v['trunk_flexion_ic'] > 0),
+        ~(v['foot_pitch_ic'] > TOE_FIRST_PITCH),
+        valgus_at_contact,
+        v['lateral_trunk_flexion_ic'] > LATERAL_TRUNK_FLEXION,
+        v['stance_width'] > v['shoulder_width'],
+        v['stance_width'] < v['shoulder_width'],
+        v['max_foot_rotation'] > 30,
+        v['min_foot_rotation'] < -30,
+        v['contact_asymmetry'] > CONTACT_SYMMETRY_SECONDS,
+        ~(v['knee_flexion_displacement'] > 45),
+        ~(v['hip_flexion_displacement'] > 0),
+        ~(v['trunk_flexion_displacement'] > 0),
+        valgus_displacement,
+        joint_displacement,
+        overall,
+    ]
+    unscored = [np.isnan(sum(v[name] for name in names)) for names in ITEM_INPUTS]
+    items = np.stack(np.broadcast_arrays(*items), axis=-1).astype(np.int8)
+    return np.where(np.stack(np.broadcast_arrays(*unscored), axis=-1), np.int8(UNSCORED_ITEM), items)
+
+
+def score_landmarks(landmarks, fps, timestamps=None, events=None, width=None, height=None, frontal=None):
+    """
+    Score a whole trial on all 17 LESS items.
+    Parameters are those of derive_inputs.
+    Returns:
+    dict: 'items' (17,) int8 array in ITEM_NAMES order, 'total' and 'interpretation' from
+    LESS.calculate_less_score and LESS.interpret_less_score, the measured 'inputs', the landing
+    'events' and the names of the 'unscored' items; None if no landing is found. The total needs
+    all 17 items, so it and the interpretation are None when any item is unscored.
+    """
+    derived = derive_inputs(landmarks, fps, timestamps, events, width, height, frontal)
+    if derived is None:
+        return None
+    inputs, events = derived
+    items = score_items(inputs)
+    unscored = [name for name, item in zip(ITEM_NAMES, items.tolist()) if item == UNSCORED_ITEM]
+    total = LESS.calculate_less_score(items.tolist()) if not unscored else None
+    return {'items': items, 'total': total, 'interpretation': LESS.interpret_less_score(total) if not unscored else None,
+            'inputs': inputs, 'events': events, 'unscored': unscored}
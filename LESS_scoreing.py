@@ -1,74 +1,146 @@
 """
-Evalute pose with angles distribution from LESS for each frame of a video.
+Evalute pose with angles distribution from LESS at the landing events of a video.
 """
 
-import cv2
-import mediapipe as mp
+import argparse
 import numpy as np
 from LESS import angledist
-from tools import calculate_pose_angles
-
-def process_video(video_path):
-    mp_drawing = mp.solutions.drawing_utils
-    mp_pose = mp.solutions.pose
-
-    cap = cv2.VideoCapture(video_path)
-    
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter('./outputs/LESS_scoring.mp4', fourcc, fps, (width, height))
-
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            results = pose.process(image)
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-            if results.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    image, 
-                    results.pose_landmarks, 
-                    mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=2),
-                    mp_drawing.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
-                )
-
-                current_angles = calculate_pose_angles(results.pose_landmarks.landmark, mp_pose)
-
-                angles_for_scoring = {
-                    "Initial Contact": current_angles,
-                    "Peak Angle": current_angles,
-                    "Displacement": current_angles,
-                }
-
-                scores = angledist.analyze_all_angles(angles_for_scoring)
-
-                y = 30
-                for phase, measurements in scores.items():
-                    cv2.putText(image, f"{phase}:", (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-                    y += 20
-                    for measurement, result in measurements.items():
-                        text = f"{measurement}: {result['category']} (Z: {result['zscore']:.2f}, Angle: {current_angles[measurement]:.2f})"
-                        cv2.putText(image, text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-                        y += 20
-
-            out.write(image)
-            cv2.imshow('Pose Estimation', image)
-
-    cap.release()
-    out.release()
-    cv2.destroyAllWindows()
-
-# Global variable for MediaPipe Pose
-mp_pose = mp.solutions.pose
-
-process_video('./outputs/pose.mov')
\ No newline at end of file
+from tools import ANGLE_NAMES, calculate_pose_angles_batch
+from tools.events import detect_landing_events
+from tools.extraction import PoseVideo, draw_landmarks, write_frame_results
+from tools.jcs import JCS_ANGLE_NAMES, calculate_jcs_angles_batch
+from tools.multiview import SYNC_METHODS, align_views, calculate_multiview_angles, extract_views, sync_offsets
+
+# 'image': angles between image-plane landmarks; 'world': joint coordinate systems of the world landmarks
+ANGLE_BACKENDS = ['image', 'world']
+
+def score_landing(angles, events, names=ANGLE_NAMES):
+    """
+    Score the angles at the landing events against the LESS distributions.
+    Parameters:
+    angles (np.ndarray): (n_frames, n_angles) angles, e.g. from calculate_pose_angles_batch.
+    events (dict): Frames from detect_landing_events.
+    names (list): Measurement name of every angle column, e.g. JCS_ANGLE_NAMES for calculate_jcs_angles_batch.
+    Returns:
+    tuple: (angles_for_scoring, scores), both keyed by phase then joint.
+    """
+    initial_contact = dict(zip(names, angles[events['initial_contact']].tolist()))
+    peak = dict(zip(names, angles[events['max_knee_flexion']].tolist()))
+    angles_for_scoring = {
+        "Initial Contact": initial_contact,
+        "Peak Angle": peak,
+        "Displacement": {joint: peak[joint] - initial_contact[joint] for joint in names},
+    }
+    return angles_for_scoring, angledist.analyze_all_angles(angles_for_scoring)
+
+def process_video(video_path, workers=1, headless=False, frontal_path=None, sync='timestamp', frontal_offset=None,
+                  angle_backend='image'):
+    """
+    Annotate a video with the LESS angle distribution scores at initial contact and peak knee flexion.
+    In headless mode nothing is drawn, encoded or shown, and cached landmarks are replayed
+    without decoding the video.
+    With `frontal_path`, `video_path` is the sagittal view and both views are extracted at the same time.
+    The frontal view is put on the sagittal clock by `sync` (see tools.multiview.SYNC_METHODS), or by
+    `frontal_offset` seconds added to its timestamps. Knee valgus and hip adduction then come from the
+    frontal view and flexion from the sagittal one.
+    With `angle_backend` 'world', every measurement of the LESS distributions, tibial and hip rotation
+    included, comes from the world landmarks (tools.jcs); the landing events still come from the image angles.
+    Returns:
+    list: One result dict per frame; the event frames also carry the scores of their phases.
+    """
+    if angle_backend not in ANGLE_BACKENDS:
+        raise ValueError(f"Unknown angle backend {angle_backend!r}, expected one of {ANGLE_BACKENDS}")
+    if frontal_path is not None and angle_backend == 'world':
+        raise ValueError("World landmarks are already 3D, a frontal view is only used by the image angles")
+    if frontal_path is not None:
+        video_paths = {'sagittal': video_path, 'frontal': frontal_path}
+        # Cached afterwards, so the sagittal view below loads without inference
+        tracks = extract_views(video_paths)
+        offsets = {'frontal': frontal_offset} if frontal_offset is not None else sync_offsets(video_paths, sync)
+        views = align_views(tracks, offsets)
+
+    source = PoseVideo(video_path, workers=workers)
+    track = source.load()
+
+    fps = source.fps
+    width = source.width
+    height = source.height
+
+    # Angles of the whole trial in one pass, then scoring once at the landing events
+    landmarks = np.asarray(track.landmarks)
+    if frontal_path is not None:
+        angles = calculate_multiview_angles(views['frontal'], views['sagittal'])
+    else:
+        angles = calculate_pose_angles_batch(landmarks)
+    events = detect_landing_events(landmarks, angles, track.fps)
+    names = ANGLE_NAMES
+    if angle_backend == 'world':
+        angles, names = calculate_jcs_angles_batch(track.world_landmarks), JCS_ANGLE_NAMES
+    if events is not None:
+        angles_for_scoring, scores = score_landing(angles, events, names)
+        event_phases = {
+            events['initial_contact']: ["Initial Contact"],
+            events['max_knee_flexion']: ["Peak Angle", "Displacement"],
+        }
+    else:
+        angles_for_scoring, scores, event_phases = {}, {}, {}
+
+    if not headless:
+        import cv2  # Headless runs draw nothing, so they leave OpenCV unloaded on a cache hit
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter('./outputs/LESS_scoring.mp4', fourcc, fps, (width, height))
+
+    results = []
+    for index, (image, frame_landmarks, visibility) in enumerate(source.frames(decode=not headless)):
+        frame_result = {'frame': index, 'detected': frame_landmarks is not None}
+        results.append(frame_result)
+        if frame_landmarks is not None:
+            frame_result['angles'] = dict(zip(names, angles[index].tolist()))
+        if index in event_phases:
+            frame_result['event'] = event_phases[index][0]
+            frame_result['scores'] = {phase: scores[phase] for phase in event_phases[index]}
+
+        if headless:
+            continue
+
+        if frame_landmarks is not None:
+            draw_landmarks(image, frame_landmarks, visibility)
+
+        y = 30
+        for phase, measurements in scores.items():
+            cv2.putText(image, f"{phase}:", (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+            y += 20
+            for measurement, result in measurements.items():
+                text = f"{measurement}: {result['category']} (Z: {result['zscore']:.2f}, Angle: {angles_for_scoring[phase][measurement]:.2f})"
+                cv2.putText(image, text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+                y += 20
+
+        out.write(image)
+        cv2.imshow('Pose Estimation', image)
+
+    source.release()
+    if not headless:
+        out.release()
+        cv2.destroyAllWindows()
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate pose angles against the LESS distributions at the landing events of a video.")
+    parser.add_argument('video_path', type=str, nargs='?', default='./outputs/pose.mov', help="Path to the input video file.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for pose extraction on a cache miss.")
+    parser.add_argument('--frontal', type=str, default=None, help="Video of the frontal view; video_path is then the sagittal view.")
+    parser.add_argument('--sync', choices=SYNC_METHODS, default='timestamp', help="How to line up the frontal view with the sagittal one.")
+    parser.add_argument('--frontal-offset', type=float, default=None, help="Seconds added to the frontal view's timestamps, e.g. measured from the audio; overrides --sync.")
+    parser.add_argument('--angles', choices=ANGLE_BACKENDS, default='image', help="Measure the angles between image landmarks, or in joint coordinate systems of the 3D world landmarks.")
+    parser.add_argument('--headless', action='store_true', help="Skip drawing, video encoding and windows; only emit per-frame results.")
+    parser.add_argument('--results', type=str, default=None, help="JSON lines file for the per-frame results in headless mode (default: stdout).")
+
+    args = parser.parse_args()
+    if args.frontal and args.angles == 'world':
+        parser.error("--frontal only applies to --angles image")
+
+    results = process_video(args.video_path, workers=args.workers, headless=args.headless, frontal_path=args.frontal,
+                            sync=args.sync, frontal_offset=args.frontal_offset, angle_backend=args.angles)
+    if args.headless:
+        write_frame_results(results, args.results)
@@ -1,166 +1,344 @@
-import cv2
-import mediapipe as mp
 import numpy as np
-import matplotlib.pyplot as plt
-from tqdm import tqdm
-from tools import calculate_pose_angles, calculate_velocities, calculate_accelerations, calculate_jerks
+from tools import ANGLE_NAMES, calculate_pose_angles
+from tools.dashboard import LiveDashboard, save_summary
+from tools.extraction import PoseVideo, create_pose, detect, draw_landmarks, frame_result_writer
+from tools.filters import FILTER_NAMES, create_landmark_filter
+from tools.history import DEFAULT_HISTORY_SECONDS, RingHistory
+from tools.live import DEFAULT_LATENCY_BUDGET, LatestFrameReader
+from tools.landmark_cache import DEFAULT_CACHE_DIR
+from tools.pipeline import format_stats
+from tools.profiling import NULL_PROFILER, Profiler, format_report
+from tools.roi import DEFAULT_ROI_CONFIG, RoiTracker
+from tools.sampling import DEFAULT_SAMPLING_CONFIG
+from tools.session import export_session
+from tools.streaming import StreamingDerivatives
 from biomechanical import score_accelerations
+import config
+import contextlib
 import os
+import sys
+import time
 import argparse
 
-mp_pose = mp.solutions.pose
+def score_frame(frame_result, velocities, accelerations, jerks, tables=None):
+    """Add the derivatives and acceleration risk of one frame to its result dict; returns the acceleration scores."""
+    acceleration_scores = score_accelerations({joint: [accel] for joint, accel in accelerations.items()}, tables)
+    frame_result.update(
+        velocities=velocities,
+        accelerations=accelerations,
+        jerks=jerks,
+        acceleration_risk={joint: {'risk_score': score['risk_score'], 'risk_category': score['risk_category']}
+                           for joint, score in acceleration_scores.items()}
+    )
+    return acceleration_scores
 
-def process_video(video_path, show_windows=True):
-    mp_drawing = mp.solutions.drawing_utils
-    mp_pose = mp.solutions.pose
+def draw_values(image, current_angles, velocities, accelerations, jerks, acceleration_scores):
+    """Display angles, velocities, accelerations, and jerks on the frame."""
+    import cv2
+    y = 30
 
-    cap = cv2.VideoCapture(video_path)
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    for joint in current_angles:
+        angle = current_angles[joint]
+        velocity = velocities.get(joint, 0)
+        accel = accelerations.get(joint, 0)
+        jerk = jerks.get(joint, 0)
+        if joint in acceleration_scores:
+            accel_score = acceleration_scores[joint]['risk_score']
+            accel_category = acceleration_scores[joint]['risk_category']
+        else:
+            accel_score = 0
+            accel_category = 'Unknown'
+
+        angle_text = f"{joint}: Angle={angle:.2f}"
+        angle_color = (0, 0, 0)
+        cv2.putText(image, angle_text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, angle_color, 1)
+        y += 20
+
+        velocity_text = f"{joint}: Vel={velocity:.2f}"
+        velocity_color = (0, 0, 0)
+        cv2.putText(image, velocity_text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, velocity_color, 1)
+        y += 20
+
+        accel_text = f"{joint}: Accl={accel:.2f}, Score={accel_score:.2f}, Category={accel_category}"
+        # Determine color based on risk score
+        risk_score = accel_score
+        green_component = int(225 - (risk_score * 2.25))
+        green_component = min(max(green_component, 0), 255)
+        red_component = int(risk_score * 2.55)
+        red_component = min(max(red_component, 0), 255)
+        accel_color = (0, green_component, red_component)
+        cv2.putText(image, accel_text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, accel_color, 1)
+        y += 20
+
+HISTORY_NAMES = ['angles', 'velocities', 'accelerations', 'jerks']
+
+def create_histories(horizon, spill_dir=None):
+    """One RingHistory of `horizon` frames per series in HISTORY_NAMES, spilling older frames to spill_dir/<name>.f32."""
+    if spill_dir:
+        os.makedirs(spill_dir, exist_ok=True)
+    return {name: RingHistory(ANGLE_NAMES, horizon, os.path.join(spill_dir, f"{name}.f32") if spill_dir else None)
+            for name in HISTORY_NAMES}
+
+def close_histories(histories, show_summary=False):
+    """Close the histories, first saving and showing the plots of all their frames with show_summary."""
+    if show_summary:
+        # Save the final plots as images
+        if not os.path.exists('./outputs'):
+            os.makedirs('./outputs')
+        save_summary(*[history.series(include_spilled=True) for history in histories.values()],
+                     './outputs/angles_velocities_accelerations_jerks.png', show=True)
+    for history in histories.values():
+        history.close()
+
+def process_video(video_path, show_windows=True, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, workers=1, headless=False, stats=False,
+                  session=None, profile=None, trace=None, history_seconds=None, spill_dir=None, landmark_filter=None,
+                  derivative_window=31, roi=False, adaptive=False, on_result=None):
+    """
+    Annotate a video with joint angles, velocities, accelerations and jerks.
+    Decoding, pose inference, analysis and encoding run as overlapping pipeline stages.
+    In headless mode nothing is drawn, encoded or shown, and cached landmarks are replayed
+    without decoding the video. With `session`, the columnar session of the whole video is
+    exported to that directory once every frame has been processed.
+    With `profile`, per-stage wall time histograms, fps, queue depths and peak memory are
+    written to that JSON file; with `trace`, every stage call is written as a Chrome trace.
+    The angle and derivative series are kept for the last `history_seconds` (default: the
+    whole video) in fixed-size buffers; with `spill_dir`, older frames are appended to
+    angles.f32, velocities.f32, accelerations.f32 and jerks.f32 in that directory.
+    `landmark_filter` (see tools.filters.FILTER_NAMES) smooths the landmarks before the angles
+    are computed, and `derivative_window` is the number of frames the derivatives are fitted to.
+    With `roi`, pose inference on a cache miss runs on a crop around the previous frame's pose.
+    With `adaptive`, a cache miss infers every frame only around landings and interpolates between keyframes elsewhere.
+    `on_result` is called with the result dict of every frame as soon as it is ready; nothing
+    else keeps them, so memory stays bounded however long the video is.
+    Returns:
+    int: Number of frames processed.
+    """
+    from tqdm import tqdm
+    show_windows = show_windows and not headless
+    profiler = Profiler(trace=trace is not None) if profile or trace else NULL_PROFILER
+    source = PoseVideo(video_path, cache_dir=cache_dir, use_cache=use_cache, workers=workers,
+                       roi_config=DEFAULT_ROI_CONFIG if roi else None,
+                       sampling_config=DEFAULT_SAMPLING_CONFIG if adaptive else None)
+    fps = source.fps
     if fps <= 0:
         raise ValueError("Unable to determine FPS of the video, this tool requires a valid FPS value to calculate accelerations and jerks.")
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = source.width
+    height = source.height
+    total_frames = source.frame_count
     
-    # Generate output file path
-    base_name = os.path.basename(video_path)
-    name, ext = os.path.splitext(base_name)
-    output_path = os.path.join(os.path.dirname(video_path), f"{name}_output_with_ang_vel_acc_jerk{ext}")
-
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-
-    angle_series = {
-        "Left Knee Flexion": [], "Right Knee Flexion": [],
-        "Left Hip Flexion": [], "Right Hip Flexion": [],
-        "Left Knee Valgus": [], "Right Knee Valgus": [],
-        "Left Hip Adduction": [], "Right Hip Adduction": []
-    }
-    frame_count = 0
+    if not headless:
+        # Generate output file path
+        base_name = os.path.basename(video_path)
+        name, ext = os.path.splitext(base_name)
+        output_path = os.path.join(os.path.dirname(video_path), f"{name}_output_with_ang_vel_acc_jerk{ext}")
+
+        import cv2  # Headless runs draw nothing, so they leave OpenCV unloaded on a cache hit
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+
+    # One row per frame, NaN where a value is not available
+    if history_seconds is None:
+        horizon = total_frames if total_frames > 0 else int(DEFAULT_HISTORY_SECONDS * fps)
+    else:
+        horizon = max(1, int(history_seconds * fps))
+    histories = create_histories(horizon, spill_dir)
+    # Fitted to the frame timestamps, so frames without a detection keep their place on the time axis
+    derivatives = StreamingDerivatives(ANGLE_NAMES, window_length=derivative_window)
+    smooth = create_landmark_filter(landmark_filter)
+    # Scoring config snapshot for the whole run
+    tables = config.current()
+    processed = 0
 
     if show_windows:
-        plt.ion()
-        fig, axs = plt.subplots(4, 1, figsize=(10, 16))
+        dashboard = LiveDashboard(ANGLE_NAMES, fps).start()
 
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-        for _ in tqdm(range(total_frames), desc="Processing video"):
-            ret, frame = cap.read()
-            if not ret:
-                break
+    # Runs in the analysis stage, on one thread and in frame order since the derivatives are stateful
+    def analyze(index, image, landmarks, visibility, timestamp):
+        frame_result = {'frame': index, 'detected': landmarks is not None}
+        current_angles = velocities = accelerations = jerks = {}
+        if landmarks is not None:
+            if smooth is not None:
+                with profiler.stage('filter'):
+                    landmarks = smooth(landmarks, timestamp)
+            if not headless:
+                with profiler.stage('render'):
+                    draw_landmarks(image, landmarks, visibility)
 
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            results = pose.process(image)
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-            if results.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    image, 
-                    results.pose_landmarks, 
-                    mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=2),
-                    mp_drawing.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
-                )
-
-                current_angles = calculate_pose_angles(results.pose_landmarks.landmark, mp_pose)
-                for joint, angle in current_angles.items():
-                    angle_series[joint].append(angle)
-                
-                # Calculate velocities, accelerations, and jerks if we have enough frames
-                window_length = 31  # Should be an odd integer
-                min_frames = window_length
-                if frame_count >= min_frames:
-                    velocities = calculate_velocities(angle_series, fps)
-                    accelerations = calculate_accelerations(angle_series, fps)
-                    acceleration_scores = score_accelerations(accelerations)
-                    jerks = calculate_jerks(accelerations, fps)
-
-                    # Display angles, velocities, accelerations, and jerks on the frame
-                    y = 30
-
-                    for joint in angle_series.keys():
-                        angle = current_angles[joint]
-                        velocity = velocities[joint][-1] if joint in velocities else 0
-                        accel = accelerations[joint][-1] if joint in accelerations else 0
-                        jerk = jerks[joint][-1] if joint in jerks else 0
-                        if joint in acceleration_scores:
-                            accel_score = acceleration_scores[joint]['risk_score']
-                            accel_category = acceleration_scores[joint]['risk_category']
-                        else:
-                            accel_score = 0
-                            accel_category = 'Unknown'
-
-                        angle_text = f"{joint}: Angle={angle:.2f}"
-                        angle_color = (0, 0, 0)
-                        cv2.putText(image, angle_text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, angle_color, 1)
-                        y += 20
-
-                        velocity_text = f"{joint}: Vel={velocity:.2f}"
-                        velocity_color = (0, 0, 0)
-                        cv2.putText(image, velocity_text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, velocity_color, 1)
-                        y += 20
-
-                        accel_text = f"{joint}: Accl={accel:.2f}, Score={accel_score:.2f}, Category={accel_category}"
-                        # Determine color based on risk score
-                        risk_score = accel_score
-                        green_component = int(225 - (risk_score * 2.25))
-                        green_component = min(max(green_component, 0), 255)
-                        red_component = int(risk_score * 2.55)
-                        red_component = min(max(red_component, 0), 255)
-                        accel_color = (0, green_component, red_component)
-                        cv2.putText(image, accel_text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, accel_color, 1)
-                        y += 20
-
-                    if show_windows:
-                        # Update plots
-                        axs[0].cla()
-                        axs[1].cla()
-                        axs[2].cla()
-                        axs[3].cla()
-                        for joint in angle_series.keys():
-                            axs[0].plot(angle_series[joint], label=f"{joint} Angle")
-                            if joint in velocities:
-                                axs[1].plot(velocities[joint], label=f"{joint} Velocity")
-                            if joint in accelerations:
-                                axs[2].plot(accelerations[joint], label=f"{joint} Acceleration")
-                            if joint in jerks:
-                                axs[3].plot(jerks[joint], label=f"{joint} Jerk")
-                        axs[0].legend(loc='upper right')
-                        axs[1].legend(loc='upper right')
-                        axs[2].legend(loc='upper right')
-                        axs[3].legend(loc='upper right')
-                        axs[0].set_title('Joint Angles')
-                        axs[1].set_title('Joint Velocities')
-                        axs[2].set_title('Joint Accelerations')
-                        axs[3].set_title('Joint Jerks')
-                        plt.pause(0.001)
-
-            out.write(image)
+            with profiler.stage('angles'):
+                current_angles = calculate_pose_angles(landmarks)
+            frame_result['angles'] = current_angles
+            
+            # Velocities, accelerations and jerks at the newest frame, once the window is full
+            with profiler.stage('derivatives'):
+                velocities, accelerations, jerks = derivatives.push(current_angles, timestamp)
             if show_windows:
-                cv2.imshow('Pose Estimation with Velocities, Accelerations, and Jerks', image)
-            frame_count += 1
+                dashboard.push(current_angles, velocities, accelerations, jerks)
+            if accelerations:
+                with profiler.stage('risk'):
+                    acceleration_scores = score_frame(frame_result, velocities, accelerations, jerks, tables)
+
+                if not headless:
+                    with profiler.stage('render'):
+                        draw_values(image, current_angles, velocities, accelerations, jerks, acceleration_scores)
+        for name, values in zip(histories, [current_angles, velocities, accelerations, jerks]):
+            histories[name].append(values)
+        return image, frame_result
 
-            if cv2.waitKey(10) & 0xFF == ord('q'):
+    pipeline = source.pipeline(analyze, encode=None if headless else out.write, decode=not headless, profiler=profiler)
+    for image, frame_result in tqdm(pipeline, total=total_frames, desc="Processing video"):
+        processed += 1
+        if on_result is not None:
+            on_result(frame_result)
+        profiler.frame()
+        if show_windows:
+            with profiler.stage('display'):
+                cv2.imshow('Pose Estimation with Velocities, Accelerations, and Jerks', image)
+                key = cv2.waitKey(10)
+            if key & 0xFF == ord('q'):
                 break
+    pipeline.close()
+    profiler.stop()
 
-    cap.release()
-    out.release()
-    cv2.destroyAllWindows()
+    source.release()
+    if not headless:
+        out.release()
+        cv2.destroyAllWindows()
+    if session and source.track is not None:
+        export_session(source.track, session, tables, landmark_filter)
     if show_windows:
-        plt.ioff()
+        dashboard.close()
+    close_histories(histories, show_summary=show_windows)
+    if stats:
+        print(format_stats(pipeline.stats()), file=sys.stderr)
+    if profile:
+        profiler.save_report(profile)
+        print(format_report(profiler.report()), file=sys.stderr)
+    if trace:
+        profiler.save_trace(trace)
 
-        # Save the final plots as images
-        if not os.path.exists('./outputs'):
-            os.makedirs('./outputs')
-        fig.savefig('./outputs/angles_velocities_accelerations_jerks.png')
-        plt.show()
+    return processed
+
+def process_stream(source, latency_budget=DEFAULT_LATENCY_BUDGET, show_windows=True, headless=False, output_path=None,
+                   landmark_filter=None, derivative_window=31, roi=False, history_seconds=None, spill_dir=None,
+                   on_result=None):
+    """
+    Analyse a live webcam or network stream until it ends or 'q' is pressed.
+    Always the newest frame is analysed; frames that would exceed the latency budget are dropped.
+    Derivatives use the capture timestamps of the analysed frames, so dropped frames do not skew them.
+    Parameters:
+    source (str): Camera index ('0') or stream URL, e.g. rtsp://host/stream or udp://@:5000.
+    latency_budget (float): Oldest a frame may be, in seconds, when its analysis starts.
+    output_path (str): Optional video file for the annotated frames.
+    landmark_filter (str): Landmark filter applied before the angles, one of tools.filters.FILTER_NAMES.
+    derivative_window (int): Number of frames the derivatives are fitted to.
+    roi (bool): Run pose inference on a crop around the previous frame's pose.
+    history_seconds (float): Seconds of angle and derivative history kept, as in process_video
+        (default: DEFAULT_HISTORY_SECONDS); spill_dir takes the older frames.
+    on_result (callable): Called with the result dict of every analysed frame, with its capture
+        'timestamp' and end-to-end 'latency' in seconds.
+    Returns:
+    int: Number of frames analysed.
+    """
+    import cv2
+    show_windows = show_windows and not headless
+    reader = LatestFrameReader(source, latency_budget).start()
+    derivatives = StreamingDerivatives(ANGLE_NAMES, window_length=derivative_window)
+    smooth = create_landmark_filter(landmark_filter)
+    # Scoring config snapshot for the whole run
+    tables = config.current()
+    pose = create_pose()
+    roi_tracker = RoiTracker(**DEFAULT_ROI_CONFIG) if roi else None
+    fps = reader.fps or 30
+    histories = create_histories(max(1, int((history_seconds or DEFAULT_HISTORY_SECONDS) * fps)), spill_dir)
+    analysed = 0
+    out = None
+    if output_path and not headless:
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(output_path, fourcc, fps, (reader.width, reader.height))
+    if show_windows:
+        dashboard = LiveDashboard(ANGLE_NAMES, fps).start()
+
+    try:
+        for index, (image, timestamp) in enumerate(reader.frames()):
+            landmarks, visibility, _ = detect(pose, image, roi_tracker)
+            if smooth is not None:
+                landmarks = smooth(landmarks, timestamp)
+            frame_result = {'frame': index, 'timestamp': timestamp, 'detected': landmarks is not None}
+            current_angles = velocities = accelerations = jerks = {}
+            if landmarks is not None:
+                current_angles = calculate_pose_angles(landmarks)
+                frame_result['angles'] = current_angles
+                velocities, accelerations, jerks = derivatives.push(current_angles, timestamp)
+                acceleration_scores = score_frame(frame_result, velocities, accelerations, jerks, tables) if accelerations else {}
+                if show_windows:
+                    dashboard.push(current_angles, velocities, accelerations, jerks)
+                if not headless:
+                    draw_landmarks(image, landmarks, visibility)
+                    draw_values(image, current_angles, velocities, accelerations, jerks, acceleration_scores)
+            for name, values in zip(histories, [current_angles, velocities, accelerations, jerks]):
+                histories[name].append(values)
+            frame_result['latency'] = time.monotonic() - timestamp
+            analysed += 1
+            if on_result is not None:
+                on_result(frame_result)
+
+            if out is not None:
+                out.write(image)
+            if show_windows:
+                cv2.imshow('Live Pose Estimation with Velocities, Accelerations, and Jerks', image)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.release()
+        pose.close()
+        if out is not None:
+            out.release()
+        if show_windows:
+            dashboard.close()
+            cv2.destroyAllWindows()
+        close_histories(histories, show_summary=show_windows)
+
+    print(f"Analysed {analysed} of {reader.captured} captured frames, dropped {reader.dropped}.", file=sys.stderr)
+    return analysed
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process a video for pose estimation with velocities, accelerations, and jerks.")
-    parser.add_argument('video_path', type=str, help="Path to the input video file.")
+    parser.add_argument('video_path', type=str, help="Path to the input video file, or with --live a camera index or stream URL.")
+    parser.add_argument('--live', action='store_true', help="Analyse a live camera or RTSP/UDP stream, dropping frames to stay within the latency budget.")
+    parser.add_argument('--latency-budget', type=float, default=DEFAULT_LATENCY_BUDGET, help="Seconds a live frame may wait before it is dropped.")
+    parser.add_argument('--output', type=str, default=None, help="Video file for the annotated live frames.")
     parser.add_argument('--show-windows', action='store_true', help="Flag to show the windows for plt and cv2.")
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR, help="Directory of the landmark cache.")
+    parser.add_argument('--no-cache', action='store_true', help="Always run pose estimation and do not cache its output.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for pose extraction on a cache miss.")
+    parser.add_argument('--headless', action='store_true', help="Skip drawing, video encoding and windows; only emit per-frame results.")
+    parser.add_argument('--results', type=str, default=None, help="JSON lines file for the per-frame results in headless mode (default: stdout).")
+    parser.add_argument('--stats', action='store_true', help="Print per-stage pipeline throughput to stderr.")
+    parser.add_argument('--session', type=str, default=None, help="Directory to export the columnar session of the video to.")
+    parser.add_argument('--profile', type=str, default=None, help="JSON file for per-stage timings, fps, queue depths and peak memory.")
+    parser.add_argument('--trace', type=str, default=None, help="Chrome trace JSON file of every stage call, for chrome://tracing or Perfetto.")
+    parser.add_argument('--landmark-filter', choices=FILTER_NAMES, default='none', help="Temporal filter applied to the landmarks before the angles are computed.")
+    parser.add_argument('--derivative-window', type=int, default=31, help="Odd number of frames velocities, accelerations and jerks are fitted to.")
+    parser.add_argument('--roi', action='store_true', help="Run pose inference on a downscaled crop around the previous frame's pose.")
+    parser.add_argument('--adaptive', action='store_true', help="Infer every frame only around landings and interpolate between keyframes elsewhere.")
+    parser.add_argument('--history-seconds', type=float, default=None, help="Seconds of angle and derivative history kept in memory (default: the whole video, or 10 minutes live).")
+    parser.add_argument('--spill-dir', type=str, default=None, help="Directory to append the history older than --history-seconds to.")
     
     args = parser.parse_args()
     
-    process_video(args.video_path, show_windows=args.show_windows)
\ No newline at end of file
+    # Headless results are written out frame by frame rather than collected
+    with frame_result_writer(args.results) if args.headless else contextlib.nullcontext() as on_result:
+        if args.live:
+            process_stream(args.video_path, latency_budget=args.latency_budget, show_windows=args.show_windows,
+                           headless=args.headless, output_path=args.output, landmark_filter=args.landmark_filter,
+                           derivative_window=args.derivative_window, roi=args.roi,
+                           history_seconds=args.history_seconds, spill_dir=args.spill_dir, on_result=on_result)
+        else:
+            process_video(args.video_path, show_windows=args.show_windows, cache_dir=args.cache_dir,
+                          use_cache=not args.no_cache, workers=args.workers, headless=args.headless, stats=args.stats,
+                          session=args.session, profile=args.profile, trace=args.trace,
+                          history_seconds=args.history_seconds, spill_dir=args.spill_dir,
+                          landmark_filter=args.landmark_filter, derivative_window=args.derivative_window, roi=args.roi,
+                          adaptive=args.adaptive, on_result=on_result)
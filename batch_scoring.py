@@ -0,0 +1,191 @@
+"""
+Score a directory or manifest of landing videos with a pool of worker processes.
+
+Each worker keeps one MediaPipe Pose graph for its whole lifetime. Results are
+appended to a CSV, one row per trial, as trials finish; re-running the same
+command skips trials that already have a row. Workers reload the scoring config
+before each trial when its file has changed, without restarting.
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import config
+from LESS.angledist import category_names
+from LESS.engine import score_landmarks
+from biomechanical import MISSING_RISK_CODE, RISK_CATEGORIES, score_acceleration_series
+from tools import ANGLE_NAMES, calculate_accelerations, calculate_pose_angles_batch
+from tools.events import detect_landing_events
+from tools.landmark_cache import DEFAULT_CACHE_DIR, DEFAULT_POSE_CONFIG
+from tools.roi import DEFAULT_ROI_CONFIG
+from tools.sampling import DEFAULT_SAMPLING_CONFIG
+from tools.session import export_session, session_path
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.m4v')
+PHASES = config.current().distribution_table.phases
+
+FIELDNAMES = (
+    ['video_path', 'frames', 'detected_frames', 'fps', 'less_total', 'less_interpretation', 'less_items']
+    + [f"{phase}/{joint}" for phase in PHASES for joint in ANGLE_NAMES]
+    + [f"Acceleration Risk/{joint}" for joint in ANGLE_NAMES]
+    + ['error']
+)
+
+# Long-lived per-worker state, set up by _init_worker
+_pose = None
+_pose_config = None
+_cache_dir = None
+_sessions_dir = None
+_roi_config = None
+_sampling_config = None
+
+
+def find_videos(source):
+    """Video paths from a directory (searched recursively) or a manifest with one path per line."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(VIDEO_EXTENSIONS))
+        return sorted(paths)
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base_dir, line) for line in lines if line and not line.startswith('#')]
+
+
+def completed_trials(output_path):
+    """Videos that already have a successful row in the results file."""
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, newline='') as f:
+        return {row['video_path'] for row in csv.DictReader(f) if not row.get('error')}
+
+
+def score_trial(track, tables=None):
+    """Results row for one trial from its LandmarkTrack, scored against `tables` or the current scoring config."""
+    tables = tables or config.current()
+    landmarks = np.asarray(track.landmarks)
+    detected = track.detected
+    row = {'frames': len(track), 'detected_frames': int(detected.sum()), 'fps': track.fps}
+    if not detected.any():
+        row['error'] = 'no pose detected'
+        return row
+
+    angles = calculate_pose_angles_batch(landmarks)
+    events = detect_landing_events(landmarks, angles, track.fps)
+    if events is None:
+        row['error'] = 'no landing detected'
+        return row
+    initial_contact, peak = events['initial_contact'], events['max_knee_flexion']
+
+    less = score_landmarks(landmarks, track.fps, track.timestamps, events, track.width, track.height)
+    row.update(less_total=less['total'], less_interpretation=less['interpretation'],
+               less_items=' '.join(map(str, less['items'].tolist())))
+
+    # All phases scored in one call, category names only looked up for the CSV
+    phase_angles = np.stack([angles[initial_contact], angles[peak], angles[peak] - angles[initial_contact]])
+    _, codes = tables.distribution_table.score(phase_angles, measurements=ANGLE_NAMES)
+    categories = category_names(codes).tolist()
+    for i, phase in enumerate(PHASES):
+        for j, joint in enumerate(ANGLE_NAMES):
+            row[f"{phase}/{joint}"] = categories[i][j]
+
+    # Risk timeline of the whole trial; the score only grows with the magnitude, so its peak is the trial's risk
+    # Frames without a detection are NaN and skipped by the timestamped derivatives instead of shrinking the time axis
+    accelerations = calculate_accelerations(dict(zip(ANGLE_NAMES, angles.T)), track.fps, track.timestamps)
+    for joint, scored in score_acceleration_series(accelerations, tables).items():
+        # Frames without an acceleration have MISSING_RISK_CODE, below every category
+        worst = scored['risk_code'].max(initial=MISSING_RISK_CODE)
+        if worst != MISSING_RISK_CODE:
+            row[f"Acceleration Risk/{joint}"] = RISK_CATEGORIES[worst]
+    return row
+
+
+def _init_worker(pose_config, cache_dir, sessions_dir=None, roi_config=None, sampling_config=None):
+    global _pose, _pose_config, _cache_dir, _sessions_dir, _roi_config, _sampling_config
+    from tools.extraction import create_pose
+    _pose = create_pose(pose_config)
+    _pose_config = pose_config
+    _cache_dir = cache_dir
+    _sessions_dir = sessions_dir
+    _roi_config = roi_config
+    _sampling_config = sampling_config
+
+
+def _process_video(video_path):
+    from tools.extraction import load_landmarks
+    try:
+        # One snapshot for the whole trial, even if the config is reloaded meanwhile
+        tables = config.reload_if_changed()
+        track = load_landmarks(video_path, _pose_config, _cache_dir, pose=_pose, roi_config=_roi_config,
+                               sampling_config=_sampling_config)
+        row = score_trial(track, tables)
+        if _sessions_dir is not None:
+            export_session(track, session_path(_sessions_dir, video_path), tables)
+    except Exception as e:
+        row = {'error': f"{type(e).__name__}: {e}"}
+    row['video_path'] = video_path
+    return row
+
+
+def process_batch(source, output_path, workers=None, pose_config=None, cache_dir=DEFAULT_CACHE_DIR, sessions_dir=None,
+                  roi_config=None, sampling_config=None):
+    """
+    Score every video of a directory or manifest, appending one row per trial to a CSV.
+    Trials that already have a successful row in `output_path` are skipped.
+    With `sessions_dir`, the columnar session of every trial is exported there as well.
+    With `roi_config`, pose inference runs on a crop around the previous frame's pose.
+    With `sampling_config`, only the frames an AdaptiveSampler picks are inferred and the others interpolated.
+    Returns:
+    int: Number of trials that failed.
+    """
+    from tqdm import tqdm  # Only the parent process reports progress
+    pose_config = pose_config or DEFAULT_POSE_CONFIG
+    done = completed_trials(output_path)
+    pending = [path for path in find_videos(source) if path not in done]
+    write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+    failures = 0
+
+    context = multiprocessing.get_context('spawn')
+    with open(output_path, 'a', newline='') as f, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                initializer=_init_worker, initargs=(pose_config, cache_dir, sessions_dir, roi_config, sampling_config)) as executor:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        if write_header:
+            writer.writeheader()
+        futures = [executor.submit(_process_video, path) for path in pending]
+        with tqdm(total=len(pending) + len(done), initial=len(done), desc="Scoring trials") as progress:
+            for future in as_completed(futures):
+                row = future.result()
+                writer.writerow(row)
+                f.flush()
+                if row.get('error'):
+                    failures += 1
+                    progress.write(f"{row['video_path']}: {row['error']}")
+                progress.update()
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a directory or manifest of landing videos.")
+    parser.add_argument('source', type=str, help="Directory of videos, or a manifest file with one video path per line.")
+    parser.add_argument('--output', type=str, default='./outputs/batch_results.csv', help="Results CSV; existing rows are kept and their trials skipped.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per core).")
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR, help="Directory of the landmark cache.")
+    parser.add_argument('--roi', action='store_true', help="Run pose inference on a downscaled crop around the previous frame's pose.")
+    parser.add_argument('--adaptive', action='store_true', help="Infer every frame only around landings and interpolate between keyframes elsewhere.")
+    parser.add_argument('--sessions', type=str, default=None, help="Directory to export the columnar session of every trial to.")
+
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    failures = process_batch(args.source, args.output, workers=args.workers, cache_dir=args.cache_dir,
+                             sessions_dir=args.sessions, roi_config=DEFAULT_ROI_CONFIG if args.roi else None,
+                             sampling_config=DEFAULT_SAMPLING_CONFIG if args.adaptive else None)
+    if failures:
+        print(f"{failures} trial(s) failed, re-run the same command to retry them.")
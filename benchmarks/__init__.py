@@ -0,0 +1,6 @@
+"""
+Benchmarks of the analysis hot paths on synthetic landmark streams.
+
+    python -m benchmarks run --save NAME          # time everything, store benchmarks/baselines/NAME.json
+    python -m benchmarks compare BASELINE CURRENT  # flag benchmarks that got slower than the threshold
+"""
@@ -0,0 +1,40 @@
+import argparse
+import sys
+
+from benchmarks.suite import (DEFAULT_THRESHOLD, baseline_path, compare_reports, format_comparison, format_results,
+                              load_report, run_benchmarks, save_report)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the analysis hot paths on synthetic landmark streams.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run the benchmarks.")
+    run.add_argument('--filter', type=str, default=None, help="Only run benchmarks whose name contains this text.")
+    run.add_argument('--save', type=str, default=None, help="Baseline name (stored in benchmarks/baselines/) or JSON path for the report.")
+    run.add_argument('--compare', type=str, default=None, help="Baseline name or JSON path to compare the new results against.")
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Slowdown fraction that counts as a regression.")
+
+    compare = commands.add_parser('compare', help="Compare two saved reports.")
+    compare.add_argument('baseline', type=str, help="Baseline name or JSON path.")
+    compare.add_argument('current', type=str, help="Baseline name or JSON path of the newer results.")
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Slowdown fraction that counts as a regression.")
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        report = run_benchmarks(args.filter)
+        print(format_results(report))
+        if args.save:
+            save_report(report, baseline_path(args.save))
+        baseline = load_report(baseline_path(args.compare)) if args.compare else None
+    else:
+        baseline = load_report(baseline_path(args.baseline))
+        report = load_report(baseline_path(args.current))
+
+    if baseline is not None:
+        rows = compare_reports(baseline, report, args.threshold)
+        print(format_comparison(rows))
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}.", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,276 @@
+"""
+The benchmarks, a timer and the baseline comparison.
+
+Each benchmark is a setup function returning a zero-argument callable plus the number
+of items (frames or samples) one call processes. Size-parametrized benchmarks run at
+several series lengths, so time per item that grows with the length shows up as a
+regression of the longer variants.
+"""
+
+import json
+import os
+import platform
+import time
+import timeit
+
+import numpy as np
+
+import LESS
+from LESS import angledist, engine
+from biomechanical import score_acceleration_series, score_accelerations, score_angle_series, score_angles
+from tools import (ANGLE_NAMES, calculate_accelerations, calculate_jerks, calculate_pose_angles,
+                   calculate_pose_angles_batch, calculate_velocities)
+from tools.jcs import calculate_jcs_angles_batch
+from tools.streaming import StreamingDerivatives
+from benchmarks.synthetic import angle_stream, landmark_stream
+
+FPS = 240
+SERIES_LENGTHS = [240, 2400, 24000]
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+# Slowdown, as a fraction of the baseline time, above which compare flags a benchmark
+DEFAULT_THRESHOLD = 0.25
+# Target seconds per timing repeat, and repeats whose fastest is kept
+TARGET_SECONDS = 0.1
+REPEATS = 5
+
+BENCHMARKS = {}
+
+
+def benchmark(name, sizes=None):
+    """Register a setup function, once or once per size as `name[n=size]`."""
+    def register(setup):
+        for size in sizes or [None]:
+            key = name if size is None else f"{name}[n={size}]"
+            BENCHMARKS[key] = (lambda size=size: setup(size)) if size is not None else setup
+        return setup
+    return register
+
+
+def _angle_dicts(n_frames):
+    return [dict(zip(ANGLE_NAMES, row)) for row in angle_stream(n_frames, FPS).tolist()]
+
+
+@benchmark('calculate_pose_angles')
+def _pose_angles():
+    frames = landmark_stream(FPS, FPS)
+    return lambda: [calculate_pose_angles(landmarks) for landmarks in frames], len(frames)
+
+
+@benchmark('calculate_pose_angles_batch', SERIES_LENGTHS)
+def _pose_angles_batch(n):
+    landmarks = landmark_stream(n, FPS)
+    return lambda: calculate_pose_angles_batch(landmarks), n
+
+
+@benchmark('calculate_jcs_angles_batch', SERIES_LENGTHS)
+def _jcs_angles_batch(n):
+    world_landmarks = landmark_stream(n, FPS)
+    return lambda: calculate_jcs_angles_batch(world_landmarks), n
+
+
+@benchmark('calculate_velocities', SERIES_LENGTHS)
+def _velocities(n):
+    series = dict(zip(ANGLE_NAMES, angle_stream(n, FPS).T))
+    return lambda: calculate_velocities(series, FPS), n
+
+
+@benchmark('calculate_accelerations', SERIES_LENGTHS)
+def _accelerations(n):
+    series = dict(zip(ANGLE_NAMES, angle_stream(n, FPS).T))
+    return lambda: calculate_accelerations(series, FPS), n
+
+
+@benchmark('calculate_jerks', SERIES_LENGTHS)
+def _jerks(n):
+    accelerations = calculate_accelerations(dict(zip(ANGLE_NAMES, angle_stream(n, FPS).T)), FPS)
+    return lambda: calculate_jerks(accelerations, FPS), n
+
+
+@benchmark('calculate_accelerations_timestamped', SERIES_LENGTHS)
+def _accelerations_timestamped(n):
+    series = dict(zip(ANGLE_NAMES, angle_stream(n, FPS).T))
+    timestamps = np.arange(n) / FPS
+    return lambda: calculate_accelerations(series, FPS, timestamps), n
+
+
+@benchmark('StreamingDerivatives.push')
+def _streaming_derivatives():
+    frames = _angle_dicts(FPS)
+
+    def run():
+        derivatives = StreamingDerivatives(ANGLE_NAMES, FPS)
+        for angles in frames:
+            derivatives.push(angles)
+    return run, len(frames)
+
+
+@benchmark('score_angles')
+def _score_angles():
+    frames = _angle_dicts(FPS)
+    return lambda: [score_angles(angles) for angles in frames], len(frames)
+
+
+@benchmark('score_accelerations')
+def _score_accelerations():
+    accelerations = calculate_accelerations(dict(zip(ANGLE_NAMES, angle_stream(FPS, FPS).T)), FPS)
+    frames = [{joint: [values[i]] for joint, values in accelerations.items()} for i in range(FPS)]
+    return lambda: [score_accelerations(frame) for frame in frames], len(frames)
+
+
+@benchmark('score_angle_series', SERIES_LENGTHS)
+def _score_angle_series(n):
+    series = dict(zip(ANGLE_NAMES, angle_stream(n, FPS).T))
+    return lambda: score_angle_series(series), n
+
+
+@benchmark('score_acceleration_series', SERIES_LENGTHS)
+def _score_acceleration_series(n):
+    accelerations = calculate_accelerations(dict(zip(ANGLE_NAMES, angle_stream(n, FPS).T)), FPS)
+    return lambda: score_acceleration_series(accelerations), n
+
+
+@benchmark('analyze_all_angles')
+def _analyze_all_angles():
+    angles = angle_stream(FPS, FPS)
+    frames = [{phase: dict(zip(ANGLE_NAMES, row)) for phase in angledist.distribution_table.phases}
+              for row in angles.tolist()]
+    return lambda: [angledist.analyze_all_angles(phases) for phases in frames], len(frames)
+
+
+@benchmark('DistributionTable.score', SERIES_LENGTHS)
+def _distribution_table(n):
+    angles = angle_stream(n, FPS)
+    return lambda: angledist.distribution_table.score(angles, "Peak Angle", ANGLE_NAMES), n
+
+
+@benchmark('LESS items')
+def _less_items():
+    angles = (180 - angle_stream(FPS, FPS)).tolist()
+
+    def run():
+        for knee_ic, knee_peak, hip_ic, hip_peak, *_ in angles:
+            items = [
+                LESS.knee_flexion_angle_at_initial_contact(knee_ic),
+                LESS.hip_flexion_angle_at_initial_contact(hip_ic),
+                LESS.trunk_flexion_angle_at_initial_contact(1),
+                LESS.ankle_plantar_flexion_angle_at_initial_contact('toe_to_heel'),
+                LESS.knee_valgus_angle_at_initial_contact(0),
+                LESS.lateral_trunk_flexion_angle_at_initial_contact(False),
+                LESS.stance_width_wide(1, 1),
+                LESS.stance_width_narrow(1, 1),
+                LESS.foot_position_toe_in(0),
+                LESS.foot_position_toe_out(0),
+                LESS.symmetric_initial_foot_contact(True),
+                LESS.knee_flexion_displacement(knee_ic, knee_peak),
+                LESS.hip_flexion_at_max_knee_flexion(hip_ic, hip_peak),
+                LESS.trunk_flexion_at_max_knee_flexion(0, 1),
+                LESS.knee_valgus_displacement(0),
+                LESS.joint_displacement('soft'),
+                LESS.overall_impression('excellent'),
+            ]
+            LESS.interpret_less_score(LESS.calculate_less_score(items))
+    return run, len(angles)
+
+
+@benchmark('LESS engine.score_landmarks')
+def _less_engine():
+    landmarks = landmark_stream(2 * FPS, FPS)
+    # The synthetic stream has no drop, so the landing events are given
+    events = {'initial_contact': 0, 'max_knee_flexion': FPS // 2}
+    return lambda: engine.score_landmarks(landmarks, FPS, events=events), len(landmarks)
+
+
+@benchmark('LESS engine.score_items', SERIES_LENGTHS)
+def _less_engine_items(n):
+    rng = np.random.default_rng(0)
+    inputs = {name: rng.normal(0, 30, n) for name in [
+        'knee_flexion_ic', 'hip_flexion_ic', 'trunk_flexion_ic', 'foot_pitch_ic', 'knee_valgus_ic',
+        'lateral_trunk_flexion_ic', 'stance_width', 'shoulder_width', 'max_foot_rotation', 'min_foot_rotation',
+        'contact_asymmetry', 'knee_flexion_displacement', 'hip_flexion_displacement', 'trunk_flexion_displacement',
+        'max_knee_valgus']}
+    return lambda: engine.score_items(inputs), n
+
+
+def time_call(fn, target_seconds=TARGET_SECONDS, repeats=REPEATS):
+    """Fastest seconds per call of `fn`, with the number of calls per repeat calibrated to target_seconds."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * target_seconds / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeats, number=number)) / number
+
+
+def run_benchmarks(pattern=None):
+    """
+    Time every benchmark whose name contains `pattern`.
+    Returns:
+    dict: Report with environment 'meta' and per-benchmark 'results' (seconds per call and per item).
+    """
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        fn, items = setup()
+        seconds = time_call(fn)
+        results[name] = {'seconds': seconds, 'items': items, 'seconds_per_item': seconds / items}
+    meta = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def baseline_path(name):
+    """A report path as given, or the file of a named baseline in BASELINE_DIR."""
+    if name.endswith('.json') or os.sep in name:
+        return name
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_report(report, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Per-benchmark ratio of current to baseline time.
+    Returns:
+    list: (name, baseline seconds, current seconds, ratio, regressed) for benchmarks present in both,
+    where regressed means the current time exceeds the baseline by more than `threshold`.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['seconds_per_item']
+        after = result['seconds_per_item']
+        ratio = after / before
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def format_results(report):
+    lines = [f"{'benchmark':<48}{'items':>8}{'ms/call':>12}{'us/item':>12}"]
+    for name, result in report['results'].items():
+        lines.append(f"{name:<48}{result['items']:>8}{result['seconds'] * 1e3:>12.3f}{result['seconds_per_item'] * 1e6:>12.3f}")
+    return '\n'.join(lines)
+
+
+def format_comparison(rows):
+    lines = [f"{'benchmark':<48}{'before us/item':>16}{'after us/item':>16}{'ratio':>8}"]
+    for name, before, after, ratio, regressed in rows:
+        line = f"{name:<48}{before * 1e6:>16.3f}{after * 1e6:>16.3f}{ratio:>8.2f}"
+        if regressed:
+            line += "  SLOWER"
+        lines.append(line)
+    return '\n'.join(lines)
@@ -0,0 +1,41 @@
+"""
+Synthetic pose data, so the benchmarks run without a video or a camera.
+"""
+
+import numpy as np
+
+from tools import (LEFT_ANKLE, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, NUM_LANDMARKS, RIGHT_ANKLE, RIGHT_HIP, RIGHT_KNEE,
+                   RIGHT_SHOULDER, calculate_pose_angles_batch)
+
+# Normalized image coordinates of a person standing facing the camera
+_STANDING = {
+    LEFT_SHOULDER: (0.55, 0.30, 0.0), RIGHT_SHOULDER: (0.45, 0.30, 0.0),
+    LEFT_HIP: (0.53, 0.55, 0.0), RIGHT_HIP: (0.47, 0.55, 0.0),
+    LEFT_KNEE: (0.53, 0.72, 0.0), RIGHT_KNEE: (0.47, 0.72, 0.0),
+    LEFT_ANKLE: (0.53, 0.90, 0.0), RIGHT_ANKLE: (0.47, 0.90, 0.0),
+}
+
+
+def landmark_stream(n_frames, fps=240, seed=0):
+    """
+    (n_frames, 33, 3) float32 landmarks of repeated squat-like landings with tracking noise.
+    """
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.4, 0.6, (NUM_LANDMARKS, 3)).astype(np.float32)
+    for index, point in _STANDING.items():
+        base[index] = point
+    t = np.arange(n_frames) / fps
+    # Knees travel forward (z) and collapse inwards (x) while the hips drop, once per second
+    flexion = 0.5 - 0.5 * np.cos(2 * np.pi * t)
+    landmarks = np.repeat(base[None], n_frames, axis=0)
+    landmarks[:, [LEFT_KNEE, RIGHT_KNEE], 2] -= 0.12 * flexion[:, None]
+    landmarks[:, LEFT_KNEE, 0] -= 0.02 * flexion
+    landmarks[:, RIGHT_KNEE, 0] += 0.02 * flexion
+    landmarks[:, [LEFT_HIP, RIGHT_HIP, LEFT_SHOULDER, RIGHT_SHOULDER], 1] += 0.1 * flexion[:, None]
+    landmarks += rng.normal(0, 0.002, landmarks.shape).astype(np.float32)
+    return landmarks
+
+
+def angle_stream(n_frames, fps=240, seed=0):
+    """(n_frames, 8) joint angles of landmark_stream."""
+    return calculate_pose_angles_batch(landmark_stream(n_frames, fps, seed))
@@ -1,17 +1,30 @@
 import numpy as np
 
-# Classification thresholds
-angle_thresholds = {
-    'Left Knee Flexion': {'extreme': 30, 'high': 45, 'moderate': 60},
-    'Right Knee Flexion': {'extreme': 30, 'high': 45, 'moderate': 60},
-    'Left Hip Flexion': {'extreme': 15, 'high': 30, 'moderate': 45},
-    'Right Hip Flexion': {'extreme': 15, 'high': 30, 'moderate': 45},
-    'Left Knee Valgus': {'moderate': 5, 'high': 10, 'extreme': 15},
-    'Right Knee Valgus': {'moderate': 5, 'high': 10, 'extreme': 15},
-    'Left Hip Adduction': {'moderate': 10, 'high': 15, 'extreme': 20},
-    'Right Hip Adduction': {'moderate': 10, 'high': 15, 'extreme': 20}
+import config
+
+# Classification thresholds, from the scoring config (config/scoring.json), as module attributes:
+# angle_thresholds, HIGHER_IS_RISKIER (angles where higher values are riskier, e.g. Knee Valgus),
+# acceleration_thresholds and their compiled angle_threshold_table and acceleration_threshold_table
+_CONFIG_ATTRIBUTES = {
+    'angle_thresholds': 'angle_thresholds',
+    'HIGHER_IS_RISKIER': 'higher_is_riskier',
+    'acceleration_thresholds': 'acceleration_thresholds',
+    'angle_threshold_table': 'angle_threshold_table',
+    'acceleration_threshold_table': 'acceleration_threshold_table',
 }
 
+def __getattr__(name):
+    # Looked up on every access so that they follow config.reload()
+    if name in _CONFIG_ATTRIBUTES:
+        return getattr(config.current(), _CONFIG_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Risk categories indexed by the integer codes of the series scorers
+RISK_CATEGORIES = ['Normal', 'Moderate Risk', 'High Risk', 'Extreme Risk']
+# Risk code of NaN values (frames without a detection or a derivative), and its category name
+MISSING_RISK_CODE = -1
+MISSING_RISK_CATEGORY = 'Not Scored'
+
 def score_angle(value, thresholds, higher_is_riskier=False):
     """Calculate a risk score and category for an angle."""
     if higher_is_riskier:
@@ -51,17 +64,15 @@ def score_angle(value, thresholds, higher_is_riskier=False):
 
     return risk_score, risk_category
 
-def score_angles(angles):
-    """Score all angles based on risk thresholds and categorize them."""
+def score_angles(angles, tables=None):
+    """Score all angles based on risk thresholds and categorize them, from `tables` or the current scoring config."""
+    tables = tables or config.current()
     scored_angles = {}
     for angle_type, angle_value in angles.items():
-        assert angle_type in angle_thresholds, f"Angle '{angle_type}' not found in thresholds"
-        thresholds = angle_thresholds[angle_type]
-
-        # Determine if higher values are riskier (e.g., Knee Valgus, Hip Adduction)
-        higher_is_riskier = angle_type in ['Left Knee Valgus', 'Right Knee Valgus', 'Left Hip Adduction', 'Right Hip Adduction']
+        assert angle_type in tables.angle_thresholds, f"Angle '{angle_type}' not found in thresholds"
+        thresholds = tables.angle_thresholds[angle_type]
 
-        risk_score, risk_category = score_angle(angle_value, thresholds, higher_is_riskier)
+        risk_score, risk_category = score_angle(angle_value, thresholds, angle_type in tables.higher_is_riskier)
         scored_angles[angle_type] = {
             'value': angle_value,
             'risk_score': risk_score,
@@ -69,14 +80,6 @@ def score_angles(angles):
         }
     return scored_angles
 
-# Thresholds for angular accelerations (degrees/second^2)
-acceleration_thresholds = {
-    'Knee Flexion': {'moderate': 3000, 'high': 4000, 'extreme': 6000},
-    'Hip Flexion': {'moderate': 2000, 'high': 3500, 'extreme': 5500},
-    'Knee Valgus': {'moderate': 1000, 'high': 1500, 'extreme': 2500},
-    'Hip Adduction': {'moderate': 1000, 'high': 1500, 'extreme': 2500},
-}
-
 def score_acceleration(value, thresholds):
     """Calculate a risk score and category for an acceleration."""
     if value <= thresholds['moderate']:
@@ -102,8 +105,9 @@ def score_acceleration(value, thresholds):
 
     return risk_score, risk_category
 
-def score_accelerations(accelerations):
-    """Score accelerations based on risk thresholds and categorize them."""
+def score_accelerations(accelerations, tables=None):
+    """Score accelerations based on risk thresholds and categorize them, from `tables` or the current scoring config."""
+    tables = tables or config.current()
     scored_accelerations = {}
     for joint, acceleration_values in accelerations.items():
         acceleration_value = abs(acceleration_values[-1]) if len(acceleration_values) > 0 else 0
@@ -111,8 +115,8 @@ def score_accelerations(accelerations):
         # Determine the type of joint (e.g., 'Knee Flexion')
         joint_type = ' '.join(joint.split()[1:])  # Remove 'Left' or 'Right'
 
-        assert joint_type in acceleration_thresholds, f"Joint type '{joint_type}' not found in acceleration thresholds"
-        thresholds = acceleration_thresholds[joint_type]
+        assert joint_type in tables.acceleration_thresholds, f"Joint type '{joint_type}' not found in acceleration thresholds"
+        thresholds = tables.acceleration_thresholds[joint_type]
 
         risk_score, risk_category = score_acceleration(acceleration_value, thresholds)
         scored_accelerations[joint] = {
@@ -121,3 +125,67 @@ def score_accelerations(accelerations):
             'risk_category': risk_category
         }
     return scored_accelerations
+
+def score_risk_series(values, table):
+    """
+    Vectorized score_angle / score_acceleration over a whole series.
+    Parameters:
+    values (np.ndarray): Angles or accelerations, any shape.
+    table (tuple): (sign, levels) threshold table, from ScoringTables.angle_threshold_table or acceleration_threshold_table.
+    Returns:
+    tuple: (risk_scores, risk_codes) arrays shaped like `values`; codes index RISK_CATEGORIES.
+    NaN values (frames without a detection) get a NaN score and MISSING_RISK_CODE.
+    """
+    sign, (moderate, high, extreme) = table
+    values = sign * np.asarray(values, dtype=float)
+    # Same branches and arithmetic as the scalar scorers, including the jump from 33.33 to 66.66 at 'high'
+    risk_scores = np.select(
+        [values <= moderate, values >= extreme, values <= high],
+        [0.0, 100.0, ((values - moderate) / (high - moderate)) * 33.33],
+        66.66 + ((values - high) / (extreme - high)) * 33.34,
+    )
+    risk_codes = np.select([np.isnan(values), risk_scores == 0, risk_scores <= 33.33, risk_scores <= 66.66],
+                           [MISSING_RISK_CODE, 0, 1, 2], 3).astype(np.int8)
+    return risk_scores, risk_codes
+
+def risk_category_names(risk_codes):
+    """Map integer risk codes to their RISK_CATEGORIES names, MISSING_RISK_CATEGORY for MISSING_RISK_CODE."""
+    # MISSING_RISK_CODE (-1) indexes the last entry
+    return np.array(RISK_CATEGORIES + [MISSING_RISK_CATEGORY])[risk_codes]
+
+def score_angle_series(angles, tables=None):
+    """
+    Score whole angle series based on risk thresholds.
+    Parameters:
+    angles (dict): Angle series per joint, as arrays or lists.
+    tables (config.ScoringTables): Thresholds to use; defaults to the current scoring config.
+    Returns:
+    dict: Per joint, the 'value', 'risk_score' and 'risk_code' arrays.
+    """
+    angle_threshold_table = (tables or config.current()).angle_threshold_table
+    scored_angles = {}
+    for angle_type, angle_values in angles.items():
+        assert angle_type in angle_threshold_table, f"Angle '{angle_type}' not found in thresholds"
+        values = np.asarray(angle_values, dtype=float)
+        risk_scores, risk_codes = score_risk_series(values, angle_threshold_table[angle_type])
+        scored_angles[angle_type] = {'value': values, 'risk_score': risk_scores, 'risk_code': risk_codes}
+    return scored_angles
+
+def score_acceleration_series(accelerations, tables=None):
+    """
+    Score whole acceleration series based on risk thresholds, on their magnitude as score_accelerations does.
+    Parameters:
+    accelerations (dict): Acceleration series per joint, as arrays or lists.
+    tables (config.ScoringTables): Thresholds to use; defaults to the current scoring config.
+    Returns:
+    dict: Per joint, the 'value' (magnitude), 'risk_score' and 'risk_code' arrays.
+    """
+    acceleration_threshold_table = (tables or config.current()).acceleration_threshold_table
+    scored_accelerations = {}
+    for joint, acceleration_values in accelerations.items():
+        joint_type = ' '.join(joint.split()[1:])  # Remove 'Left' or 'Right'
+        assert joint_type in acceleration_threshold_table, f"Joint type '{joint_type}' not found in acceleration thresholds"
+        values = np.abs(np.asarray(acceleration_values, dtype=float))
+        risk_scores, risk_codes = score_risk_series(values, acceleration_threshold_table[joint_type])
+        scored_accelerations[joint] = {'value': values, 'risk_score': risk_scores, 'risk_code': risk_codes}
+    return scored_accelerations
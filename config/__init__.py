@@ -0,0 +1,210 @@
+"""
+Versioned scoring configuration: risk thresholds and LESS normative distributions.
+
+config/scoring.json (or the file named by LESS_SCORING_CONFIG) holds the angle and
+acceleration risk thresholds and the angle distributions per joint. Joints without a
+side are used for both the left and the right one; an explicit "Left ..." or
+"Right ..." entry sets a single side. Distributions are the angles of the excellent,
+good, moderate and poor groups of Padua et al. (2009).
+
+load_tables() compiles the file into a ScoringTables snapshot of contiguous NumPy
+arrays. current() returns the snapshot in use; reload() compiles a new one and swaps
+it in with a single assignment, so a scoring run that took the old snapshot keeps it
+to the end while the next one picks up the new tables. A file that fails to load or
+validate raises and leaves the current snapshot in place.
+"""
+
+import functools
+import json
+import os
+import threading
+import warnings
+
+import numpy as np
+
+# Schema version of the configuration file
+CONFIG_VERSION = 1
+DEFAULT_CONFIG_PATH = os.environ.get('LESS_SCORING_CONFIG', os.path.join(os.path.dirname(__file__), 'scoring.json'))
+SIDES = ["Left", "Right"]
+# Values of a distribution, in file order
+DISTRIBUTION_GROUPS = ["excellent", "good", "moderate", "poor"]
+# Columns of the compiled threshold levels
+THRESHOLD_LEVELS = ['moderate', 'high', 'extreme']
+
+
+def _by_side(entries):
+    """Entries keyed by joint type expanded to both sides, in file order; sided keys are kept as they are."""
+    expanded = {}
+    for name, value in entries.items():
+        if name.split(' ', 1)[0] in SIDES:
+            expanded[name] = value
+        else:
+            expanded.update((f"{side} {name}", value) for side in SIDES)
+    return expanded
+
+
+def _threshold_table(entries, section, default_higher_is_riskier=True):
+    """(names, signs, levels) with levels multiplied by the sign, so higher values are always riskier."""
+    names = list(entries)
+    signs = np.empty(len(names))
+    levels = np.empty((len(names), len(THRESHOLD_LEVELS)))
+    for i, (name, thresholds) in enumerate(entries.items()):
+        missing = [level for level in THRESHOLD_LEVELS if level not in thresholds]
+        if missing:
+            raise ValueError(f"{section}/{name} is missing {', '.join(missing)}")
+        signs[i] = 1.0 if thresholds.get('higher_is_riskier', default_higher_is_riskier) else -1.0
+        levels[i] = signs[i] * np.array([thresholds[level] for level in THRESHOLD_LEVELS], dtype=float)
+        if not (levels[i, 0] < levels[i, 1] < levels[i, 2]):
+            raise ValueError(f"{section}/{name}: moderate, high and extreme must get riskier in that order")
+    return names, signs, levels
+
+
+class ScoringTables:
+    """
+    One compiled, read-only scoring configuration.
+    Attributes:
+    version (int): Schema version of the file.
+    path (str): File it was loaded from, and mtime its modification time.
+    angle_thresholds, acceleration_thresholds (dict): Name to {'moderate', 'high', 'extreme'} thresholds.
+    higher_is_riskier (frozenset): Angles where higher values are riskier.
+    angle_threshold_table, acceleration_threshold_table (dict): Name to (sign, [moderate, high, extreme] * sign),
+        rows of the contiguous angle_levels and acceleration_levels arrays.
+    distribution_table (LESS.angledist.DistributionTable): Means and standard deviations as (phase, measurement) arrays.
+    distribution_values (np.ndarray): (n_phases, n_measurements, 4) group angles the table was computed from.
+    """
+
+    def __init__(self, config, path=None, mtime=None):
+        # Compiled here so that the modules using the tables can import this package at the top
+        from LESS.angledist import DistributionTable
+
+        version = config.get('version')
+        if version != CONFIG_VERSION:
+            raise ValueError(f"Scoring config version {version!r} is not supported, expected {CONFIG_VERSION}")
+        self.version = version
+        self.path = path
+        self.mtime = mtime
+
+        angles = _by_side(config['angle_thresholds'])
+        self.angle_names, self.angle_signs, self.angle_levels = _threshold_table(angles, 'angle_thresholds', False)
+        self.angle_thresholds = {name: {level: thresholds[level] for level in THRESHOLD_LEVELS}
+                                 for name, thresholds in angles.items()}
+        self.higher_is_riskier = frozenset(name for name, sign in zip(self.angle_names, self.angle_signs) if sign > 0)
+        self.angle_threshold_table = {name: (sign, levels) for name, sign, levels
+                                      in zip(self.angle_names, self.angle_signs.tolist(), self.angle_levels)}
+
+        accelerations = config['acceleration_thresholds']
+        self.acceleration_names, self.acceleration_signs, self.acceleration_levels = _threshold_table(
+            accelerations, 'acceleration_thresholds')
+        self.acceleration_thresholds = {name: {level: thresholds[level] for level in THRESHOLD_LEVELS}
+                                        for name, thresholds in accelerations.items()}
+        self.acceleration_threshold_table = {name: (sign, levels) for name, sign, levels in zip(
+            self.acceleration_names, self.acceleration_signs.tolist(), self.acceleration_levels)}
+
+        distributions = {phase: _by_side(joints) for phase, joints in config['angle_distributions'].items()}
+        phases = list(distributions)
+        measurements = list(distributions[phases[0]])
+        for phase, joints in distributions.items():
+            if list(joints) != measurements:
+                raise ValueError(f"angle_distributions/{phase} must list the same measurements as {phases[0]}")
+        self.distribution_values = np.array([[joints[m] for m in measurements] for joints in distributions.values()],
+                                            dtype=float)
+        if self.distribution_values.shape[-1:] != (len(DISTRIBUTION_GROUPS),):
+            raise ValueError(f"angle_distributions need the {', '.join(DISTRIBUTION_GROUPS)} angle of every measurement")
+        # Population standard deviation, as LESS.angledist.calculate_mean_std
+        std_devs = self.distribution_values.std(axis=-1)
+        if not (std_devs > 0).all():
+            raise ValueError("angle_distributions need different angles for the groups of every measurement")
+        self.distribution_table = DistributionTable(phases, measurements, self.distribution_values.mean(axis=-1),
+                                                    std_devs)
+
+    @functools.cached_property
+    def angle_distributions(self):
+        """Phase to measurement to AngleDistribution, for the per-angle scoring of LESS.angledist."""
+        from LESS.angledist import AngleDistribution
+        table = self.distribution_table
+        return {phase: {measurement: AngleDistribution(*self.distribution_values[i, j].tolist())
+                        for j, measurement in enumerate(table.measurements)}
+                for i, phase in enumerate(table.phases)}
+
+
+def load_tables(path=DEFAULT_CONFIG_PATH):
+    """
+    Read and compile a scoring configuration file.
+    Returns:
+    ScoringTables: The compiled snapshot.
+    Raises ValueError for a file that is not valid JSON or does not have the expected shape and types.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    with open(path) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"Scoring config {path} must hold a JSON object")
+    try:
+        return ScoringTables(config, path, mtime)
+    except KeyError as e:
+        raise ValueError(f"Scoring config {path} has no {e.args[0]!r} entry") from None
+    except (TypeError, AttributeError, IndexError) as e:
+        # A section or value of the wrong type, e.g. a list where joints are expected
+        raise ValueError(f"Scoring config {path} is malformed: {e}") from None
+
+
+_current = None
+# Modification time of a file that failed to load, not retried until it changes again
+_rejected_mtime = None
+_lock = threading.Lock()
+
+
+def current():
+    """The ScoringTables in use, loaded from DEFAULT_CONFIG_PATH on first use."""
+    tables = _current
+    if tables is None:
+        with _lock:
+            if _current is None:
+                _swap(load_tables())
+            tables = _current
+    return tables
+
+
+def _swap(tables):
+    global _current
+    _current = tables
+
+
+def reload(path=None):
+    """
+    Compile a configuration file and make it the current one.
+    Parameters:
+    path (str): File to load; defaults to the file of the current tables.
+    Returns:
+    ScoringTables: The new snapshot. Runs holding the previous one are not affected.
+    """
+    with _lock:
+        path = path or (_current.path if _current is not None else DEFAULT_CONFIG_PATH)
+        tables = load_tables(path)
+        _swap(tables)
+    return tables
+
+
+def reload_if_changed():
+    """
+    Reload the current configuration file if it was modified since it was loaded, e.g. between
+    the trials of a long-running worker. A modified file that does not load is reported once
+    with a warning and the current tables are kept.
+    Returns:
+    ScoringTables: The current snapshot, new or not.
+    """
+    global _rejected_mtime
+    tables = current()
+    try:
+        mtime = os.stat(tables.path).st_mtime_ns
+    except OSError:
+        # Mid-replacement or removed: keep scoring with what is loaded
+        return tables
+    if mtime in (tables.mtime, _rejected_mtime):
+        return tables
+    try:
+        return reload(tables.path)
+    except (OSError, ValueError) as e:
+        _rejected_mtime = mtime
+        warnings.warn(f"Keeping the scoring config loaded from {tables.path}: {e}")
+        return tables
@@ -2,62 +2,79 @@
 Evalute pose with angles ONLY for each frame of a video.
 """
 
-import cv2
-import mediapipe as mp
+import argparse
+import sys
 from tools import calculate_pose_angles
+from tools.extraction import PoseVideo, draw_landmarks, write_frame_results
+from tools.pipeline import format_stats
 
-def process_video(video_path):
-    mp_drawing = mp.solutions.drawing_utils
-    mp_pose = mp.solutions.pose
+def process_video(video_path, workers=1, headless=False, stats=False):
+    """
+    Annotate a video with joint angles.
+    Decoding, pose inference, drawing and encoding run as overlapping pipeline stages.
+    In headless mode nothing is drawn, encoded or shown, and cached landmarks are replayed
+    without decoding the video.
+    Returns:
+    list: One result dict per frame.
+    """
+    source = PoseVideo(video_path, workers=workers)
 
-    cap = cv2.VideoCapture(video_path)
+    fps = source.fps
+    width = source.width
+    height = source.height
     
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter('./outputs/output.mp4', fourcc, fps, (width, height))
-
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            results = pose.process(image)
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-            if results.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    image, 
-                    results.pose_landmarks, 
-                    mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=2),
-                    mp_drawing.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
-                )
-
-                current_angles = calculate_pose_angles(results.pose_landmarks.landmark, mp_pose)
+    if not headless:
+        import cv2  # Headless runs draw nothing, so they leave OpenCV unloaded on a cache hit
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter('./outputs/output.mp4', fourcc, fps, (width, height))
+
+    def analyze(index, image, landmarks, visibility, timestamp):
+        frame_result = {'frame': index, 'detected': landmarks is not None}
+        if landmarks is not None:
+            current_angles = calculate_pose_angles(landmarks)
+            frame_result['angles'] = current_angles
+
+            if not headless:
+                draw_landmarks(image, landmarks, visibility)
 
                 y = 30
                 for joint, angle in current_angles.items():
                     text = f"{joint}: Angle={angle:.2f}"
                     cv2.putText(image, text, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
                     y += 20
+        return image, frame_result
+
+    pipeline = source.pipeline(analyze, encode=None if headless else out.write, decode=not headless)
+    results = []
+    for image, frame_result in pipeline:
+        results.append(frame_result)
+        if headless:
+            continue
+
+        cv2.imshow('Pose Estimation', image)
+        if cv2.waitKey(10) & 0xFF == ord('q'):
+            break
+    pipeline.close()
+
+    source.release()
+    if not headless:
+        out.release()
+        cv2.destroyAllWindows()
+    if stats:
+        print(format_stats(pipeline.stats()), file=sys.stderr)
 
-            out.write(image)
-            cv2.imshow('Pose Estimation', image)
-            if cv2.waitKey(10) & 0xFF == ord('q'):
-                break
+    return results
 
-    cap.release()
-    out.release()
-    cv2.destroyAllWindows()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate pose angles for each frame of a video.")
+    parser.add_argument('video_path', type=str, nargs='?', default='./outputs/pose.mov', help="Path to the input video file.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for pose extraction on a cache miss.")
+    parser.add_argument('--headless', action='store_true', help="Skip drawing, video encoding and windows; only emit per-frame results.")
+    parser.add_argument('--results', type=str, default=None, help="JSON lines file for the per-frame results in headless mode (default: stdout).")
+    parser.add_argument('--stats', action='store_true', help="Print per-stage pipeline throughput to stderr.")
 
-# Global variable for MediaPipe Pose
-mp_pose = mp.solutions.pose
+    args = parser.parse_args()
 
-process_video('./outputs/pose.mov')
\ No newline at end of file
+    results = process_video(args.video_path, workers=args.workers, headless=args.headless, stats=args.stats)
+    if args.headless:
+        write_frame_results(results, args.results)
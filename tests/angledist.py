@@ -0,0 +1,37 @@
+import numpy as np
+
+from LESS.angledist import (CATEGORY_NAMES, angle_distributions, analyze_angle, category_names,
+                            distribution_table)
+
+
+rng = np.random.default_rng(0)
+
+
+def test_table_matches_distributions():
+    for phase, measurements in angle_distributions.items():
+        for measurement, distribution in measurements.items():
+            # Samples around the category boundaries as well as random ones
+            boundaries = distribution.mean + distribution.std_dev * np.array([-1.5, -0.5, 0.5])
+            angles = np.concatenate([rng.normal(distribution.mean, 2 * distribution.std_dev, 50), boundaries, [np.nan]])
+            zscores, codes = distribution_table.score(angles[:, None], phase, [measurement])
+            for angle, zscore, code in zip(angles, zscores[:, 0], codes[:, 0]):
+                expected = analyze_angle(angle, distribution)
+                assert CATEGORY_NAMES[code] == expected['category']
+                assert np.isnan(angle) or np.isclose(zscore, expected['zscore'])
+
+
+def test_all_phases_in_one_call():
+    angles = rng.normal(0, 30, (20, len(distribution_table.phases), len(distribution_table.measurements)))
+    zscores, codes = distribution_table.score(angles)
+    assert zscores.shape == codes.shape == angles.shape
+    for i, phase in enumerate(distribution_table.phases):
+        phase_zscores, phase_codes = distribution_table.score(angles[:, i], phase)
+        assert np.allclose(zscores[:, i], phase_zscores)
+        assert np.array_equal(codes[:, i], phase_codes)
+    assert set(category_names(codes).ravel()) <= set(CATEGORY_NAMES)
+
+
+if __name__ == "__main__":
+    test_table_matches_distributions()
+    test_all_phases_in_one_call()
+    print("Distribution table scoring matches the per-angle scoring")
@@ -0,0 +1,29 @@
+from benchmarks.suite import BENCHMARKS, compare_reports, run_benchmarks
+
+
+def report(**seconds_per_item):
+    return {'meta': {}, 'results': {name: {'seconds': value, 'items': 1, 'seconds_per_item': value}
+                                    for name, value in seconds_per_item.items()}}
+
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = report(fast=1.0, steady=1.0, slower=1.0, removed=1.0)
+    current = report(fast=0.5, steady=1.2, slower=1.5, added=2.0)
+    rows = {row[0]: row for row in compare_reports(baseline, current, threshold=0.25)}
+    # Only benchmarks in both reports are compared
+    assert set(rows) == {'fast', 'steady', 'slower'}
+    assert not rows['fast'][4] and not rows['steady'][4]
+    assert rows['slower'][4] and rows['slower'][3] == 1.5
+
+
+def test_benchmarks_run():
+    assert 'calculate_velocities[n=240]' in BENCHMARKS
+    results = run_benchmarks('DistributionTable.score[n=240]')['results']
+    assert list(results) == ['DistributionTable.score[n=240]']
+    assert results['DistributionTable.score[n=240]']['seconds'] > 0
+
+
+if __name__ == "__main__":
+    test_compare_flags_regressions_over_threshold()
+    test_benchmarks_run()
+    print("Benchmark compare OK")
@@ -0,0 +1,138 @@
+import numpy as np
+from scipy.signal import savgol_filter
+
+from tools import MAX_TIMESTAMP_GAP, calculate_accelerations, calculate_velocities, timestamped_derivative
+from tools.streaming import StreamingPolyfit, StreamingSavgol, StreamingDerivatives
+
+
+fps = 240
+dt = 1 / fps
+window_length = 31
+rng = np.random.default_rng(0)
+angle_series = 150 + np.cumsum(rng.normal(0, 0.5, size=(200, 3)), axis=0)
+
+
+def test_newest_sample_matches_savgol_filter():
+    stream = StreamingSavgol(3, window_length, 2, deriv=1, delta=dt)
+    for i, values in enumerate(angle_series):
+        result = stream.push(values)
+        if i + 1 < window_length:
+            assert result is None
+        else:
+            expected = savgol_filter(angle_series[:i + 1], window_length, 2, deriv=1, delta=dt, axis=0)[-1]
+            np.testing.assert_allclose(result, expected, rtol=1e-8, atol=1e-6)
+
+
+def test_centered_position_matches_interior():
+    stream = StreamingSavgol(3, window_length, 2, deriv=2, delta=dt, pos=window_length // 2)
+    expected = savgol_filter(angle_series, window_length, 2, deriv=2, delta=dt, axis=0)
+    for i, values in enumerate(angle_series):
+        result = stream.push(values)
+        if result is not None:
+            np.testing.assert_allclose(result, expected[i - window_length // 2], rtol=1e-8, atol=1e-6)
+
+
+def test_streaming_derivatives_dicts():
+    joints = ["Left Knee Flexion", "Right Knee Flexion", "Left Hip Flexion"]
+    derivatives = StreamingDerivatives(joints, fps)
+    for i, values in enumerate(angle_series):
+        velocities, accelerations, jerks = derivatives.push(dict(zip(joints, values)))
+        assert bool(velocities) == (i + 1 >= window_length)
+        assert bool(jerks) == (i + 1 >= 2 * window_length - 1)
+    expected = savgol_filter(angle_series, window_length, 2, deriv=2, delta=dt, axis=0)[-1]
+    np.testing.assert_allclose([accelerations[joint] for joint in joints], expected, rtol=1e-8, atol=1e-6)
+
+
+def test_polyfit_uses_real_sample_times():
+    # Even timestamps give the Savitzky-Golay result
+    polyfit = StreamingPolyfit(3, window_length, 2, deriv=1)
+    savgol = StreamingSavgol(3, window_length, 2, deriv=1, delta=dt)
+    for i, values in enumerate(angle_series):
+        result, expected = polyfit.push(values, 100 + i * dt), savgol.push(values)
+        if expected is not None:
+            np.testing.assert_allclose(result, expected, rtol=1e-6, atol=1e-6)
+
+    # Frames dropped at random do not change the derivative of a quadratic
+    times = np.sort(rng.choice(np.arange(400), 120, replace=False)) * dt
+    derivatives = StreamingDerivatives(["Left Knee Flexion"], window_length=15)
+    for t in times:
+        velocities, accelerations, _ = derivatives.push({"Left Knee Flexion": 150 - 30 * t + 200 * t ** 2}, t)
+    np.testing.assert_allclose(velocities["Left Knee Flexion"], -30 + 400 * times[-1], rtol=1e-6)
+    np.testing.assert_allclose(accelerations["Left Knee Flexion"], 400, rtol=1e-6)
+
+
+def test_timestamped_derivative_matches_savgol_filter():
+    timestamps = 5 + np.arange(len(angle_series)) * dt
+    for deriv in (1, 2):
+        expected = savgol_filter(angle_series, window_length, 2, deriv=deriv, delta=dt, axis=0)
+        np.testing.assert_allclose(timestamped_derivative(angle_series, timestamps, deriv), expected, rtol=1e-8, atol=1e-6)
+
+
+def test_missed_detections_keep_the_time_axis():
+    timestamps = np.arange(300) * dt
+    knee = 150 - 30 * timestamps + 200 * timestamps ** 2
+    knee[rng.choice(300, 60, replace=False)] = np.nan
+    # A gap longer than MAX_TIMESTAMP_GAP splits the series
+    gap = slice(150, 150 + int(2 * MAX_TIMESTAMP_GAP * fps))
+    knee[gap] = np.nan
+    accelerations = calculate_accelerations({"Left Knee Flexion": knee}, fps, timestamps)["Left Knee Flexion"]
+    detected = ~np.isnan(knee)
+    np.testing.assert_allclose(accelerations[detected], 400, rtol=1e-6)
+    assert np.isnan(accelerations[~detected]).all()
+
+
+def test_streaming_restarts_after_a_gap():
+    # Dropped frames, then a dropout longer than MAX_TIMESTAMP_GAP
+    times = np.sort(rng.choice(np.arange(120), 90, replace=False)) * dt
+    times = np.concatenate([times, times[-1] + 2 * MAX_TIMESTAMP_GAP + np.arange(60) * dt])
+    series = angle_series[:len(times)]
+    derivatives = StreamingDerivatives(["a", "b", "c"], window_length=window_length)
+    results = [derivatives.push(dict(zip("abc", values)), t) for values, t in zip(series, times)]
+    velocity = timestamped_derivative(series, times, 1, window_length)
+    acceleration = timestamped_derivative(series, times, 2, window_length)
+    # Nothing until the window refills after the gap, then the newest sample of the offline fit
+    assert [bool(r[0]) for r in results[90:]] == [False] * (window_length - 1) + [True] * (60 - window_length + 1)
+    for i in (89, len(times) - 1):
+        velocities, accelerations, _ = results[i]
+        np.testing.assert_allclose(list(velocities.values()), velocity[i], rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(list(accelerations.values()), acceleration[i], rtol=1e-6, atol=1e-6)
+
+
+def test_slow_analysis_rate_is_not_a_gap():
+    # Five analysed frames per second, each interval longer than MAX_TIMESTAMP_GAP, then a 2 s dropout
+    times = np.concatenate([np.arange(40) * 0.2, 10 + np.arange(20) * 0.2])
+    knee = 150 - 30 * times + 2 * times ** 2
+    derivatives = StreamingDerivatives(["Left Knee Flexion"], window_length=15)
+    results = [derivatives.push({"Left Knee Flexion": value}, t)[0] for value, t in zip(knee, times)]
+    # Only the first interval, before the rate is known, and the dropout restart the window
+    assert [bool(r) for r in results] == [False] * 15 + [True] * 25 + [False] * 14 + [True] * 6
+    np.testing.assert_allclose(results[-1]["Left Knee Flexion"], -30 + 4 * times[-1], rtol=1e-6)
+    offline = calculate_velocities({"Left Knee Flexion": knee}, 5, times, window_length=15)["Left Knee Flexion"]
+    np.testing.assert_allclose(offline, -30 + 4 * times, rtol=1e-6, atol=1e-6)
+
+
+def test_repeated_timestamps_are_rejected():
+    timestamps = np.arange(len(angle_series)) * dt
+    timestamps[50] = timestamps[49]
+    polyfit = StreamingPolyfit(3, 5, 2, deriv=1)
+    for derive in (lambda: timestamped_derivative(angle_series, timestamps, 1),
+                   lambda: [polyfit.push(angle_series[i], t) for i, t in enumerate([0, dt, dt])]):
+        try:
+            derive()
+        except ValueError as e:
+            assert 'increase' in str(e)
+        else:
+            raise AssertionError("repeated timestamps were accepted")
+
+
+if __name__ == "__main__":
+    test_newest_sample_matches_savgol_filter()
+    test_centered_position_matches_interior()
+    test_streaming_derivatives_dicts()
+    test_polyfit_uses_real_sample_times()
+    test_timestamped_derivative_matches_savgol_filter()
+    test_missed_detections_keep_the_time_axis()
+    test_streaming_restarts_after_a_gap()
+    test_slow_analysis_rate_is_not_a_gap()
+    test_repeated_timestamps_are_rejected()
+    print("Streaming derivatives match savgol_filter")
@@ -0,0 +1,70 @@
+import numpy as np
+
+from tools.events import detect_initial_contact, detect_max_knee_flexion, detect_landing_events
+
+
+fps = 240
+t = np.arange(int(1.5 * fps)) / fps
+contact_frame = int(0.6 * fps)
+peak_frame = contact_frame + int(0.15 * fps)
+
+# Standing on a box, a ballistic drop to the ground, then still on the ground
+drop_start = contact_frame - int(np.sqrt(2 * 0.3 / 9.81) * fps)
+ankle_height = np.full_like(t, 0.5)
+falling = np.arange(drop_start, contact_frame)
+ankle_height[falling] = 0.5 + 0.5 * 9.81 * ((falling - drop_start) / fps) ** 2
+ankle_height[contact_frame:] = ankle_height[contact_frame - 1]
+
+# Knee straight until contact, flexes to a peak, then extends again
+knee_angle = np.full_like(t, 170.0)
+stance = np.arange(contact_frame, len(t))
+knee_angle[stance] = 170 - 70 * np.sin(np.pi / 2 * np.minimum((stance - contact_frame) / (peak_frame - contact_frame), 2))
+
+
+def test_initial_contact_and_peak_flexion():
+    initial_contact = detect_initial_contact(ankle_height, fps)
+    assert abs(initial_contact - contact_frame) <= 5
+    assert abs(detect_max_knee_flexion(knee_angle, initial_contact, fps) - peak_frame) <= 3
+
+
+def test_missing_detections_are_bridged():
+    landmarks = np.zeros((len(t), 33, 3))
+    landmarks[:, 27:29, 1] = ankle_height[:, np.newaxis]
+    angles = np.repeat(knee_angle[:, np.newaxis], 8, axis=1)
+    landmarks[100:110] = np.nan
+    angles[100:110] = np.nan
+    events = detect_landing_events(landmarks, angles, fps)
+    assert abs(events['initial_contact'] - contact_frame) <= 5
+    assert abs(events['max_knee_flexion'] - peak_frame) <= 3
+
+
+def test_brief_extension_does_not_end_flexion():
+    # A 50 ms hitch early in the flexion phase, where the knee briefly extends before flexing on
+    hitch = knee_angle.copy()
+    hitch_frame = contact_frame + int(0.03 * fps)
+    bump = np.arange(int(0.05 * fps))
+    hitch[hitch_frame + bump] += np.sin(np.pi * bump / len(bump)) * 30
+    peak = detect_max_knee_flexion(hitch, contact_frame, fps)
+    assert abs(peak - peak_frame) <= 3
+    assert hitch[peak] <= hitch[contact_frame]
+
+
+def test_no_landing():
+    assert detect_initial_contact(np.full(200, 0.5), fps) is None
+
+
+def test_peak_flexion_comes_after_contact():
+    # A knee that only extends after contact still gets a later frame than the contact
+    extending = np.linspace(120, 170, len(t))
+    assert detect_max_knee_flexion(extending, contact_frame, fps) == contact_frame + 1
+    # Nothing after a contact on the last frame
+    assert detect_max_knee_flexion(knee_angle, len(t) - 1, fps) is None
+
+
+if __name__ == "__main__":
+    test_initial_contact_and_peak_flexion()
+    test_missing_detections_are_bridged()
+    test_brief_extension_does_not_end_flexion()
+    test_no_landing()
+    test_peak_flexion_comes_after_contact()
+    print("Landing events detected")
@@ -0,0 +1,48 @@
+import numpy as np
+
+from tools import MAX_TIMESTAMP_GAP, calculate_accelerations
+from tools.filters import OneEuroFilter, create_landmark_filter, filter_landmarks
+
+fps = 240
+rng = np.random.default_rng(0)
+
+
+def test_one_euro_damps_jitter_and_follows_motion():
+    n = 2 * fps
+    timestamps = np.arange(n) / fps
+    still = np.full((n, 33, 3), 0.5)
+    jitter = rng.normal(0, 0.005, still.shape)
+    smoothed = filter_landmarks(still + jitter, timestamps, OneEuroFilter())
+    assert np.std(smoothed[fps:] - still[fps:]) < 0.3 * np.std(jitter)
+
+    # A steady movement is followed with a bounded lag
+    moving = still + 0.5 * timestamps[:, None, None]
+    smoothed = filter_landmarks(moving, timestamps, OneEuroFilter())
+    assert np.abs(smoothed[fps:] - moving[fps:]).max() < 0.1
+
+
+def test_missed_detections_pass_through_and_gaps_restart():
+    smooth = create_landmark_filter('one-euro')
+    assert smooth(None, 0.0) is None
+    smooth(np.zeros((33, 3)), 0.0)
+    assert np.all(smooth(np.ones((33, 3)), 1 / fps) < 1)
+    # After a gap the filter starts over from the new landmarks
+    np.testing.assert_array_equal(smooth(np.ones((33, 3)), 1 / fps + 2 * MAX_TIMESTAMP_GAP), 1)
+    assert create_landmark_filter('none') is None
+
+    landmarks = np.zeros((3, 33, 3))
+    landmarks[1] = np.nan
+    assert np.isnan(filter_landmarks(landmarks, np.arange(3) / fps, OneEuroFilter())[1]).all()
+
+
+def test_derivative_window_is_configurable():
+    angles = {'joint': 150 + 100 * (np.arange(100) / fps) ** 2}
+    assert calculate_accelerations(angles, fps, window_length=101) == {}
+    np.testing.assert_allclose(calculate_accelerations(angles, fps, window_length=11)['joint'], 200, rtol=1e-6)
+
+
+if __name__ == "__main__":
+    test_one_euro_damps_jitter_and_follows_motion()
+    test_missed_detections_pass_through_and_gaps_restart()
+    test_derivative_window_is_configurable()
+    print("Landmark filters OK")
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import numpy as np
+
+from tools.history import RingHistory, load_spill
+
+
+def test_keeps_the_last_rows_and_spills_the_rest():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'angles.f32')
+        history = RingHistory(['a', 'b'], horizon=4, spill_path=path)
+        for i in range(10):
+            history.append({'a': i, 'b': -i} if i != 5 else {'a': i})
+        assert len(history) == 4 and history.count == 10
+        np.testing.assert_array_equal(history.values()[:, 0], [6, 7, 8, 9])
+
+        everything = history.values(include_spilled=True)
+        assert everything.dtype == np.float32
+        np.testing.assert_array_equal(everything[:, 0], np.arange(10))
+        # Channels missing from a row are NaN
+        assert np.isnan(everything[5, 1]) and everything[4, 1] == -4
+        history.close()
+        np.testing.assert_array_equal(load_spill(path, 2)[:, 0], np.arange(6))
+
+
+def test_short_history_is_not_padded():
+    history = RingHistory(['a'], horizon=8)
+    history.append([1.0])
+    history.append([2.0])
+    np.testing.assert_array_equal(history.series()['a'], [1.0, 2.0])
+
+
+if __name__ == "__main__":
+    test_keeps_the_last_rows_and_spills_the_rest()
+    test_short_history_is_not_padded()
+    print("History OK")
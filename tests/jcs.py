@@ -0,0 +1,88 @@
+import numpy as np
+
+from tools import (LEFT_ANKLE, LEFT_FOOT_INDEX, LEFT_HEEL, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, RIGHT_ANKLE,
+                   RIGHT_FOOT_INDEX, RIGHT_HEEL, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER)
+from tools.jcs import JCS_ANGLE_NAMES, calculate_jcs_angles_batch
+
+# Anatomical axes (anterior, up, right) of an athlete facing the camera, in MediaPipe's
+# world coordinates: x to the image right, y down, z away from the camera
+FACING_CAMERA = np.array([[0, 0, -1], [0, -1, 0], [-1, 0, 0]], dtype=float).T
+
+
+def _rotation(axis, degrees):
+    c, s = np.cos(np.radians(degrees)), np.sin(np.radians(degrees))
+    i, j = [(1, 2), (2, 0), (0, 1)][axis]
+    rotation = np.eye(3)
+    rotation[i, i] = rotation[j, j] = c
+    rotation[i, j], rotation[j, i] = -s, s
+    return rotation
+
+
+def _joint(flexion, adduction, rotation):
+    """Rotation about Z, then the floating X, then Y, from angles in the JCS sign of the right leg."""
+    return _rotation(2, flexion) @ _rotation(0, adduction) @ _rotation(1, rotation)
+
+
+def pose(hip=(0, 0, 0), knee=(0, 0, 0), body=np.eye(3)):
+    """
+    (33, 3) world landmarks with the given (flexion, adduction, internal rotation) of both hips and
+    (flexion, varus, internal rotation) of both knees in degrees, mirrored on the left leg.
+    """
+    pelvis = body @ FACING_CAMERA
+    landmarks = np.zeros((33, 3))
+    for side, sign in ((0, -1), (1, 1)):
+        hip_index, knee_index, ankle, heel, toe, shoulder = (
+            (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE, LEFT_HEEL, LEFT_FOOT_INDEX, LEFT_SHOULDER) if side == 0 else
+            (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE, RIGHT_HEEL, RIGHT_FOOT_INDEX, RIGHT_SHOULDER))
+        landmarks[hip_index] = pelvis @ [0, 0, sign * 0.1]
+        landmarks[shoulder] = landmarks[hip_index] + pelvis @ [0, 0.5, 0]
+        thigh = pelvis @ _joint(hip[0], sign * hip[1], sign * hip[2])
+        landmarks[knee_index] = landmarks[hip_index] - thigh @ [0, 0.4, 0]
+        shank = thigh @ _joint(-knee[0], sign * knee[1], sign * knee[2])
+        landmarks[ankle] = landmarks[knee_index] - shank @ [0, 0.4, 0]
+        landmarks[heel] = landmarks[ankle] + shank @ [-0.05, -0.05, 0]
+        landmarks[toe] = landmarks[heel] + shank @ [0.2, 0.02, 0]
+    return landmarks
+
+
+def _angles(**kwargs):
+    return dict(zip(JCS_ANGLE_NAMES, calculate_jcs_angles_batch(pose(**kwargs)[np.newaxis])[0]))
+
+
+def test_standing_is_zero():
+    np.testing.assert_allclose(list(_angles().values()), 0, atol=1e-9)
+
+
+def test_landing_angles():
+    # Flexion, adduction and internal rotation of the hip, with a bent knee and internally rotated tibia
+    body = _rotation(1, 35) @ _rotation(0, 10)
+    angles = _angles(hip=(30, 10, 15), knee=(60, 0, 10), body=body)
+    for side in ("Left", "Right"):
+        np.testing.assert_allclose(angles[f"{side} Hip Flexion"], -30, atol=1e-6)
+        np.testing.assert_allclose(angles[f"{side} Hip Adduction"], 10, atol=1e-6)
+        np.testing.assert_allclose(angles[f"{side} Hip Rotation"], 15, atol=1e-6)
+        np.testing.assert_allclose(angles[f"{side} Knee Flexion"], 60, atol=1e-6)
+        np.testing.assert_allclose(angles[f"{side} Knee Valgus"], 0, atol=1e-6)
+        np.testing.assert_allclose(angles[f"{side} Tibial Rotation"], 10, atol=1e-6)
+
+
+def test_straight_knee_valgus():
+    # Without knee flexion the thigh axes follow the pelvis, so a valgus knee is measured as such
+    angles = _angles(hip=(0, 5, 0), knee=(0, -8, 0))
+    for side in ("Left", "Right"):
+        np.testing.assert_allclose(angles[f"{side} Knee Valgus"], -8, atol=1e-6)
+        np.testing.assert_allclose(angles[f"{side} Hip Adduction"], 5, atol=1e-6)
+
+
+def test_undetected_frames_are_nan():
+    world_landmarks = np.stack([pose(), np.full((33, 3), np.nan)])
+    angles = calculate_jcs_angles_batch(world_landmarks)
+    assert np.isfinite(angles[0]).all() and np.isnan(angles[1]).all()
+
+
+if __name__ == "__main__":
+    test_standing_is_zero()
+    test_landing_angles()
+    test_straight_knee_valgus()
+    test_undetected_frames_are_nan()
+    print("JCS angles OK")
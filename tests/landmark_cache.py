@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+import numpy as np
+
+from tools import landmark_cache
+from tools.extraction import FrameClock
+from tools.landmark_cache import LandmarkRecorder, LandmarkTrack
+
+
+def make_track():
+    rng = np.random.default_rng(0)
+    recorder = LandmarkRecorder()
+    for index in range(10):
+        if index == 3:
+            recorder.append(None)
+        else:
+            recorder.append(rng.random((33, 3), dtype=np.float32), rng.random(33, dtype=np.float32),
+                            world_landmarks=rng.random((33, 3), dtype=np.float32))
+    return recorder.to_track(240.0, 1920, 1080, {'video_path': 'clip.mp4'})
+
+
+def test_round_trip_is_memory_mapped():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        video_path = os.path.join(cache_dir, 'clip.mp4')
+        with open(video_path, 'wb') as f:
+            f.write(b'not really a video')
+        key = landmark_cache.cache_key(video_path, cache_dir=cache_dir)
+        assert landmark_cache.load(key, cache_dir) is None
+
+        track = make_track()
+        landmark_cache.save(key, track, cache_dir)
+        cached = landmark_cache.load(key, cache_dir)
+
+        assert isinstance(cached.landmarks, np.memmap)
+        np.testing.assert_array_equal(cached.landmarks, track.landmarks)
+        np.testing.assert_array_equal(cached.visibility, track.visibility)
+        np.testing.assert_array_equal(cached.world_landmarks, track.world_landmarks)
+        assert np.isnan(cached.world_landmarks[3]).all()
+        assert cached.detected.tolist() == [index != 3 for index in range(10)]
+        assert (cached.fps, cached.width, cached.height) == (240.0, 1920, 1080)
+        # Without recorded frame times, the frames are evenly spaced
+        np.testing.assert_allclose(cached.timestamps, np.arange(10) / 240.0)
+
+
+def test_key_depends_on_content_and_pose_config():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        video_path = os.path.join(cache_dir, 'clip.mp4')
+        with open(video_path, 'wb') as f:
+            f.write(b'first take')
+        key = landmark_cache.cache_key(video_path, cache_dir=cache_dir)
+        assert key == landmark_cache.cache_key(video_path, cache_dir=cache_dir)
+        assert key != landmark_cache.cache_key(video_path, {'model_complexity': 2}, cache_dir)
+
+        with open(video_path, 'wb') as f:
+            f.write(b'second take, longer')
+        assert key != landmark_cache.cache_key(video_path, cache_dir=cache_dir)
+
+
+class _ReportedPositions:
+    """Stands in for a VideoCapture whose position is read once per frame."""
+
+    def __init__(self, milliseconds):
+        self.milliseconds = iter(milliseconds)
+
+    def get(self, prop):
+        return next(self.milliseconds)
+
+
+def test_non_increasing_timestamps_fall_back_to_fps():
+    track = make_track()
+    repeated = LandmarkTrack(track.landmarks, track.visibility, 240.0, 1920, 1080, timestamps=np.zeros(10))
+    np.testing.assert_allclose(repeated.timestamps, np.arange(10) / 240.0)
+    # Frame by frame, the reported times are kept until the first one that does not increase
+    clock = FrameClock(_ReportedPositions([0, 40, 80, 80, 0, 200]), fps=25)
+    np.testing.assert_allclose([clock() for _ in range(6)], [0, 0.04, 0.08, 0.12, 0.16, 0.2])
+
+
+if __name__ == "__main__":
+    test_round_trip_is_memory_mapped()
+    test_key_depends_on_content_and_pose_config()
+    test_non_increasing_timestamps_fall_back_to_fps()
+    print("Landmark cache round trip OK")
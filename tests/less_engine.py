@@ -0,0 +1,139 @@
+import numpy as np
+
+import LESS
+from LESS.engine import (CONTACT_SYMMETRY_SECONDS, ITEM_INPUTS, ITEM_NAMES, LATERAL_TRUNK_FLEXION, SOFT_DISPLACEMENT,
+                         STIFF_DISPLACEMENT, TOE_FIRST_PITCH, UNSCORED_ITEM, score_items, score_landmarks)
+from tools import (LEFT_ANKLE, LEFT_FOOT_INDEX, LEFT_HEEL, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, RIGHT_ANKLE,
+                   RIGHT_FOOT_INDEX, RIGHT_HEEL, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER)
+
+FPS = 240
+
+
+def landing_trial(right_delay=0.0, toe_in=0.0, fps=FPS):
+    """
+    (n_frames, 33, 3) landmarks of a drop landing facing the camera: a 0.2 s fall at 1.5 image heights
+    per second onto straight, shoulder-width feet, then knee flexion from 20 to 90 degrees in 0.3 s.
+    """
+    t = np.arange(int(1.2 * fps)) / fps
+    landmarks = np.full((len(t), 33, 3), 0.5)
+    shin, thigh, trunk = 0.2, 0.2, 0.25
+    for side, delay in ((1, 0.0), (-1, right_delay)):
+        left = side == 1
+        contact = 0.5 + delay
+        ankle_y = 0.9 - 1.5 * np.clip(contact - t, 0, 0.2)
+        progress = np.clip((t - 0.5) / 0.3, 0, 1)
+        flexion = np.radians(20 + 70 * (1 - np.cos(np.pi * progress)) / 2)
+        # Up, forward (towards the camera, -z) and across the image (x) coordinates of the leg
+        knee_up, knee_forward = shin * np.cos(flexion / 2), shin * np.sin(flexion / 2)
+        hip_up, hip_forward = knee_up + thigh * np.cos(flexion / 2), knee_forward - thigh * np.sin(flexion / 2)
+        lean = flexion / 3
+        x = 0.5 + side * 0.1
+        ankle, knee, hip = ((LEFT_ANKLE, LEFT_KNEE, LEFT_HIP) if left else (RIGHT_ANKLE, RIGHT_KNEE, RIGHT_HIP))
+        landmarks[:, ankle] = np.column_stack([np.full_like(t, x), ankle_y, np.zeros_like(t)])
+        landmarks[:, knee] = np.column_stack([np.full_like(t, x), ankle_y - knee_up, -knee_forward])
+        landmarks[:, hip] = np.column_stack([np.full_like(t, 0.5 + side * 0.05), ankle_y - hip_up, -hip_forward])
+        shoulder = LEFT_SHOULDER if left else RIGHT_SHOULDER
+        landmarks[:, shoulder] = np.column_stack([np.full_like(t, x), ankle_y - hip_up - trunk * np.cos(lean),
+                                                  -hip_forward - trunk * np.sin(lean)])
+        # Toes 20 degrees below the heel, turned medially by toe_in degrees
+        heel, toe = (LEFT_HEEL, LEFT_FOOT_INDEX) if left else (RIGHT_HEEL, RIGHT_FOOT_INDEX)
+        turn = np.radians(toe_in)
+        landmarks[:, heel] = np.column_stack([np.full_like(t, x), ankle_y + 0.01, np.full_like(t, 0.02)])
+        landmarks[:, toe] = landmarks[:, heel] + [-side * 0.08 * np.sin(turn), 0.08 * np.tan(np.radians(20)),
+                                                  -0.08 * np.cos(turn)]
+    return landmarks
+
+
+def test_score_items_matches_item_functions():
+    rng = np.random.default_rng(0)
+    n = 500
+    inputs = {
+        'knee_flexion_ic': rng.uniform(0, 60, n), 'hip_flexion_ic': rng.uniform(-20, 20, n),
+        'trunk_flexion_ic': rng.uniform(-20, 20, n), 'foot_pitch_ic': rng.uniform(-30, 30, n),
+        'knee_valgus_ic': rng.uniform(-10, 10, n), 'lateral_trunk_flexion_ic': rng.uniform(0, 20, n),
+        'stance_width': rng.uniform(0.1, 0.3, n), 'shoulder_width': rng.uniform(0.1, 0.3, n),
+        'max_foot_rotation': rng.uniform(-10, 50, n), 'min_foot_rotation': rng.uniform(-50, 10, n),
+        'contact_asymmetry': rng.uniform(0, 0.05, n), 'knee_flexion_displacement': rng.uniform(20, 90, n),
+        'hip_flexion_displacement': rng.uniform(-20, 60, n), 'trunk_flexion_displacement': rng.uniform(-20, 20, n),
+        'max_knee_valgus': rng.uniform(0, 20, n),
+    }
+    items = score_items(inputs)
+    assert items.shape == (n, len(ITEM_NAMES))
+    for i, scored in enumerate(items):
+        v = {name: values[i] for name, values in inputs.items()}
+        displacement = v['knee_flexion_displacement'] + v['hip_flexion_displacement']
+        displacement = 'soft' if displacement >= SOFT_DISPLACEMENT else 'average' if displacement >= STIFF_DISPLACEMENT else 'stiff'
+        if displacement == 'stiff' or v['max_knee_valgus'] > 10:
+            impression = 'poor'
+        elif displacement == 'soft' and v['knee_valgus_ic'] <= 0:
+            impression = 'excellent'
+        else:
+            impression = 'average'
+        expected = [
+            LESS.knee_flexion_angle_at_initial_contact(v['knee_flexion_ic']),
+            LESS.hip_flexion_angle_at_initial_contact(v['hip_flexion_ic']),
+            LESS.trunk_flexion_angle_at_initial_contact(v['trunk_flexion_ic']),
+            LESS.ankle_plantar_flexion_angle_at_initial_contact('toe_to_heel' if v['foot_pitch_ic'] > TOE_FIRST_PITCH else 'flat'),
+            LESS.knee_valgus_angle_at_initial_contact(v['knee_valgus_ic']),
+            LESS.lateral_trunk_flexion_angle_at_initial_contact(v['lateral_trunk_flexion_ic'] > LATERAL_TRUNK_FLEXION),
+            LESS.stance_width_wide(v['stance_width'], v['shoulder_width']),
+            LESS.stance_width_narrow(v['stance_width'], v['shoulder_width']),
+            LESS.foot_position_toe_in(v['max_foot_rotation']),
+            LESS.foot_position_toe_out(v['min_foot_rotation']),
+            LESS.symmetric_initial_foot_contact(v['contact_asymmetry'] <= CONTACT_SYMMETRY_SECONDS),
+            LESS.knee_flexion_displacement(v['knee_flexion_ic'], v['knee_flexion_ic'] + v['knee_flexion_displacement']),
+            LESS.hip_flexion_at_max_knee_flexion(v['hip_flexion_ic'], v['hip_flexion_ic'] + v['hip_flexion_displacement']),
+            LESS.trunk_flexion_at_max_knee_flexion(v['trunk_flexion_ic'], v['trunk_flexion_ic'] + v['trunk_flexion_displacement']),
+            LESS.knee_valgus_displacement(v['max_knee_valgus']),
+            LESS.joint_displacement(displacement),
+            LESS.overall_impression(impression),
+        ]
+        assert scored.tolist() == expected
+
+
+def test_good_landing():
+    scored = score_landmarks(landing_trial(), FPS)
+    inputs = scored['inputs']
+    assert abs(inputs['knee_flexion_ic'] - 20) < 3
+    assert inputs['knee_flexion_displacement'] > 60
+    assert abs(inputs['foot_pitch_ic'] - 20) < 1e-6
+    assert abs(inputs['stance_width'] - inputs['shoulder_width']) < 1e-9
+    # Only the knee flexion at contact is scored
+    assert scored['items'].tolist() == [1] + [0] * 16
+    assert scored['total'] == 1 and scored['interpretation'] == "Excellent" and scored['unscored'] == []
+
+
+def test_asymmetric_contact_and_toe_in():
+    items = dict(zip(ITEM_NAMES, score_landmarks(landing_trial(right_delay=0.05), FPS)['items']))
+    assert items['symmetric_initial_foot_contact'] == 1
+    items = dict(zip(ITEM_NAMES, score_landmarks(landing_trial(toe_in=40), FPS)['items']))
+    assert items['foot_position_toe_in'] == 1 and items['foot_position_toe_out'] == 0
+
+
+def test_unmeasured_items_are_unscored():
+    inputs = {name: np.nan for names in ITEM_INPUTS for name in names}
+    assert (score_items(inputs) == UNSCORED_ITEM).all()
+    # The right foot is planted throughout, so only the left foot's contact is found
+    landmarks = landing_trial()
+    landmarks[:, RIGHT_ANKLE, 1] = landmarks[-1, RIGHT_ANKLE, 1]
+    scored = score_landmarks(landmarks, FPS)
+    assert np.isnan(scored['inputs']['contact_asymmetry'])
+    assert scored['unscored'] == ['symmetric_initial_foot_contact']
+    assert dict(zip(ITEM_NAMES, scored['items']))['symmetric_initial_foot_contact'] == UNSCORED_ITEM
+    assert (np.delete(scored['items'], ITEM_NAMES.index('symmetric_initial_foot_contact')) >= 0).all()
+    assert scored['total'] is None and scored['interpretation'] is None
+
+
+def test_no_landing():
+    landmarks = landing_trial()
+    landmarks[:] = landmarks[0]
+    assert score_landmarks(landmarks, FPS) is None
+
+
+if __name__ == "__main__":
+    test_score_items_matches_item_functions()
+    test_good_landing()
+    test_asymmetric_contact_and_toe_in()
+    test_unmeasured_items_are_unscored()
+    test_no_landing()
+    print("LESS engine OK")
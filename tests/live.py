@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from tools.live import LatestFrameReader
+
+
+def _write_video(path, n_frames=60, fps=60):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (64, 48))
+    for i in range(n_frames):
+        writer.write(np.full((48, 64, 3), i * 4, dtype=np.uint8))
+    writer.release()
+
+
+def test_slow_consumer_gets_newest_frames():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'clip.mp4')
+        _write_video(path)
+        with LatestFrameReader(path, latency_budget=0.05) as reader:
+            timestamps = []
+            for frame, timestamp in reader.frames():
+                assert time.monotonic() - timestamp <= 0.05
+                timestamps.append(timestamp)
+                # Analysis three times slower than the source
+                time.sleep(3 / 60)
+        assert reader.captured == 60
+        assert len(timestamps) + reader.dropped == reader.captured
+        assert len(timestamps) < 40
+        assert np.all(np.diff(timestamps) > 0)
+
+
+class _StalledCapture:
+    """A capture whose grab() blocks until `resume` is set, like a stream that stopped sending."""
+
+    def __init__(self):
+        self.resume = threading.Event()
+        self.released = threading.Event()
+
+    def grab(self):
+        self.resume.wait()
+        return False
+
+    def release(self):
+        self.released.set()
+
+
+def test_release_does_not_hang_on_a_stalled_stream():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'clip.mp4')
+        _write_video(path, n_frames=2)
+        reader = LatestFrameReader(path)
+        reader.cap.release()
+        reader.cap = stalled = _StalledCapture()
+        reader.start()
+        start = time.monotonic()
+        reader.release(timeout=0.1)
+        assert time.monotonic() - start < 1
+        assert not stalled.released.is_set()
+        # The reader thread closes the capture once grab() returns
+        stalled.resume.set()
+        assert stalled.released.wait(1)
+
+
+if __name__ == "__main__":
+    test_slow_consumer_gets_newest_frames()
+    test_release_does_not_hang_on_a_stalled_stream()
+    print("Live reader drops stale frames")
@@ -0,0 +1,95 @@
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from LESS.engine import score_landmarks
+from tests.less_engine import FPS, landing_trial
+from tools import LEFT_KNEE
+from tools.landmark_cache import LandmarkTrack
+from tools.multiview import align_views, calculate_multiview_angles, detect_flash, resample_track, sync_offsets
+
+
+def _track(landmarks, fps=FPS, width=None, height=None):
+    return LandmarkTrack(np.asarray(landmarks, dtype=np.float32), np.ones(np.shape(landmarks)[:2], dtype=np.float32),
+                         fps, width, height)
+
+
+def _side_view(frontal):
+    """The landmarks of a person facing a frontal camera as a camera on their left sees them, facing image right."""
+    sagittal = frontal.copy()
+    sagittal[..., 0] = 0.5 - frontal[..., 2]
+    sagittal[..., 2] = frontal[..., 0] - 0.5
+    return sagittal
+
+
+def test_resample_with_offset():
+    n = 100
+    landmarks = np.zeros((n, 33, 3))
+    landmarks[..., 0] = (np.arange(n) / FPS)[:, None]
+    landmarks[50] = np.nan
+    track = _track(landmarks)
+    # A view that started 0.1 s later than the reference clock
+    times = np.arange(n) / FPS + 0.1
+    resampled, visibility = resample_track(track, times + 0.5 / FPS, offset=0.1)
+    x = resampled[:, 0, 0]
+    np.testing.assert_allclose(x[:49], np.arange(49) / FPS + 0.5 / FPS, atol=1e-6)
+    # Next to the undetected frame, and past the end of the view
+    assert np.isnan(x[[49, 50, 99]]).all() and visibility[99, 0] == 0
+
+
+def test_align_views_to_reference():
+    sagittal = _track(landing_trial())
+    frontal = _track(landing_trial()[10:])
+    aligned = align_views({'frontal': frontal, 'sagittal': sagittal}, {'frontal': 10 / FPS, 'sagittal': 0.0})
+    assert aligned['sagittal'] is sagittal
+    np.testing.assert_allclose(aligned['frontal'].landmarks[10:], sagittal.landmarks[10:], atol=1e-6)
+    assert np.isnan(aligned['frontal'].landmarks[:10]).all()
+
+
+def test_angles_routed_to_their_view():
+    frontal = landing_trial()
+    # The frontal camera sees the left knee pushed medially, the side camera does not
+    frontal[:, LEFT_KNEE, 0] -= 0.03
+    angles = calculate_multiview_angles(_track(frontal), _track(_side_view(landing_trial())))
+    single_view = calculate_multiview_angles(_track(landing_trial()), _track(_side_view(landing_trial())))
+    # Knee flexion from the side: 20 degrees at the start, as landing_trial bends it
+    np.testing.assert_allclose(180 - angles[0, 0], 20, atol=1e-4)
+    np.testing.assert_allclose(angles[:, :4], single_view[:, :4])
+    np.testing.assert_allclose(angles[:, [5, 7]], single_view[:, [5, 7]])
+    assert (np.abs(angles[:, [4, 6]] - single_view[:, [4, 6]]) > 1).all()
+
+
+def test_engine_scores_frontal_items_from_frontal_view():
+    frontal = landing_trial(toe_in=40)
+    sagittal = _side_view(frontal)
+    # Depth in the side view is unreliable: scramble it
+    sagittal[..., 2] = np.random.default_rng(0).normal(0, 0.2, sagittal.shape[:2])
+    scored = score_landmarks(sagittal, FPS, frontal=_track(frontal))
+    expected = score_landmarks(frontal, FPS)
+    assert scored['items'].tolist() == expected['items'].tolist()
+    assert abs(scored['inputs']['knee_flexion_ic'] - expected['inputs']['knee_flexion_ic']) < 1e-6
+
+
+def test_flash_sync():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for view, flash_frame in (('frontal', 20), ('sagittal', 35)):
+            paths[view] = os.path.join(tmp, f"{view}.mp4")
+            writer = cv2.VideoWriter(paths[view], cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+            for i in range(60):
+                writer.write(np.full((48, 64, 3), 200 if i == flash_frame else 30, dtype=np.uint8))
+            writer.release()
+        assert abs(detect_flash(paths['frontal']) - detect_flash(paths['sagittal']) + 15 / 30) < 1e-6
+        offsets = sync_offsets(paths, 'flash')
+        assert offsets['sagittal'] == 0 and abs(offsets['frontal'] - 15 / 30) < 1e-6
+
+
+if __name__ == "__main__":
+    test_resample_with_offset()
+    test_align_views_to_reference()
+    test_angles_routed_to_their_view()
+    test_engine_scores_frontal_items_from_frontal_view()
+    test_flash_sync()
+    print("Multi-view OK")
@@ -0,0 +1,52 @@
+import random
+import time
+
+from tools.pipeline import Pipeline, Stage
+
+
+def _jitter(x):
+    # Out-of-order completion across the workers of a stage
+    time.sleep(random.random() * 0.002)
+    return x
+
+
+def test_output_in_source_order():
+    completed = []
+    stages = [Stage('square', lambda x: _jitter(x * x), workers=4), Stage('increment', lambda x: x + 1)]
+    pipeline = Pipeline(range(200), stages, queue_size=2, on_complete=lambda: completed.append(True))
+    assert list(pipeline) == [x * x + 1 for x in range(200)]
+    assert completed == [True]
+    assert [stage['items'] for stage in pipeline.stats()] == [200, 200, 200]
+
+
+def test_stage_errors_are_raised():
+    def fail(x):
+        if x == 50:
+            raise ValueError("bad frame")
+        return x
+
+    pipeline = Pipeline(range(200), [Stage('fail', fail)])
+    try:
+        list(pipeline)
+    except ValueError as e:
+        assert str(e) == "bad frame"
+    else:
+        assert False, "the stage error was not raised"
+
+
+def test_close_stops_early():
+    completed = []
+    pipeline = Pipeline(iter(range(10 ** 6)), [Stage('identity', lambda x: x)], on_complete=lambda: completed.append(True))
+    for x in pipeline:
+        if x == 10:
+            break
+    pipeline.close()
+    assert not completed
+    assert pipeline.stats()[0]['items'] < 100
+
+
+if __name__ == "__main__":
+    test_output_in_source_order()
+    test_stage_errors_are_raised()
+    test_close_stops_early()
+    print("Pipeline stages keep order, raise errors and stop early")
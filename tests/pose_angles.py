@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from tools import (
+    ANGLE_NAMES,
+    calculate_knee_flexion_angle,
+    calculate_hip_flexion_angle,
+    calculate_knee_valgus_angle,
+    calculate_hip_adduction_angle,
+    calculate_pose_angles,
+    calculate_pose_angles_batch,
+)
+
+
+rng = np.random.default_rng(0)
+landmark_frames = rng.random((20, 33, 3)).astype(np.float32)
+
+
+def scalar_angles(frame):
+    """Angles of one frame computed with the per-joint functions."""
+    lm = [SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in frame]
+    return [
+        calculate_knee_flexion_angle(lm[23], lm[25], lm[27]),
+        calculate_knee_flexion_angle(lm[24], lm[26], lm[28]),
+        calculate_hip_flexion_angle(lm[11], lm[23], lm[25]),
+        calculate_hip_flexion_angle(lm[12], lm[24], lm[26]),
+        calculate_knee_valgus_angle(lm[23], lm[25], lm[27]),
+        calculate_knee_valgus_angle(lm[24], lm[26], lm[28]),
+        calculate_hip_adduction_angle(lm[23], lm[25]),
+        calculate_hip_adduction_angle(lm[24], lm[26]),
+    ]
+
+
+def test_batch_matches_per_joint_functions():
+    angles = calculate_pose_angles_batch(landmark_frames)
+    assert angles.shape == (len(landmark_frames), len(ANGLE_NAMES))
+    for frame, row in zip(landmark_frames, angles):
+        np.testing.assert_allclose(row, scalar_angles(frame), atol=1e-9)
+
+
+def test_per_frame_wrapper_accepts_landmark_objects_and_arrays():
+    frame = landmark_frames[0]
+    landmarks = [SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in frame]
+    from_objects = calculate_pose_angles(landmarks)
+    from_array = calculate_pose_angles(frame)
+    assert list(from_objects) == ANGLE_NAMES
+    np.testing.assert_allclose(list(from_objects.values()), scalar_angles(frame), atol=1e-9)
+    np.testing.assert_allclose(list(from_array.values()), list(from_objects.values()))
+
+
+if __name__ == "__main__":
+    test_batch_matches_per_joint_functions()
+    test_per_frame_wrapper_accepts_landmark_objects_and_arrays()
+    print("Batch pose angles match the per-joint functions")
@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+import time
+
+from tools.pipeline import Pipeline, Stage
+from tools.profiling import HISTOGRAM_EDGES, NULL_PROFILER, Profiler
+
+
+def test_report_and_trace():
+    profiler = Profiler(trace=True)
+    for _ in range(5):
+        with profiler.stage('work'):
+            time.sleep(0.002)
+        profiler.frame()
+    profiler.stop()
+    report = profiler.report()
+    work = report['stages']['work']
+    assert report['frames'] == 5 and report['fps'] > 0
+    assert work['calls'] == 5 and work['p50_seconds'] >= 0.002
+    assert len(work['histogram']) == len(HISTOGRAM_EDGES) + 1 and sum(work['histogram']) == 5
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = profiler.save_trace(os.path.join(tmp_dir, 'trace.json'))
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    assert len(spans) == 5 and all(event['dur'] >= 2000 for event in spans)
+
+
+def test_pipeline_stages_and_queues_are_recorded():
+    profiler = Profiler()
+    pipeline = Pipeline(range(20), [Stage('double', lambda x: x * 2), Stage('inc', lambda x: x + 1)], profiler=profiler)
+    assert list(pipeline) == [x * 2 + 1 for x in range(20)]
+    report = profiler.report()
+    assert {name: stage['calls'] for name, stage in report['stages'].items()} == {'decode': 20, 'double': 20, 'inc': 20}
+    assert set(report['queues']) == {'double', 'inc', 'output'}
+    assert all(queue['max_depth'] <= pipeline.queue_size for queue in report['queues'].values())
+
+
+def test_null_profiler_records_nothing():
+    with NULL_PROFILER.stage('work'):
+        pass
+    NULL_PROFILER.frame()
+    assert not NULL_PROFILER.enabled
+
+
+if __name__ == "__main__":
+    test_report_and_trace()
+    test_pipeline_stages_and_queues_are_recorded()
+    test_null_profiler_records_nothing()
+    print("Profiling OK")
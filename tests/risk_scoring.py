@@ -0,0 +1,50 @@
+import numpy as np
+
+from biomechanical import (MISSING_RISK_CATEGORY, MISSING_RISK_CODE, RISK_CATEGORIES, acceleration_thresholds,
+                           angle_thresholds, risk_category_names, score_acceleration, score_acceleration_series,
+                           score_angles, score_angle_series)
+
+
+def _samples(thresholds):
+    # Random values across all branches plus every threshold exactly
+    levels = sorted(thresholds.values())
+    values = np.random.default_rng(0).uniform(levels[0] - 20, levels[-1] + 20, 500)
+    return np.concatenate([values, levels])
+
+
+def test_angle_series_matches_score_angles():
+    for angle_type, thresholds in angle_thresholds.items():
+        values = _samples(thresholds)
+        scored = score_angle_series({angle_type: values})[angle_type]
+        for value, risk_score, risk_code in zip(values, scored['risk_score'], scored['risk_code']):
+            expected = score_angles({angle_type: value})[angle_type]
+            assert risk_score == expected['risk_score']
+            assert RISK_CATEGORIES[risk_code] == expected['risk_category']
+
+
+def test_acceleration_series_matches_score_acceleration():
+    for joint_type, thresholds in acceleration_thresholds.items():
+        values = np.concatenate([_samples(thresholds), -_samples(thresholds)])
+        scored = score_acceleration_series({f"Left {joint_type}": values})[f"Left {joint_type}"]
+        for value, risk_score, risk_code in zip(values, scored['risk_score'], scored['risk_code']):
+            expected_score, expected_category = score_acceleration(abs(value), thresholds)
+            assert risk_score == expected_score
+            assert RISK_CATEGORIES[risk_code] == expected_category
+
+
+def test_nan_values_are_not_scored():
+    # A frame without a detection between two scored ones, for the angles and the accelerations
+    values = [np.nan, 100.0, np.nan]
+    for scored in (score_angle_series({'Left Knee Flexion': values})['Left Knee Flexion'],
+                   score_acceleration_series({'Left Knee Flexion': values})['Left Knee Flexion']):
+        assert np.isnan(scored['risk_score'][[0, 2]]).all() and not np.isnan(scored['risk_score'][1])
+        assert scored['risk_code'].tolist()[0::2] == [MISSING_RISK_CODE, MISSING_RISK_CODE]
+        assert scored['risk_code'][1] != MISSING_RISK_CODE
+        assert risk_category_names(scored['risk_code'])[0] == MISSING_RISK_CATEGORY
+
+
+if __name__ == "__main__":
+    test_angle_series_matches_score_angles()
+    test_acceleration_series_matches_score_acceleration()
+    test_nan_values_are_not_scored()
+    print("Series risk scoring matches the scalar scoring")
@@ -0,0 +1,45 @@
+import numpy as np
+
+from tools.roi import RoiTracker
+
+frame = np.zeros((2160, 3840, 3), dtype=np.uint8)
+
+
+def pose_at(x, y, height=0.3):
+    """Landmarks spread over a box of `height` (frame heights) around (x, y) in normalized coordinates."""
+    landmarks = np.zeros((33, 3), dtype=np.float32)
+    landmarks[:, 1] = y + np.linspace(-height / 2, height / 2, 33)
+    landmarks[:, 0] = x + np.linspace(-0.02, 0.02, 33)
+    landmarks[:, 2] = np.linspace(-0.1, 0.1, 33)
+    return landmarks
+
+
+def test_crop_maps_back_to_full_frame():
+    roi = RoiTracker()
+    roi.crop(frame)
+    landmarks = pose_at(0.5, 0.6)
+    assert roi.update(landmarks)
+    image = roi.crop(frame)
+    assert max(image.shape[:2]) <= roi.input_size
+    x0, y0, x1, y1 = roi.box
+    # The landmarks as MediaPipe reports them for the crop
+    in_crop = np.column_stack([(landmarks[:, 0] * 3840 - x0) / (x1 - x0), (landmarks[:, 1] * 2160 - y0) / (y1 - y0),
+                               landmarks[:, 2] * 3840 / (x1 - x0)])
+    np.testing.assert_allclose(roi.to_frame(in_crop), landmarks, atol=1e-6)
+
+
+def test_box_moves_only_near_its_edge():
+    roi = RoiTracker()
+    roi.crop(frame)
+    roi.update(pose_at(0.5, 0.6))
+    box = roi.box
+    assert not roi.update(pose_at(0.505, 0.6)) and roi.box == box
+    assert roi.update(pose_at(0.6, 0.6)) and roi.box != box
+    # Without a pose the next frame is searched whole
+    assert roi.update(None) and roi.box is None
+
+
+if __name__ == "__main__":
+    test_crop_maps_back_to_full_frame()
+    test_box_moves_only_near_its_edge()
+    print("ROI tracking OK")
@@ -0,0 +1,83 @@
+import numpy as np
+
+from tools import LEFT_ANKLE, RIGHT_ANKLE
+from tools.sampling import DEFAULT_SAMPLING_CONFIG, AdaptiveSampler, interpolate_skipped
+
+FPS = 240
+
+
+def pose_with_ankles(y):
+    landmarks = np.full((33, 3), 0.5, dtype=np.float32)
+    landmarks[[LEFT_ANKLE, RIGHT_ANKLE], 1] = y
+    return landmarks
+
+
+def strides(sampler, ankle_y, times):
+    """Run the sampler the way extraction does and return the frames it infers."""
+    frames = [0]
+    while frames[-1] < len(times) - 1:
+        i = frames[-1]
+        frames.append(i + sampler.next_stride(pose_with_ankles(ankle_y[i]), times[i]))
+    return np.array(frames)
+
+
+def test_keyframes_while_still_full_rate_around_landing():
+    times = np.arange(3 * FPS) / FPS
+    # Standing, a 0.2 s fall at 1.5 image heights per second from t = 1, then standing again
+    ankle_y = 0.5 + np.clip(times - 1.0, 0, 0.2) * 1.5
+    sampler = AdaptiveSampler(FPS, **DEFAULT_SAMPLING_CONFIG)
+    assert sampler.max_stride == 8
+    inferred = strides(sampler, ankle_y, times)
+    gaps = np.diff(inferred)
+    before, landing, after = inferred[:-1] < 0.9 * FPS, (inferred[:-1] > 1.1 * FPS) & (inferred[:-1] < 1.5 * FPS), inferred[:-1] > 1.7 * FPS
+    assert np.all(gaps[before] == 8)
+    assert np.all(gaps[landing] == 1)
+    assert np.all(gaps[after] == 8)
+
+
+def test_full_rate_without_detection():
+    sampler = AdaptiveSampler(FPS, **DEFAULT_SAMPLING_CONFIG)
+    assert sampler.next_stride(None, 0.0) == 1
+
+
+def test_interpolate_skipped():
+    n = 9
+    timestamps = np.arange(n) / FPS
+    truth = np.linspace(0, 1, n)[:, None, None] * np.ones((n, 33, 3))
+    inferred = np.zeros(n, dtype=bool)
+    inferred[[0, 4, 6]] = True
+    landmarks = np.where(inferred[:, None, None], truth, np.nan)
+    visibility = np.where(inferred[:, None], 0.9, 0.0)
+    visibility[4] = 0.5
+    interpolate_skipped(landmarks, visibility, timestamps, inferred)
+    np.testing.assert_allclose(landmarks[:7], truth[:7])
+    assert visibility[2, 0] == 0.5 and visibility[5, 0] == 0.5
+    # Nothing to interpolate towards after the last inferred frame
+    assert np.isnan(landmarks[7:]).all()
+
+    # No interpolation across a frame without a detection
+    landmarks = np.where(inferred[:, None, None], truth, np.nan)
+    landmarks[4] = np.nan
+    interpolate_skipped(landmarks, visibility, timestamps, inferred)
+    assert np.isnan(landmarks[1:6]).all()
+
+
+def test_interpolate_skipped_without_time_span():
+    # Frames that report the same timestamp as the keyframes around them are spaced by index
+    n = 5
+    timestamps = np.zeros(n)
+    truth = np.linspace(0, 1, n)[:, None, None] * np.ones((n, 33, 3))
+    inferred = np.array([True, False, False, False, True])
+    landmarks = np.where(inferred[:, None, None], truth, np.nan)
+    visibility = np.ones((n, 33))
+    with np.errstate(all='raise'):
+        interpolate_skipped(landmarks, visibility, timestamps, inferred)
+    np.testing.assert_allclose(landmarks, truth)
+
+
+if __name__ == "__main__":
+    test_keyframes_while_still_full_rate_around_landing()
+    test_full_rate_without_detection()
+    test_interpolate_skipped()
+    test_interpolate_skipped_without_time_span()
+    print("Adaptive sampling OK")
@@ -0,0 +1,134 @@
+import itertools
+import json
+import os
+import tempfile
+import threading
+import warnings
+
+import numpy as np
+
+import biomechanical
+import config
+from LESS import angledist
+from tools import ANGLE_NAMES
+
+
+def _default_config():
+    with open(config.DEFAULT_CONFIG_PATH) as f:
+        return json.load(f)
+
+
+_modified = itertools.count(1)
+
+
+def _write(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    # A distinct modification time for every write, as a quick rewrite may keep the old one
+    os.utime(path, ns=(0, next(_modified) * 1_000_000_000))
+
+
+def test_tables_are_compiled_for_both_sides():
+    tables = config.load_tables()
+    assert set(tables.angle_thresholds) == set(ANGLE_NAMES)
+    assert tables.higher_is_riskier == {'Left Knee Valgus', 'Right Knee Valgus', 'Left Hip Adduction', 'Right Hip Adduction'}
+    assert tables.angle_levels.flags.c_contiguous and tables.angle_levels.shape == (len(ANGLE_NAMES), 3)
+    assert np.shares_memory(tables.angle_threshold_table['Left Knee Flexion'][1], tables.angle_levels)
+    table = tables.distribution_table
+    assert table.phases == ["Initial Contact", "Peak Angle", "Displacement"] and len(table.measurements) == 12
+    # Same mean and standard deviation as the per-angle AngleDistribution
+    distribution = tables.angle_distributions["Peak Angle"]["Right Hip Rotation"]
+    j = table.measurements.index("Right Hip Rotation")
+    assert np.isclose(table.means[1, j], distribution.mean) and np.isclose(table.std_devs[1, j], distribution.std_dev)
+
+
+def test_invalid_configs_are_rejected():
+    for change, message in (({'version': 2}, 'version'),
+                            ({'acceleration_thresholds': {'Knee Flexion': {'moderate': 1, 'high': 3, 'extreme': 2}}}, 'order')):
+        try:
+            config.ScoringTables(dict(_default_config(), **change))
+        except ValueError as e:
+            assert message in str(e)
+        else:
+            raise AssertionError(f"{change} was accepted")
+
+
+def test_reload_swaps_tables_for_new_runs_only():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scoring.json')
+        data = _default_config()
+        _write(path, data)
+        try:
+            before = config.reload(path)
+            assert config.reload_if_changed() is before
+
+            data['angle_thresholds']['Knee Valgus']['moderate'] = 8
+            data['angle_distributions']['Initial Contact']['Knee Flexion'] = [28.28, 26.61, 26.32, 25.87]
+            _write(path, data)
+            after = config.reload_if_changed()
+            assert after is not before and config.current() is after
+            assert biomechanical.angle_thresholds['Left Knee Valgus']['moderate'] == 8
+            assert angledist.distribution_table is after.distribution_table
+            # A run that took the previous snapshot keeps scoring with it
+            assert before.angle_thresholds['Left Knee Valgus']['moderate'] == 5
+            value = {'Right Knee Valgus': 6.0}
+            assert biomechanical.score_angles(value, before)['Right Knee Valgus']['risk_score'] > 0
+            assert biomechanical.score_angles(value)['Right Knee Valgus']['risk_score'] == 0
+            angles = {"Initial Contact": {"Left Knee Flexion": 20.0}}
+            assert angledist.analyze_all_angles(angles, before)["Initial Contact"]["Left Knee Flexion"]["category"] == "Excellent"
+            assert angledist.analyze_all_angles(angles)["Initial Contact"]["Left Knee Flexion"]["category"] == "Poor"
+
+            # A broken file keeps the loaded tables, with one warning per modification
+            with open(path, 'w') as f:
+                f.write('{"version": 1, "angle_thresholds": ')
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                assert config.reload_if_changed() is after
+                assert config.reload_if_changed() is after
+                # Valid JSON of the wrong shape or types as well
+                for section, value in (('angle_thresholds', []), ('acceleration_thresholds', {'Knee Flexion': 5}),
+                                       ('angle_distributions', {'Peak Angle': {'Knee Flexion': 'high'}})):
+                    _write(path, dict(data, **{section: value}))
+                    assert config.reload_if_changed() is after
+            assert len(caught) == 4
+        finally:
+            config.reload(config.DEFAULT_CONFIG_PATH)
+
+
+def test_concurrent_reloads_are_atomic():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for moderate in (5, 8):
+            data = _default_config()
+            data['angle_thresholds']['Knee Valgus']['moderate'] = moderate
+            paths.append(os.path.join(tmp, f"{moderate}.json"))
+            _write(paths[-1], data)
+        stop = threading.Event()
+
+        def reloader():
+            i = 0
+            while not stop.is_set():
+                config.reload(paths[i % 2])
+                i += 1
+
+        thread = threading.Thread(target=reloader)
+        thread.start()
+        try:
+            for _ in range(2000):
+                tables = config.current()
+                # Every snapshot is whole: its compiled table agrees with its own thresholds
+                moderate = tables.angle_thresholds['Left Knee Valgus']['moderate']
+                assert moderate in (5, 8)
+                assert tables.angle_threshold_table['Left Knee Valgus'][1][0] == moderate
+        finally:
+            stop.set()
+            thread.join()
+            config.reload(config.DEFAULT_CONFIG_PATH)
+
+
+if __name__ == "__main__":
+    test_tables_are_compiled_for_both_sides()
+    test_invalid_configs_are_rejected()
+    test_reload_swaps_tables_for_new_runs_only()
+    test_concurrent_reloads_are_atomic()
+    print("Scoring config OK")
@@ -0,0 +1,70 @@
+import tempfile
+
+import numpy as np
+
+from biomechanical import MISSING_RISK_CATEGORY, MISSING_RISK_CODE, risk_category_names
+from tools import ANGLE_NAMES, calculate_accelerations, calculate_pose_angles_batch
+from tools.filters import OneEuroFilter, filter_landmarks
+from tools.landmark_cache import LandmarkRecorder
+from tools.session import export_session, load_session, load_sessions, session_path
+
+
+def make_track(n_frames=120, fps=60.0):
+    rng = np.random.default_rng(0)
+    base = rng.random((33, 3), dtype=np.float32)
+    recorder = LandmarkRecorder()
+    for index in range(n_frames):
+        if 50 <= index < 53:
+            recorder.append(None, timestamp=index / fps)
+        else:
+            landmarks = base + 0.01 * np.sin(index / 10 + np.arange(33))[:, None].astype(np.float32)
+            recorder.append(landmarks, np.ones(33, dtype=np.float32), index / fps)
+    return recorder.to_track(fps, 640, 480, {'video_path': 'clip.mp4'})
+
+
+def test_export_round_trip():
+    track = make_track()
+    with tempfile.TemporaryDirectory() as sessions_dir:
+        path = export_session(track, session_path(sessions_dir, 'clip.mp4'))
+        session = load_session(path)
+
+        assert isinstance(session.angles, np.memmap)
+        assert len(session) == len(track) == len(session.frame)
+        assert session.meta['joints'] == ANGLE_NAMES
+        assert session.meta['landmark_filter'] == 'none'
+        np.testing.assert_array_equal(session.landmarks, track.landmarks)
+        np.testing.assert_array_equal(session.detected, track.detected)
+        np.testing.assert_allclose(session.timestamp, track.timestamps)
+
+        angles = calculate_pose_angles_batch(track.landmarks)
+        np.testing.assert_allclose(session.angles, angles, rtol=1e-6, equal_nan=True)
+        accelerations = calculate_accelerations(dict(zip(ANGLE_NAMES, angles.T)), track.fps, track.timestamps)
+        np.testing.assert_allclose(session['accelerations'][:, 0], accelerations[ANGLE_NAMES[0]], rtol=1e-5, equal_nan=True)
+        # Frames without a detection keep a NaN score and the missing code named in meta.json
+        assert np.isnan(session.acceleration_risk_score[~track.detected]).all()
+        assert session.meta['missing_risk_code'] == MISSING_RISK_CODE
+        assert session.meta['missing_risk_category'] == MISSING_RISK_CATEGORY
+        assert (session.acceleration_risk_code[~track.detected] == session.meta['missing_risk_code']).all()
+        assert (risk_category_names(session.acceleration_risk_code[~track.detected]) == MISSING_RISK_CATEGORY).all()
+        assert (session.acceleration_risk_code[track.detected] != MISSING_RISK_CODE).any()
+
+        assert [s.path for s in load_sessions(sessions_dir)] == [path]
+
+
+def test_export_filtered_landmarks():
+    track = make_track()
+    with tempfile.TemporaryDirectory() as sessions_dir:
+        session = load_session(export_session(track, session_path(sessions_dir, 'clip.mp4'), landmark_filter='one-euro'))
+
+        # The exported landmarks and angles are the filtered series the analysis used
+        assert session.meta['landmark_filter'] == 'one-euro'
+        filtered = filter_landmarks(track.landmarks, track.timestamps, OneEuroFilter())
+        np.testing.assert_allclose(session.landmarks, filtered, rtol=1e-6, equal_nan=True)
+        assert not np.allclose(session.landmarks[track.detected], track.landmarks[track.detected])
+        np.testing.assert_allclose(session.angles, calculate_pose_angles_batch(filtered), rtol=1e-5, atol=1e-4, equal_nan=True)
+
+
+if __name__ == "__main__":
+    test_export_round_trip()
+    test_export_filtered_landmarks()
+    print("Session export round trip OK")
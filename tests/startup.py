@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules that take most of a second each to import, only loaded by the code paths that need them
+HEAVY_MODULES = ['cv2', 'mediapipe', 'scipy', 'matplotlib', 'tqdm']
+SCRIPTS = ['pose.py', 'LESS_scoreing.py', 'ang_vel_acc_jerk_analysis.py', 'batch_scoring.py']
+# Wall time of `script --help` in seconds, best of STARTUP_RUNS; about 0.3 s here against
+# more than 2.5 s when the heavy modules were imported at the top
+STARTUP_BUDGET = 1.0
+STARTUP_RUNS = 3
+
+
+def _run(args):
+    env = dict(os.environ, PYTHONPATH=REPO)
+    return subprocess.run([sys.executable, *args], env=env, cwd=REPO, capture_output=True, text=True, check=True)
+
+
+def _loaded_heavy_modules(code):
+    check = f"{code}\nimport sys\nprint('loaded:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    # The last line, after anything the code printed itself
+    return _run(['-c', check]).stdout.splitlines()[-1][len('loaded:'):]
+
+
+def test_scoring_packages_import_without_heavy_modules():
+    for module in ('LESS', 'LESS.engine', 'LESS.angledist', 'biomechanical', 'config', 'tools', 'tools.events',
+                   'tools.extraction', 'tools.jcs', 'tools.multiview', 'tools.streaming'):
+        assert _loaded_heavy_modules(f"import {module}") == '', module
+
+
+def test_scripts_start_within_budget():
+    for script in SCRIPTS:
+        path = os.path.join(REPO, script)
+        # --help parses the arguments of a full run, after every top-level import
+        assert _loaded_heavy_modules(f"import runpy, sys\nsys.argv = [{path!r}, '--help']\n"
+                                     f"try:\n    runpy.run_path({path!r}, run_name='__main__')\n"
+                                     f"except SystemExit:\n    pass") == '', script
+        seconds = []
+        for _ in range(STARTUP_RUNS):
+            start = time.perf_counter()
+            _run([path, '--help'])
+            seconds.append(time.perf_counter() - start)
+        assert min(seconds) < STARTUP_BUDGET, f"{script} --help took {min(seconds):.2f} s"
+
+
+if __name__ == "__main__":
+    test_scoring_packages_import_without_heavy_modules()
+    test_scripts_start_within_budget()
+    print("Startup OK")
@@ -1,5 +1,6 @@
+import math
+
 import numpy as np
-from scipy.signal import savgol_filter
 
 def calculate_knee_flexion_angle(hip, knee, ankle):
     """Calculate the knee flexion angle."""
@@ -51,44 +52,170 @@ def calculate_hip_adduction_angle(hip, knee):
     angle = np.arccos(cosine_angle)
     return np.degrees(angle) - 90  # Adjust relative to vertical
 
-def calculate_pose_angles(landmarks, mp_pose):
-    """Calculate the required angles from pose landmarks."""
-    # Extract landmarks
-    left_shoulder = landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value]
-    left_hip = landmarks[mp_pose.PoseLandmark.LEFT_HIP.value]
-    left_knee = landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value]
-    left_ankle = landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value]
-
-    right_shoulder = landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value]
-    right_hip = landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value]
-    right_knee = landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value]
-    right_ankle = landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value]
-
-    angles = {
-        # Knee Flexion Angles
-        "Left Knee Flexion": calculate_knee_flexion_angle(left_hip, left_knee, left_ankle),
-        "Right Knee Flexion": calculate_knee_flexion_angle(right_hip, right_knee, right_ankle),
-
-        # Hip Flexion Angles
-        "Left Hip Flexion": calculate_hip_flexion_angle(left_shoulder, left_hip, left_knee),
-        "Right Hip Flexion": calculate_hip_flexion_angle(right_shoulder, right_hip, right_knee),
-
-        # Knee Valgus Angles
-        "Left Knee Valgus": calculate_knee_valgus_angle(left_hip, left_knee, left_ankle),
-        "Right Knee Valgus": calculate_knee_valgus_angle(right_hip, right_knee, right_ankle),
-
-        # Hip Adduction Angles
-        "Left Hip Adduction": calculate_hip_adduction_angle(left_hip, left_knee),
-        "Right Hip Adduction": calculate_hip_adduction_angle(right_hip, right_knee)
-    }
+# MediaPipe Pose landmark indices used by the joint angles and the LESS engine
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+LEFT_HEEL, RIGHT_HEEL = 29, 30
+LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX = 31, 32
+NUM_LANDMARKS = 33
+
+# Column order of calculate_pose_angles_batch and key order of calculate_pose_angles
+ANGLE_NAMES = [
+    "Left Knee Flexion", "Right Knee Flexion",
+    "Left Hip Flexion", "Right Hip Flexion",
+    "Left Knee Valgus", "Right Knee Valgus",
+    "Left Hip Adduction", "Right Hip Adduction"
+]
+
+def landmarks_to_array(landmarks):
+    """Convert a MediaPipe landmark list to a (33, 3) float32 array of x, y, z."""
+    return np.array([(landmark.x, landmark.y, landmark.z) for landmark in landmarks], dtype=np.float32)
+
+def _angles_between(a, b):
+    """Angle in degrees between matching vectors along the last axis."""
+    cosine_angle = np.einsum('...i,...i->...', a, b) / (np.linalg.norm(a, axis=-1) * np.linalg.norm(b, axis=-1))
+    # Handle numerical issues
+    cosine_angle = np.clip(cosine_angle, -1.0, 1.0)
+    return np.degrees(np.arccos(cosine_angle))
+
+def calculate_pose_angles_batch(landmarks):
+    """
+    Calculate every joint angle for a series of frames in one vectorized pass.
+    Parameters:
+    landmarks (np.ndarray): Array of shape (n_frames, 33, 3) with the x, y, z of each landmark.
+    Returns:
+    np.ndarray: Array of shape (n_frames, 8) of angles in degrees, columns ordered as ANGLE_NAMES.
+    """
+    landmarks = np.asarray(landmarks)
+    # (n_frames, 2, 3) arrays with the left side first
+    shoulder = landmarks[:, [LEFT_SHOULDER, RIGHT_SHOULDER]].astype(np.float64)
+    hip = landmarks[:, [LEFT_HIP, RIGHT_HIP]].astype(np.float64)
+    knee = landmarks[:, [LEFT_KNEE, RIGHT_KNEE]].astype(np.float64)
+    ankle = landmarks[:, [LEFT_ANKLE, RIGHT_ANKLE]].astype(np.float64)
 
+    knee_to_hip = hip - knee
+    knee_to_ankle = ankle - knee
+    hip_to_knee = knee - hip
+
+    angles = np.empty((landmarks.shape[0], len(ANGLE_NAMES)))
+    # Knee flexion: thigh vs shank
+    angles[:, 0:2] = _angles_between(knee_to_hip, knee_to_ankle)
+    # Hip flexion: trunk vs thigh
+    angles[:, 2:4] = _angles_between(shoulder - hip, hip_to_knee)
+    # Knee valgus: femur vs tibia in the frontal (X, Z) plane
+    angles[:, 4:6] = _angles_between(knee_to_hip[..., ::2], knee_to_ankle[..., ::2])
+    # Hip adduction: thigh vs the positive Y-axis, adjusted relative to vertical
+    thigh = hip_to_knee[..., :2]
+    cosine_angle = np.clip(thigh[..., 1] / np.linalg.norm(thigh, axis=-1), -1.0, 1.0)
+    angles[:, 6:8] = np.degrees(np.arccos(cosine_angle)) - 90
     return angles
 
-def calculate_velocities(angle_series, fps):
-    """Calculate angular velocities from angle series."""
+def calculate_pose_angles(landmarks, mp_pose=None):
+    """
+    Calculate the required angles from the pose landmarks of one frame.
+    Parameters:
+    landmarks: MediaPipe landmark list, or a (33, 3) array of x, y, z.
+    mp_pose: Unused, kept for backwards compatibility.
+    Returns:
+    dict: Angle name to angle in degrees.
+    """
+    if not isinstance(landmarks, np.ndarray):
+        landmarks = landmarks_to_array(landmarks)
+    angles = calculate_pose_angles_batch(landmarks[np.newaxis])[0]
+    return dict(zip(ANGLE_NAMES, angles.tolist()))
+
+# Longest time in seconds between two valid samples that a derivative window may span
+MAX_TIMESTAMP_GAP = 0.1
+# At low sample rates, the number of typical sample intervals that count as a gap instead
+GAP_INTERVALS = 3
+
+def gap_threshold(intervals):
+    """
+    Longest time between two samples that a derivative fit spans: MAX_TIMESTAMP_GAP, or GAP_INTERVALS
+    times the median of `intervals` (seconds between consecutive samples) when that is longer, so a
+    slow analysis rate is not mistaken for a dropout on every frame.
+    """
+    intervals = np.asarray(intervals, dtype=float)
+    intervals = intervals[np.isfinite(intervals)]
+    if not len(intervals):
+        return MAX_TIMESTAMP_GAP
+    return max(MAX_TIMESTAMP_GAP, GAP_INTERVALS * float(np.median(intervals)))
+
+def timestamped_derivative(values, timestamps, deriv, window_length=31, poly_order=2, max_gap=MAX_TIMESTAMP_GAP):
+    """
+    Savitzky-Golay style derivative on a non-uniform time grid, for all channels at once.
+    Every sample gets a least-squares polynomial over the window_length valid samples around it
+    (the first or last full window near the ends, like savgol_filter's 'interp' mode), evaluated
+    at its own time. Rows with a NaN are skipped, and gaps longer than max_gap seconds split
+    the series into segments fitted separately; None never splits it.
+    Parameters:
+    values (np.ndarray): (n_samples, n_channels) series, NaN for missing samples.
+    timestamps (np.ndarray): (n_samples,) strictly increasing sample times in seconds.
+    deriv (int): Order of the derivative.
+    Returns:
+    np.ndarray: (n_samples, n_channels) derivatives; NaN for missing samples and segments shorter than the window.
+    """
+    values = np.asarray(values, dtype=float)
+    timestamps = np.asarray(timestamps, dtype=float)
+    result = np.full(values.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(values).any(axis=1))
+    # Repeated times would give windows of zero span, i.e. infinite derivatives
+    if not (np.diff(timestamps[valid]) > 0).all():
+        raise ValueError("timestamps must strictly increase")
+    breaks = np.flatnonzero(np.diff(timestamps[valid]) > max_gap) + 1 if max_gap is not None else []
+    for segment in np.split(valid, breaks):
+        n = len(segment)
+        if n < window_length:
+            continue
+        times = timestamps[segment]
+        starts = np.clip(np.arange(n) - window_length // 2, 0, n - window_length)
+        window = starts[:, None] + np.arange(window_length)
+        # Times relative to the evaluated sample, scaled by the window span for a well-conditioned fit
+        span = times[window[:, -1]] - times[window[:, 0]]
+        x = (times[window] - times[:, None]) / span[:, None]
+        vandermonde = x[..., None] ** np.arange(poly_order + 1)
+        transposed = vandermonde.transpose(0, 2, 1)
+        # Normal equations of all windows solved in one batch
+        coeffs = np.linalg.solve(transposed @ vandermonde, transposed @ values[segment][window])
+        result[segment] = coeffs[:, deriv] * math.factorial(deriv) / span[:, None] ** deriv
+    return result
+
+def calculate_derivatives(series, timestamps, deriv, window_length=31, poly_order=2):
+    """
+    Derivatives of several series sharing the same sample times, in one vectorized pass.
+    Parameters:
+    series (dict): Name to series, each as long as `timestamps`, NaN for missing samples.
+    timestamps (np.ndarray): Sample times in seconds.
+    deriv (int): Order of the derivative.
+    Returns:
+    dict: Name to derivative series, for series with at least window_length valid samples.
+    """
+    if not series:
+        return {}
+    values = np.column_stack([np.asarray(values, dtype=float) for values in series.values()])
+    if len(values) != len(timestamps):
+        raise ValueError(f"Got {len(timestamps)} timestamps for series of {len(values)} samples")
+    if np.count_nonzero(~np.isnan(values).any(axis=1)) < window_length:
+        return {}
+    valid_timestamps = np.asarray(timestamps, dtype=float)[~np.isnan(values).any(axis=1)]
+    derivatives = timestamped_derivative(values, timestamps, deriv, window_length, poly_order,
+                                         max_gap=gap_threshold(np.diff(valid_timestamps)))
+    return dict(zip(series, derivatives.T))
+
+def calculate_velocities(angle_series, fps, timestamps=None, window_length=31):
+    """
+    Calculate angular velocities from angle series.
+    With `timestamps`, the capture time in seconds of every sample, the derivatives follow the
+    real sample times and NaN samples (missed detections) are skipped; see calculate_derivatives.
+    window_length is the odd number of samples each derivative is fitted to.
+    """
+    if timestamps is not None:
+        return calculate_derivatives(angle_series, timestamps, deriv=1, window_length=window_length)
+    from scipy.signal import savgol_filter  # Slow to import, and only needed without timestamps
     velocities = {}
     dt = 1 / fps
-    window_length = 31  # Should be an odd integer
     poly_order = 2
     for joint, angles in angle_series.items():
         if len(angles) >= window_length:
@@ -99,11 +226,18 @@ def calculate_velocities(angle_series, fps):
             velocities[joint] = velocity
     return velocities
 
-def calculate_accelerations(angle_series, fps):
-    """Calculate accelerations from angle series."""
+def calculate_accelerations(angle_series, fps, timestamps=None, window_length=31):
+    """
+    Calculate accelerations from angle series.
+    With `timestamps`, the capture time in seconds of every sample, the derivatives follow the
+    real sample times and NaN samples (missed detections) are skipped; see calculate_derivatives.
+    window_length is the odd number of samples each derivative is fitted to.
+    """
+    if timestamps is not None:
+        return calculate_derivatives(angle_series, timestamps, deriv=2, window_length=window_length)
+    from scipy.signal import savgol_filter  # Slow to import, and only needed without timestamps
     accelerations = {}
     dt = 1 / fps
-    window_length = 31  # Should be an odd integer
     poly_order = 2
     for joint, angles in angle_series.items():
         if len(angles) >= window_length:
@@ -114,11 +248,18 @@ def calculate_accelerations(angle_series, fps):
             accelerations[joint] = acceleration
     return accelerations
 
-def calculate_jerks(accelerations, fps):
-    """Calculate jerks from acceleration series."""
+def calculate_jerks(accelerations, fps, timestamps=None, window_length=31):
+    """
+    Calculate jerks from acceleration series.
+    With `timestamps`, the capture time in seconds of every sample, the derivatives follow the
+    real sample times and NaN samples (missed detections) are skipped; see calculate_derivatives.
+    window_length is the odd number of samples each derivative is fitted to.
+    """
+    if timestamps is not None:
+        return calculate_derivatives(accelerations, timestamps, deriv=1, window_length=window_length)
+    from scipy.signal import savgol_filter  # Slow to import, and only needed without timestamps
     jerks = {}
     dt = 1 / fps
-    window_length = 31  # Should be an odd integer
     poly_order = 2
     for joint, acceleration in accelerations.items():
         if len(acceleration) >= window_length:
@@ -0,0 +1,174 @@
+"""
+Real-time plots of joint angles and their derivatives.
+
+The dashboard runs in its own process so drawing never holds up capture and pose
+inference. Line artists are created once; each refresh shifts a bounded scrolling
+window, updates the line data and blits only the lines onto a cached background.
+"""
+
+import multiprocessing
+import queue
+
+import numpy as np
+
+SIGNALS = ['Angle', 'Velocity', 'Acceleration', 'Jerk']
+TITLES = ['Joint Angles', 'Joint Velocities', 'Joint Accelerations', 'Joint Jerks']
+# Seconds of history shown in the scrolling window
+WINDOW_SECONDS = 10
+# Pending frame batches held by the queue before new frames are kept back on the capture side
+MAX_QUEUED_BATCHES = 64
+# Headroom added around the data when the y range has to grow
+Y_MARGIN = 0.1
+
+
+def _frame_row(joints, *signals):
+    """(len(SIGNALS), n_joints) array of one frame, NaN where a signal is not available yet."""
+    return np.array([[signal.get(joint, np.nan) for joint in joints] for signal in signals], dtype=float)
+
+
+def _expand_limits(ax, values):
+    """Grow the y limits of an axis to cover `values`. Returns True if they changed."""
+    if np.isnan(values).all():
+        return False
+    low, high = np.nanmin(values), np.nanmax(values)
+    bottom, top = ax.get_ylim()
+    if low >= bottom and high <= top:
+        return False
+    margin = Y_MARGIN * max(high - low, 1.0)
+    ax.set_ylim(min(bottom, low - margin), max(top, high + margin))
+    return True
+
+
+def _run_dashboard(frames, joints, fps, window_seconds):
+    """Dashboard process: draw batches of frame rows from the `frames` queue until it yields None."""
+    import matplotlib.pyplot as plt
+
+    window_length = max(2, int(round(window_seconds * fps)))
+    times = (np.arange(window_length) - (window_length - 1)) / fps
+    history = np.full((len(SIGNALS), len(joints), window_length), np.nan)
+
+    fig, axs = plt.subplots(len(SIGNALS), 1, figsize=(10, 16))
+    lines = []
+    for ax, signal, title in zip(axs, SIGNALS, TITLES):
+        ax_lines = [ax.plot(times, history[0, 0], label=f"{joint} {signal}")[0] for joint in joints]
+        ax.legend(loc='upper right')
+        ax.set_title(title)
+        ax.set_xlim(times[0], times[-1])
+        ax.set_xlabel('Time (s)')
+        # Animated only after the legend has copied the line styles, so the legend stays in the background
+        for line in ax_lines:
+            line.set_animated(True)
+        lines.append(ax_lines)
+
+    plt.show(block=False)
+    fig.canvas.draw()
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+
+    running = True
+    while running and plt.fignum_exists(fig.number):
+        batches = []
+        try:
+            batches.append(frames.get(timeout=0.05))
+            while True:
+                batches.append(frames.get_nowait())
+        except queue.Empty:
+            pass
+        if any(batch is None for batch in batches):
+            running = False
+            batches = batches[:[batch is None for batch in batches].index(True)]
+        if not batches:
+            fig.canvas.flush_events()
+            continue
+
+        rows = np.concatenate(batches)[-window_length:]
+        # Scroll the window left by the number of new frames
+        history[..., :-len(rows)] = history[..., len(rows):]
+        history[..., -len(rows):] = np.moveaxis(rows, 0, -1)
+
+        rescaled = [_expand_limits(ax, history[i]) for i, ax in enumerate(axs)]
+        if any(rescaled):
+            # Axes changed, so the background has to be redrawn once
+            fig.canvas.draw()
+            background = fig.canvas.copy_from_bbox(fig.bbox)
+
+        fig.canvas.restore_region(background)
+        for ax, signal_lines, signal_history in zip(axs, lines, history):
+            for line, joint_history in zip(signal_lines, signal_history):
+                line.set_ydata(joint_history)
+                ax.draw_artist(line)
+        fig.canvas.blit(fig.bbox)
+        fig.canvas.flush_events()
+
+    plt.close(fig)
+
+
+class LiveDashboard:
+    """
+    Scrolling plots of angles, velocities, accelerations and jerks per joint, drawn in a separate process.
+    push() never blocks: frames that do not fit in the queue are kept and sent with the next frame.
+    """
+
+    def __init__(self, joints, fps, window_seconds=WINDOW_SECONDS):
+        self.joints = list(joints)
+        self.fps = fps
+        self.window_seconds = window_seconds
+        self._pending = []
+        # Frames older than the window are never shown, so no more than that is kept back
+        self._max_pending = max(2, int(round(window_seconds * fps)))
+        # Spawned so the plotting process gets its own GUI event loop
+        context = multiprocessing.get_context('spawn')
+        self._frames = context.Queue(MAX_QUEUED_BATCHES)
+        self._process = context.Process(target=_run_dashboard, args=(self._frames, self.joints, fps, window_seconds),
+                                        daemon=True)
+
+    def start(self):
+        self._process.start()
+        return self
+
+    def push(self, angles, velocities=None, accelerations=None, jerks=None):
+        """Add one frame of per-joint values; missing signals are left as gaps."""
+        if not self._process.is_alive():
+            # The window was closed
+            return
+        self._pending.append(_frame_row(self.joints, angles, velocities or {}, accelerations or {}, jerks or {}))
+        del self._pending[:-self._max_pending]
+        try:
+            self._frames.put_nowait(np.stack(self._pending))
+            self._pending = []
+        except queue.Full:
+            pass
+
+    def close(self):
+        """Flush the remaining frames and stop the dashboard process."""
+        if self._process.is_alive():
+            if self._pending:
+                self._frames.put(np.stack(self._pending))
+                self._pending = []
+            self._frames.put(None)
+            self._process.join()
+        else:
+            # Nothing reads the queue any more, so do not wait for it to be flushed at exit
+            self._frames.cancel_join_thread()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save_summary(angle_series, velocity_series, acceleration_series, jerk_series, path, show=False):
+    """Plot the full series of every joint once and save the figure to `path`."""
+    import matplotlib.pyplot as plt
+
+    fig, axs = plt.subplots(len(SIGNALS), 1, figsize=(10, 16))
+    for ax, signal, title, series in zip(axs, SIGNALS, TITLES,
+                                         [angle_series, velocity_series, acceleration_series, jerk_series]):
+        for joint, values in series.items():
+            ax.plot(values, label=f"{joint} {signal}")
+        ax.legend(loc='upper right')
+        ax.set_title(title)
+    fig.savefig(path)
+    if show:
+        plt.show()
+    plt.close(fig)
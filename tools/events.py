@@ -0,0 +1,127 @@
+"""
+Landing event detection over whole-trial time series.
+
+Finds the initial contact and maximum knee flexion frames once per trial, so the
+LESS items and angle distributions are scored at those events only.
+"""
+
+import numpy as np
+
+from tools import LEFT_ANKLE, RIGHT_ANKLE, timestamped_derivative
+
+# Fraction of the peak downward ankle velocity below which the foot is considered on the ground
+CONTACT_VELOCITY_FRACTION = 0.1
+# Fraction of the fastest descent that marks the first drop of the trial
+DESCENT_FRACTION = 0.5
+# Slowest peak descent, in image heights per second, that still counts as a landing
+MIN_DESCENT_SPEED = 0.2
+# How long the knee has to keep extending, in seconds, for the flexion phase to be over
+REVERSAL_SECONDS = 0.05
+
+
+def _fill_gaps(series):
+    """Linearly interpolate NaN samples (frames without a detection) of a 1D series."""
+    series = np.asarray(series, dtype=float)
+    missing = np.isnan(series)
+    if missing.any() and not missing.all():
+        index = np.arange(len(series))
+        series = series.copy()
+        series[missing] = np.interp(index[missing], index[~missing], series[~missing])
+    return series
+
+
+def _window_length(fps, n_samples):
+    """Odd Savitzky-Golay window of roughly 50 ms, bounded by the series length."""
+    window_length = max(5, int(fps * 0.05) | 1)
+    if window_length > n_samples:
+        window_length = n_samples if n_samples % 2 else n_samples - 1
+    return window_length
+
+
+def _velocity(series, window_length, fps):
+    """First derivative of an evenly sampled series, as savgol_filter(series, window_length, 2, deriv=1) in 'interp' mode."""
+    return timestamped_derivative(series[:, None], np.arange(len(series)) / fps, 1, window_length, max_gap=None)[:, 0]
+
+
+def detect_initial_contact(ankle_height, fps):
+    """
+    Initial contact frame from the vertical ankle position.
+    Parameters:
+    ankle_height (np.ndarray): Image y of the ankle per frame (increasing downwards), NaN where undetected.
+    fps (float): Frame rate of the series.
+    Returns:
+    int: The first frame after the first drop where the downward ankle velocity has collapsed
+    below CONTACT_VELOCITY_FRACTION of its peak, or None if no landing is found.
+    """
+    ankle_height = _fill_gaps(ankle_height)
+    window_length = _window_length(fps, len(ankle_height))
+    if window_length < 5 or np.isnan(ankle_height).any():
+        return None
+    velocity = _velocity(ankle_height, window_length, fps)
+    if velocity.max() < MIN_DESCENT_SPEED:
+        return None
+
+    # The first descent fast enough to be the drop, not the later landing from the jump
+    descending = velocity > DESCENT_FRACTION * velocity.max()
+    start = int(np.argmax(descending))
+    end = start + int(np.argmin(descending[start:])) if not descending[start:].all() else len(velocity)
+    peak = start + int(np.argmax(velocity[start:end]))
+
+    stopped = velocity[peak:] < CONTACT_VELOCITY_FRACTION * velocity[peak]
+    if not stopped.any():
+        return None
+    return peak + int(np.argmax(stopped))
+
+
+def detect_max_knee_flexion(knee_angle, initial_contact, fps):
+    """
+    Maximum knee flexion frame after initial contact.
+    Parameters:
+    knee_angle (np.ndarray): Included knee angle per frame (smaller is more flexed), NaN where undetected.
+    initial_contact (int): Initial contact frame.
+    fps (float): Frame rate of the series.
+    Returns:
+    int: The frame with the smallest knee angle between initial contact and the end of the first
+    sustained reversal, where the knee has kept extending for REVERSAL_SECONDS after flexing; the
+    smallest angle after contact if it never reverses. A single frame of noise can neither end the
+    flexion phase early nor stand in for the peak. Always later than initial_contact, so the two
+    events never share a frame; None if no later frame has an angle.
+    """
+    knee_angle = _fill_gaps(knee_angle)
+    window_length = _window_length(fps, len(knee_angle))
+    stance = knee_angle[initial_contact + 1:]
+    if np.isnan(stance).all():
+        return None
+    end = len(stance)
+    if window_length >= 5:
+        velocity = _velocity(knee_angle, window_length, fps)[initial_contact + 1:]
+        flexing = velocity < 0
+        if flexing.any():
+            sustain = max(1, int(round(REVERSAL_SECONDS * fps)))
+            first_flexion = int(np.argmax(flexing))
+            # extending[i]: the knee extends on all of the `sustain` frames from first_flexion + i
+            extending = np.convolve(~flexing[first_flexion:], np.ones(sustain, dtype=int), 'valid') == sustain
+            if extending.any():
+                end = first_flexion + int(np.argmax(extending)) + sustain
+    return initial_contact + 1 + int(np.nanargmin(stance[:end]))
+
+
+def detect_landing_events(landmarks, angles, fps):
+    """
+    Initial contact and maximum knee flexion of a landing.
+    Parameters:
+    landmarks (np.ndarray): (n_frames, 33, 3) landmarks, NaN for frames without a detection.
+    angles (np.ndarray): (n_frames, 8) angles from calculate_pose_angles_batch.
+    fps (float): Frame rate of the series.
+    Returns:
+    dict: Frame indices under 'initial_contact' and 'max_knee_flexion', or None if no landing is found.
+    """
+    ankle_height = landmarks[:, [LEFT_ANKLE, RIGHT_ANKLE], 1].mean(axis=1)
+    initial_contact = detect_initial_contact(ankle_height, fps)
+    if initial_contact is None:
+        return None
+    knee_angle = angles[:, 0:2].mean(axis=1)
+    max_knee_flexion = detect_max_knee_flexion(knee_angle, initial_contact, fps)
+    if max_knee_flexion is None:
+        return None
+    return {'initial_contact': initial_contact, 'max_knee_flexion': max_knee_flexion}
@@ -0,0 +1,479 @@
+"""
+Video decoding and pose extraction shared by the analysis scripts.
+
+Pose inference goes through the landmark cache: on a hit the stored landmarks are
+replayed and MediaPipe is never loaded, on a miss the landmarks are recorded while
+the video is processed and written to the cache once the last frame has been read.
+OpenCV and MediaPipe are imported by the functions that use them, so replaying
+cached landmarks without decoding the video loads neither.
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tools import landmarks_to_array
+from tools import landmark_cache
+from tools.landmark_cache import DEFAULT_CACHE_DIR, DEFAULT_POSE_CONFIG, LandmarkRecorder, LandmarkTrack
+from tools.pipeline import QUEUE_SIZE, Pipeline, Stage
+from tools.profiling import NULL_PROFILER
+from tools.roi import RoiTracker
+from tools.sampling import AdaptiveSampler, interpolate_skipped
+
+# Same pairs as mp.solutions.pose.POSE_CONNECTIONS
+POSE_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32)
+]
+
+LANDMARK_COLOR = (245, 117, 66)
+CONNECTION_COLOR = (245, 66, 230)
+BORDER_COLOR = (224, 224, 224)
+VISIBILITY_THRESHOLD = 0.5
+
+# Frames decoded before each shard to warm up tracking; their results are discarded
+SHARD_OVERLAP = 30
+# Shorter clips are not worth the cost of starting extra Pose graphs
+MIN_SHARD_FRAMES = 300
+
+
+def create_pose(pose_config=None):
+    """Create a MediaPipe Pose graph."""
+    import mediapipe as mp  # Only needed on a cache miss
+    return mp.solutions.pose.Pose(**(pose_config or DEFAULT_POSE_CONFIG))
+
+
+def detect(pose, frame, roi=None):
+    """
+    Run pose inference on a BGR frame.
+    With a RoiTracker as `roi`, only the region around the previous frame's pose is converted
+    and passed to MediaPipe, downscaled, and the landmarks are mapped back to the full frame.
+    Returns:
+    tuple: ((33, 3) landmarks, (33,) visibility, (33, 3) world landmarks) float32 arrays, or (None, None, None)
+    when no pose was detected. World landmarks are MediaPipe's pose_world_landmarks: metres, centred
+    between the hips, and independent of the crop.
+    """
+    import cv2
+    image = cv2.cvtColor(frame if roi is None else roi.crop(frame), cv2.COLOR_BGR2RGB)
+    image.flags.writeable = False
+    results = pose.process(image)
+    if not results.pose_landmarks:
+        landmarks = visibility = world_landmarks = None
+    else:
+        landmarks = results.pose_landmarks.landmark
+        visibility = np.array([landmark.visibility for landmark in landmarks], dtype=np.float32)
+        landmarks = landmarks_to_array(landmarks)
+        world_landmarks = results.pose_world_landmarks
+        world_landmarks = landmarks_to_array(world_landmarks.landmark) if world_landmarks else None
+    if roi is not None:
+        if landmarks is not None:
+            landmarks = roi.to_frame(landmarks)
+        # MediaPipe tracks in the coordinates of the image it is given, so a new crop starts over
+        if roi.update(landmarks):
+            pose.reset()
+    return landmarks, visibility, world_landmarks
+
+
+def draw_landmarks(image, landmarks, visibility=None):
+    """Draw pose landmarks and connections on a BGR image, as mp_drawing.draw_landmarks does."""
+    import cv2
+    height, width = image.shape[:2]
+    points = np.floor(landmarks[:, :2] * (width, height)).astype(int)
+    visible = np.all((landmarks[:, :2] >= 0) & (landmarks[:, :2] <= 1), axis=1)
+    if visibility is not None:
+        visible &= visibility >= VISIBILITY_THRESHOLD
+    points = [tuple(point) for point in np.minimum(points, (width - 1, height - 1)).tolist()]
+    for start, end in POSE_CONNECTIONS:
+        if visible[start] and visible[end]:
+            cv2.line(image, points[start], points[end], CONNECTION_COLOR, 2)
+    for index in np.flatnonzero(visible):
+        cv2.circle(image, points[index], 3, BORDER_COLOR, 2)
+        cv2.circle(image, points[index], 2, LANDMARK_COLOR, 2)
+
+
+def frame_timestamp(cap):
+    """Presentation time in seconds of the frame just read from `cap`."""
+    import cv2
+    return cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+
+class FrameClock:
+    """
+    Strictly increasing timestamps of the frames read from `cap`, one call per frame.
+    They are the presentation times of frame_timestamp while those increase. Some backends report
+    0 or repeat a position, and from the first such frame on the frames are 1 / fps apart instead.
+    """
+
+    def __init__(self, cap, fps=None):
+        import cv2
+        fps = fps or cap.get(cv2.CAP_PROP_FPS)
+        self.cap = cap
+        self.interval = 1 / fps if fps > 0 else 1 / 30
+        self.last = None
+        self.fallback = False
+
+    def __call__(self):
+        timestamp = frame_timestamp(self.cap)
+        if self.last is None:
+            timestamp = timestamp if np.isfinite(timestamp) else 0.0
+        elif self.fallback or not timestamp > self.last:
+            self.fallback = True
+            timestamp = self.last + self.interval
+        self.last = timestamp
+        return timestamp
+
+
+def _sampled_inference(cap, pose, roi=None, sampler=None, count=None, last=None):
+    """
+    Yield (landmarks, visibility, world_landmarks, timestamp, inferred) for the next `count` frames of `cap`
+    (all when None). With an AdaptiveSampler, frames it skips are only grabbed, not decoded, and yield None
+    landmarks with inferred False. Frame `last`, counted from the first one, is always inferred.
+    """
+    index = 0
+    next_inferred = 0
+    clock = FrameClock(cap)
+    while count is None or index < count:
+        if index < next_inferred:
+            if not cap.grab():
+                return
+            yield None, None, None, clock(), False
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            landmarks, visibility, world_landmarks = detect(pose, frame, roi)
+            timestamp = clock()
+            yield landmarks, visibility, world_landmarks, timestamp, True
+            next_inferred = index + (sampler.next_stride(landmarks, timestamp) if sampler is not None else 1)
+            if last is not None and index < last:
+                next_inferred = min(next_inferred, last)
+        index += 1
+
+
+def _extract_shard(video_path, start, stop, overlap, pose_config, roi_config=None, sampling_config=None, last=None,
+                   pose=None):
+    """
+    Run pose inference on frames [start, stop) of a video in its own Pose graph, or in `pose` after a reset.
+    Tracking is warmed up on the `overlap` frames before `start`. A `stop` of None reads to the end.
+    With `sampling_config`, inference runs on the frames an AdaptiveSampler picks, always including
+    frame `last` (default stop - 1), and the others are interpolated.
+    """
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    warmup_start = max(0, start - overlap)
+    if warmup_start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_start)
+    if last is None and stop is not None:
+        last = stop - 1
+    recorder = LandmarkRecorder()
+    inferred = []
+    roi = RoiTracker(**roi_config) if roi_config else None
+    sampler = AdaptiveSampler(cap.get(cv2.CAP_PROP_FPS), **sampling_config) if sampling_config else None
+    with contextlib.ExitStack() as stack:
+        if pose is not None:
+            pose.reset()
+        else:
+            pose = stack.enter_context(create_pose(pose_config))
+        frames = _sampled_inference(cap, pose, roi, sampler, None if stop is None else stop - warmup_start,
+                                    None if last is None else last - warmup_start)
+        for landmarks, visibility, world_landmarks, timestamp, was_inferred in frames:
+            recorder.append(landmarks, visibility, timestamp, world_landmarks)
+            inferred.append(was_inferred)
+    cap.release()
+    track = recorder.to_track(None, None, None)
+    if sampler is not None:
+        # Warm-up frames are included, so frames at the start of the shard have an inferred frame on both sides
+        interpolate_skipped(track.landmarks, track.visibility, track.timestamps, inferred, track.world_landmarks)
+    skip = start - warmup_start
+    timestamps = track.timestamps[skip:] if track.timestamps is not None else None
+    return track.landmarks[skip:], track.visibility[skip:], timestamps, track.world_landmarks[skip:]
+
+
+def extract_landmarks_parallel(video_path, pose_config=None, workers=None, overlap=SHARD_OVERLAP, roi_config=None,
+                               sampling_config=None, pose=None):
+    """
+    Run pose inference over a video split into frame-range shards, one worker process per shard.
+    A single shard runs in this process, in the `pose` graph when one is given.
+    With `roi_config`, the RoiTracker settings, each frame is cropped around the previous pose.
+    With `sampling_config`, the AdaptiveSampler settings, only some frames are inferred and the others interpolated.
+    Returns:
+    LandmarkTrack: The per-frame landmarks of the whole video, merged in frame order.
+    """
+    import cv2
+    pose_config = pose_config or DEFAULT_POSE_CONFIG
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    workers = workers or os.cpu_count()
+    n_shards = max(1, min(workers, frame_count // MIN_SHARD_FRAMES))
+    bounds = np.linspace(0, frame_count, n_shards + 1).astype(int).tolist()
+    # The frame count is only an estimate for some containers, so the last shard reads to the end
+    bounds[-1] = None
+
+    # The last shard's final frame is inferred as well, as far as the frame count tells
+    lasts = [None] * (n_shards - 1) + [frame_count - 1 if frame_count > 0 else None]
+
+    if n_shards == 1:
+        shards = [_extract_shard(video_path, 0, None, overlap, pose_config, roi_config, sampling_config, lasts[0], pose)]
+    else:
+        # Spawned workers so each one starts its own MediaPipe graph from a clean state
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=n_shards, mp_context=context) as executor:
+            futures = [
+                executor.submit(_extract_shard, video_path, start, stop, overlap, pose_config, roi_config, sampling_config, last)
+                for start, stop, last in zip(bounds[:-1], bounds[1:], lasts)
+            ]
+            shards = [future.result() for future in futures]
+
+    landmarks = np.concatenate([shard[0] for shard in shards])
+    visibility = np.concatenate([shard[1] for shard in shards])
+    timestamps = np.concatenate([shard[2] for shard in shards]) if all(shard[2] is not None for shard in shards) else None
+    world_landmarks = np.concatenate([shard[3] for shard in shards])
+    meta = {'video_path': video_path, 'pose_config': pose_config, 'roi_config': roi_config, 'sampling_config': sampling_config}
+    return LandmarkTrack(landmarks, visibility, fps, width, height, meta, timestamps, world_landmarks)
+
+
+class PoseVideo:
+    """
+    A video together with its pose landmarks, replayed from the landmark cache when available.
+    With workers > 1, a cache miss runs extract_landmarks_parallel up front and then replays its result.
+    An existing Pose graph can be passed as `pose`; it is reset and reused instead of creating a new one.
+    With `roi_config` (e.g. tools.roi.DEFAULT_ROI_CONFIG), inference runs on a crop around the previous pose.
+    With `sampling_config` (e.g. tools.sampling.DEFAULT_SAMPLING_CONFIG), a cache miss infers only the frames
+    an AdaptiveSampler picks, up front like workers > 1, and interpolates the others.
+    On a cache hit, the frame rate and size come from the cached track and the video is only
+    opened once frames are decoded.
+    """
+
+    def __init__(self, video_path, pose_config=None, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, workers=1, pose=None,
+                 roi_config=None, sampling_config=None):
+        self.video_path = video_path
+        self.pose_config = pose_config or DEFAULT_POSE_CONFIG
+        self.roi_config = roi_config
+        self.sampling_config = sampling_config
+        self.workers = workers
+        self.pose = pose
+        self.cache_dir = cache_dir if use_cache else None
+        self.key = None
+        self.track = None
+        self._cap = None
+        # Pose graph created by pipeline(), closed on release()
+        self._own_pose = None
+        if use_cache:
+            self.key = landmark_cache.cache_key(video_path, self.pose_config, cache_dir, roi_config, sampling_config)
+            self.track = landmark_cache.load(self.key, cache_dir)
+        if self.track is not None:
+            self.fps, self.width, self.height = self.track.fps, self.track.width, self.track.height
+            self.frame_count = len(self.track)
+        else:
+            import cv2
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+            self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    @property
+    def cap(self):
+        """VideoCapture of the video, opened on first use."""
+        if self._cap is None:
+            import cv2
+            self._cap = cv2.VideoCapture(self.video_path)
+        return self._cap
+
+    @property
+    def cached(self):
+        return self.track is not None
+
+    def frames(self, decode=True):
+        """
+        Yield (frame, landmarks, visibility) for every frame of the video.
+        landmarks and visibility are None for frames without a pose detection.
+        With decode=False, cached landmarks are replayed without decoding the video and frame is None.
+        """
+        if self.track is None and self._extracts_up_front:
+            self.extract_parallel()
+        if self.track is not None:
+            yield from self._cached_frames(decode)
+        else:
+            yield from self._detected_frames()
+
+    def load(self):
+        """
+        Landmarks of the whole video, running pose inference first on a cache miss.
+        The video is rewound afterwards so frames() can replay it.
+        Returns:
+        LandmarkTrack: The per-frame landmarks and visibility.
+        """
+        if self.track is None:
+            if self._extracts_up_front:
+                self.extract_parallel()
+            else:
+                import cv2
+                for _ in self._detected_frames():
+                    pass
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self.track
+
+    @property
+    def _extracts_up_front(self):
+        return self.workers > 1 or bool(self.sampling_config)
+
+    def extract_parallel(self):
+        """Extract the landmarks of the whole video across self.workers processes and cache them."""
+        self.track = extract_landmarks_parallel(self.video_path, self.pose_config, self.workers, roi_config=self.roi_config,
+                                                sampling_config=self.sampling_config, pose=self.pose)
+        if self.key is not None:
+            landmark_cache.save(self.key, self.track, self.cache_dir)
+        return self.track
+
+    def _cached_frames(self, decode=True):
+        frame = None
+        for landmarks, visibility in zip(self.track.landmarks, self.track.visibility):
+            if decode:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+            if np.isnan(landmarks[0, 0]):
+                yield frame, None, None
+            else:
+                yield frame, landmarks, visibility
+
+    def _detected_frames(self):
+        recorder = LandmarkRecorder()
+        with contextlib.ExitStack() as stack:
+            if self.pose is not None:
+                pose = self.pose
+                # Drop tracking state left over from the previous video
+                pose.reset()
+            else:
+                pose = stack.enter_context(create_pose(self.pose_config))
+            roi = self._roi_tracker()
+            clock = FrameClock(self.cap, self.fps)
+            while True:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                landmarks, visibility, world_landmarks = detect(pose, frame, roi)
+                recorder.append(landmarks, visibility, clock(), world_landmarks)
+                yield frame, landmarks, visibility
+        # Only reached when the whole video was read
+        self._store_track(recorder)
+
+    def pipeline(self, analyze, encode=None, decode=True, analysis_workers=1, queue_size=QUEUE_SIZE, profiler=NULL_PROFILER):
+        """
+        Process the video in decode, inference, analysis and encode stages running on their own threads.
+        Parameters:
+        analyze (callable): analyze(index, frame, landmarks, visibility, timestamp) -> (frame, result), run in the
+            analysis stage; timestamp is the presentation time of the frame in seconds.
+        encode (callable): encode(frame) run on every analysed frame in order, e.g. a VideoWriter's write; None to skip.
+        decode (bool): With cached landmarks, whether to decode the video at all.
+        analysis_workers (int): Threads of the analysis stage; analyze then sees frames out of order.
+        profiler (Profiler): Records the wall time of every stage call and the queue depths.
+        Returns:
+        Pipeline: Iterate over it for (frame, result) in frame order. On a cache miss the landmarks
+        are cached once the whole video has gone through.
+        """
+        if self.track is None and self._extracts_up_front:
+            self.extract_parallel()
+
+        stages = []
+        on_complete = None
+        if self.track is not None:
+            source = enumerate((*frame, timestamp) for frame, timestamp in zip(self._cached_frames(decode), self.track.timestamps))
+        else:
+            recorder = LandmarkRecorder()
+            if self.pose is not None:
+                pose = self.pose
+                pose.reset()
+            else:
+                pose = self._own_pose = create_pose(self.pose_config)
+            roi = self._roi_tracker()
+
+            def infer(item):
+                index, (frame, timestamp) = item
+                landmarks, visibility, world_landmarks = detect(pose, frame, roi)
+                recorder.append(landmarks, visibility, timestamp, world_landmarks)
+                return index, (frame, landmarks, visibility, timestamp)
+
+            source = enumerate(self._read_frames())
+            stages.append(Stage('inference', infer))
+            on_complete = lambda: self._store_track(recorder)
+
+        stages.append(Stage('analysis', lambda item: analyze(item[0], *item[1]), analysis_workers))
+        if encode is not None:
+            def write(item):
+                frame, result = item
+                encode(frame)
+                return item
+            stages.append(Stage('encode', write))
+        return Pipeline(source, stages, queue_size=queue_size, on_complete=on_complete, profiler=profiler)
+
+    def _roi_tracker(self):
+        return RoiTracker(**self.roi_config) if self.roi_config else None
+
+    def _read_frames(self):
+        clock = FrameClock(self.cap, self.fps)
+        while True:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            yield frame, clock()
+
+    def _store_track(self, recorder):
+        meta = {'video_path': self.video_path, 'pose_config': self.pose_config, 'roi_config': self.roi_config}
+        self.track = recorder.to_track(self.fps, self.width, self.height, meta)
+        if self.key is not None:
+            landmark_cache.save(self.key, self.track, self.cache_dir)
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+        if self._own_pose is not None:
+            self._own_pose.close()
+            self._own_pose = None
+
+
+@contextlib.contextmanager
+def frame_result_writer(path=None):
+    """Context manager giving a function that writes one per-frame result dict as a JSON line to `path`, or stdout."""
+    f = open(path, 'w') if path else sys.stdout
+    try:
+        yield lambda result: f.write(json.dumps(result) + '\n')
+    finally:
+        if path:
+            f.close()
+
+
+def write_frame_results(results, path=None):
+    """Write per-frame result dicts as JSON lines to `path`, or to stdout when no path is given."""
+    with frame_result_writer(path) as write:
+        for result in results:
+            write(result)
+
+
+def load_landmarks(video_path, pose_config=None, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, workers=1, pose=None, roi_config=None,
+                   sampling_config=None):
+    """
+    Pose landmarks of every frame of a video.
+    On a cache hit nothing is decoded; on a miss pose inference runs once, across `workers`
+    processes or in the given `pose` graph, and the result is cached.
+    Returns:
+    LandmarkTrack: The per-frame landmarks and visibility.
+    """
+    video = PoseVideo(video_path, pose_config, cache_dir, use_cache, workers, pose, roi_config, sampling_config)
+    try:
+        return video.load()
+    finally:
+        video.release()
@@ -0,0 +1,100 @@
+"""
+Temporal filters for pose landmarks.
+
+Landmark jitter is amplified by the arccos in the angle functions and again by every
+derivative. Filtering the landmarks of each frame before the angles are computed damps
+it at the source. A causal filter cannot do so without lag, though: the smoother the
+landmarks, the later fast changes show up in the angles and their derivatives, so the
+filter settings and the derivative window are tuned together. Filters smooth all 33 x 3
+coordinates of a frame at once, use only past frames, and restart after a gap in the
+detections longer than tools.gap_threshold() of the recent frame intervals.
+"""
+
+import collections
+import math
+
+import numpy as np
+
+from tools import gap_threshold
+
+FILTER_NAMES = ['none', 'one-euro']
+# Frame intervals the gap threshold is taken from
+GAP_HISTORY = 31
+
+
+class OneEuroFilter:
+    """
+    One Euro filter (Casiez et al., CHI 2012): an exponential smoother whose cutoff rises with
+    the speed of each coordinate, so slow jitter is smoothed hard while fast motion lags little.
+    Cutoffs are in Hz, and beta in Hz per unit per second of the filtered values (normalized
+    image coordinates for landmarks).
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=2.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._intervals = collections.deque(maxlen=GAP_HISTORY)
+        self.reset()
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+    def __call__(self, values, timestamp):
+        """Filter the values of one frame taken at `timestamp` seconds; None (no detection) passes through."""
+        if values is None:
+            return None
+        values = np.asarray(values, dtype=float)
+        dt = timestamp - self._timestamp if self._timestamp is not None else 0.0
+        max_gap = gap_threshold(self._intervals)
+        if dt > 0:
+            self._intervals.append(dt)
+        if self._value is None or not 0 < dt <= max_gap:
+            self._value = values
+            self._speed = np.zeros_like(values)
+        else:
+            speed = (values - self._value) / dt
+            self._speed += self._alpha(self.d_cutoff, dt) * (speed - self._speed)
+            cutoff = self.min_cutoff + self.beta * np.abs(self._speed)
+            self._value = self._value + self._alpha(cutoff, dt) * (values - self._value)
+        self._timestamp = timestamp
+        return self._value
+
+    def reset(self):
+        self._value = None
+        self._speed = None
+        self._timestamp = None
+        self._intervals.clear()
+
+
+def create_landmark_filter(name, **params):
+    """
+    Landmark filter by name.
+    Parameters:
+    name (str): One of FILTER_NAMES; 'none' or None for no filtering.
+    params: Passed on to the filter, e.g. min_cutoff and beta for 'one-euro'.
+    Returns:
+    callable: filter(landmarks, timestamp) -> filtered landmarks, or None for no filtering.
+    """
+    if name in (None, 'none'):
+        return None
+    if name == 'one-euro':
+        return OneEuroFilter(**params)
+    raise ValueError(f"Unknown landmark filter {name!r}, expected one of {FILTER_NAMES}")
+
+
+def filter_landmarks(landmarks, timestamps, landmark_filter):
+    """
+    Run a landmark filter over a whole track.
+    Parameters:
+    landmarks (np.ndarray): (n_frames, 33, 3) landmarks, NaN for frames without a detection.
+    timestamps (np.ndarray): Frame times in seconds.
+    Returns:
+    np.ndarray: The filtered landmarks, NaN where the input is.
+    """
+    filtered = np.full(np.shape(landmarks), np.nan)
+    for i, (frame, timestamp) in enumerate(zip(landmarks, timestamps)):
+        if not np.isnan(frame[0, 0]):
+            filtered[i] = landmark_filter(frame, timestamp)
+    return filtered
@@ -0,0 +1,81 @@
+"""
+Bounded-memory history of joint series.
+
+A RingHistory keeps the last `horizon` frames of a set of channels (one per joint) in a
+preallocated float32 ring buffer, so a long session holds a fixed amount of memory and
+creates no Python objects per frame. Rows that drop out of the horizon can be spilled
+to an append-only file of raw float32 rows, which load_spill() memory-maps again.
+"""
+
+import os
+
+import numpy as np
+
+# Horizon when the length of the session is not known up front, e.g. for live sources
+DEFAULT_HISTORY_SECONDS = 600
+SPILL_DTYPE = np.float32
+
+
+class RingHistory:
+    """The last `horizon` rows of a multi-channel series; missing values are NaN."""
+
+    def __init__(self, channels, horizon, spill_path=None):
+        """
+        Parameters:
+        channels (list): Channel names, e.g. joint names, in column order.
+        horizon (int): Number of most recent rows kept in memory.
+        spill_path (str): Optional file the rows leaving the horizon are appended to.
+        """
+        if horizon < 1:
+            raise ValueError("horizon must be at least one row")
+        self.channels = list(channels)
+        self.horizon = horizon
+        self.spill_path = spill_path
+        self._buffer = np.full((horizon, len(self.channels)), np.nan, dtype=SPILL_DTYPE)
+        self._head = 0
+        # Rows appended in total, including those no longer held in memory
+        self.count = 0
+        self._spill = open(spill_path, 'wb') if spill_path else None
+
+    def __len__(self):
+        return min(self.count, self.horizon)
+
+    def append(self, values):
+        """Add one row, given as a dict of channel to value (absent channels are NaN) or a sequence in channel order."""
+        if isinstance(values, dict):
+            values = [values.get(channel, np.nan) for channel in self.channels]
+        if self.count >= self.horizon and self._spill is not None:
+            self._spill.write(self._buffer[self._head].tobytes())
+        self._buffer[self._head] = values
+        self._head = (self._head + 1) % self.horizon
+        self.count += 1
+
+    def values(self, include_spilled=False):
+        """
+        Rows oldest first as an (n_rows, n_channels) float32 array.
+        With include_spilled, rows already written to the spill file come first.
+        """
+        if self.count < self.horizon:
+            recent = self._buffer[:self.count].copy()
+        else:
+            recent = np.concatenate([self._buffer[self._head:], self._buffer[:self._head]])
+        if include_spilled and self._spill is not None:
+            self._spill.flush()
+            return np.concatenate([load_spill(self.spill_path, len(self.channels)), recent])
+        return recent
+
+    def series(self, include_spilled=False):
+        """Channel name to its values, oldest first."""
+        return dict(zip(self.channels, self.values(include_spilled).T))
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+def load_spill(path, n_channels):
+    """Memory-map the rows of a spill file as an (n_rows, n_channels) array."""
+    if os.path.getsize(path) == 0:
+        return np.empty((0, n_channels), dtype=SPILL_DTYPE)
+    return np.memmap(path, dtype=SPILL_DTYPE, mode='r').reshape(-1, n_channels)
@@ -0,0 +1,133 @@
+"""
+Joint angles from MediaPipe world landmarks in joint coordinate systems (Grood & Suntay).
+
+The image-based angles in tools measure each angle between 2D projections of the
+landmarks, so they change with the camera's viewpoint and have no axial rotation.
+Here every frame gets a pelvis, thigh and shank coordinate system built from the
+world landmarks (metres, centred between the hips), and each joint's rotation
+matrix is decomposed in the flexion, ab/adduction, axial rotation order of the
+JCS. All frames and both sides are solved at once on (n_frames, 2, 3, 3) arrays.
+
+Segment axes are X anterior, Y superior and Z to the athlete's right, for both legs:
+- pelvis: Z from the left to the right hip, Y towards the mid-shoulder point.
+- thigh: Y from the knee to the hip. With the knee bent, X lies in the plane of hip,
+  knee and ankle, pointing away from the ankle, i.e. the knee is taken as a hinge.
+  Towards a straight knee that plane is undefined, so X blends into the pelvis's X.
+- shank: Y from the ankle to the knee, X along the foot, from the heel to the toe.
+
+MediaPipe has no anatomical markers, only joint centres and the foot, so one rotation
+is not observable: with a bent knee, medial collapse shows as hip rotation and
+adduction rather than knee valgus. Angles follow the signs of LESS.angledist.
+"""
+
+import numpy as np
+
+from tools import (LEFT_ANKLE, LEFT_FOOT_INDEX, LEFT_HEEL, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, RIGHT_ANKLE,
+                   RIGHT_FOOT_INDEX, RIGHT_HEEL, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER)
+
+# Column order of calculate_jcs_angles_batch, as the measurements of LESS.angledist
+JCS_ANGLE_NAMES = [
+    "Left Knee Flexion", "Right Knee Flexion",
+    "Left Knee Valgus", "Right Knee Valgus",
+    "Left Tibial Rotation", "Right Tibial Rotation",
+    "Left Hip Flexion", "Right Hip Flexion",
+    "Left Hip Adduction", "Right Hip Adduction",
+    "Left Hip Rotation", "Right Hip Rotation"
+]
+# Knee flexion, in degrees, from which the thigh's anterior axis comes from the knee alone
+HINGE_FLEXION = 30
+# Sign of the ab/adduction and axial rotation angles of the left and the right leg, so that
+# adduction, varus and internal rotation are positive on both sides
+_SIDE_SIGNS = np.array([-1.0, 1.0])
+
+
+def _unit(vectors):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def _frame(x, y, z):
+    """(..., 3, 3) rotation matrices with the axes as columns."""
+    return np.stack([x, y, z], axis=-1)
+
+
+def segment_frames(world_landmarks):
+    """
+    Pelvis, thigh and shank coordinate systems of every frame.
+    Parameters:
+    world_landmarks (np.ndarray): (n_frames, 33, 3) world landmarks.
+    Returns:
+    tuple: (pelvis, thigh, shank) rotation matrices with the X, Y, Z axes as columns; pelvis is
+    (n_frames, 3, 3), thigh and shank (n_frames, 2, 3, 3) with the left leg first.
+    """
+    world_landmarks = np.asarray(world_landmarks, dtype=np.float64)
+    shoulder = world_landmarks[:, [LEFT_SHOULDER, RIGHT_SHOULDER]]
+    hip = world_landmarks[:, [LEFT_HIP, RIGHT_HIP]]
+    knee = world_landmarks[:, [LEFT_KNEE, RIGHT_KNEE]]
+    ankle = world_landmarks[:, [LEFT_ANKLE, RIGHT_ANKLE]]
+    heel = world_landmarks[:, [LEFT_HEEL, RIGHT_HEEL]]
+    toe = world_landmarks[:, [LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX]]
+
+    right = _unit(hip[:, 1] - hip[:, 0])
+    up = shoulder.mean(axis=1) - hip.mean(axis=1)
+    anterior = _unit(np.cross(up, right))
+    pelvis = _frame(anterior, np.cross(right, anterior), right)
+
+    thigh_y = _unit(hip - knee)
+    knee_to_ankle = ankle - knee
+    # The part of the shank perpendicular to the thigh points backwards, by the sine of the knee flexion
+    behind = knee_to_ankle - np.einsum('...i,...i->...', knee_to_ankle, thigh_y)[..., None] * thigh_y
+    with np.errstate(invalid='ignore', divide='ignore'):
+        behind /= np.linalg.norm(knee_to_ankle, axis=-1, keepdims=True)
+    # Only its backward part counts towards the hinge, so a straight knee in valgus keeps the pelvis's axis
+    flexion_sine = np.clip(-np.einsum('...i,...i->...', behind, anterior[:, None]), 0, None)
+    pelvis_weight = 1 - np.minimum(1, flexion_sine / np.sin(np.radians(HINGE_FLEXION)))[..., None]
+    anterior_reference = pelvis_weight * anterior[:, None] - (1 - pelvis_weight) * behind
+    thigh_z = _unit(np.cross(anterior_reference, thigh_y))
+    thigh = _frame(np.cross(thigh_y, thigh_z), thigh_y, thigh_z)
+
+    shank_y = _unit(knee - ankle)
+    shank_z = _unit(np.cross(toe - heel, shank_y))
+    shank = _frame(np.cross(shank_y, shank_z), shank_y, shank_z)
+    return pelvis, thigh, shank
+
+
+def joint_rotations(proximal, distal):
+    """
+    Flexion, ab/adduction and axial rotation of distal segments relative to proximal ones.
+    The relative rotation is decomposed as Z (flexion axis of the proximal segment), then
+    the floating X axis, then Y (long axis of the distal segment).
+    Parameters:
+    proximal, distal (np.ndarray): (..., 3, 3) segment frames, broadcast against each other.
+    Returns:
+    np.ndarray: (..., 3) angles in degrees about Z, X and Y.
+    """
+    rotation = np.einsum('...ji,...jk->...ik', proximal, distal)
+    angles = np.empty(rotation.shape[:-1])
+    angles[..., 0] = np.arctan2(-rotation[..., 0, 1], rotation[..., 1, 1])
+    angles[..., 1] = np.arcsin(np.clip(rotation[..., 2, 1], -1.0, 1.0))
+    angles[..., 2] = np.arctan2(-rotation[..., 2, 0], rotation[..., 2, 2])
+    return np.degrees(angles)
+
+
+def calculate_jcs_angles_batch(world_landmarks):
+    """
+    Calculate the knee and hip angles of every frame from world landmarks in one vectorized pass.
+    Parameters:
+    world_landmarks (np.ndarray): (n_frames, 33, 3) world landmarks, e.g. LandmarkTrack.world_landmarks.
+    Returns:
+    np.ndarray: (n_frames, 12) angles in degrees, columns ordered as JCS_ANGLE_NAMES; NaN for
+    frames without a detection. Knee flexion, varus, adduction and internal rotation are
+    positive and hip flexion negative, as in LESS.angledist.
+    """
+    pelvis, thigh, shank = segment_frames(world_landmarks)
+    knee = joint_rotations(thigh, shank)
+    hip = joint_rotations(pelvis[:, None], thigh)
+    angles = np.empty((len(pelvis), len(JCS_ANGLE_NAMES)))
+    angles[:, 0:2] = -knee[..., 0]
+    angles[:, 2:4] = _SIDE_SIGNS * knee[..., 1]
+    angles[:, 4:6] = _SIDE_SIGNS * knee[..., 2]
+    angles[:, 6:8] = -hip[..., 0]
+    angles[:, 8:10] = _SIDE_SIGNS * hip[..., 1]
+    angles[:, 10:12] = _SIDE_SIGNS * hip[..., 2]
+    return angles
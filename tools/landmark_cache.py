@@ -0,0 +1,203 @@
+"""
+Content-addressed cache of raw pose-estimation output.
+
+Entries are keyed by the SHA-256 of the video bytes plus the pose model
+configuration, and stored as a directory of .npy files that are memory-mapped
+on load, so re-scoring a clip never has to run pose inference again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from importlib import metadata
+
+import numpy as np
+
+from tools import NUM_LANDMARKS
+
+# Bump when the on-disk layout changes so stale entries are ignored
+CACHE_VERSION = 3
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'LESS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'less', 'landmarks'))
+
+DEFAULT_POSE_CONFIG = {'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5}
+
+
+class LandmarkTrack:
+    """Per-frame pose landmarks of one video."""
+
+    def __init__(self, landmarks, visibility, fps, width, height, meta=None, timestamps=None, world_landmarks=None):
+        """
+        Parameters:
+        landmarks (np.ndarray): (n_frames, 33, 3) float32 x, y, z; NaN for frames without a detection.
+        visibility (np.ndarray): (n_frames, 33) float32 landmark visibility; 0 for frames without a detection.
+        fps (float): Frame rate of the video.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        meta (dict): Extra metadata stored alongside the arrays.
+        timestamps (np.ndarray): (n_frames,) float64 presentation time of every frame in seconds.
+            Defaults to frame index / fps when the video did not report them, or reported times
+            that do not strictly increase.
+        world_landmarks (np.ndarray): (n_frames, 33, 3) float32 x, y, z in metres from MediaPipe's
+            pose_world_landmarks, centred between the hips; NaN for frames without a detection.
+        """
+        self.landmarks = landmarks
+        self.visibility = visibility
+        if timestamps is not None and not (np.diff(timestamps) > 0).all():
+            # Some backends report 0 or repeat the last position for every frame
+            timestamps = None
+        if timestamps is None and fps:
+            timestamps = np.arange(len(landmarks)) / fps
+        self.timestamps = timestamps
+        self.world_landmarks = world_landmarks
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.meta = meta or {}
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    @property
+    def detected(self):
+        """Boolean mask of frames with a pose detection."""
+        return ~np.isnan(self.landmarks[:, 0, 0])
+
+
+class LandmarkRecorder:
+    """Collects per-frame pose results into the arrays of a LandmarkTrack."""
+
+    def __init__(self):
+        self._landmarks = []
+        self._visibility = []
+        self._timestamps = []
+        self._world_landmarks = []
+
+    def __len__(self):
+        return len(self._landmarks)
+
+    def append(self, landmarks=None, visibility=None, timestamp=None, world_landmarks=None):
+        """Record one frame at `timestamp` seconds; pass None landmarks for frames without a detection."""
+        if landmarks is None:
+            landmarks = np.full((NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+            visibility = np.zeros(NUM_LANDMARKS, dtype=np.float32)
+            world_landmarks = None
+        if world_landmarks is None:
+            world_landmarks = np.full((NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+        self._landmarks.append(landmarks)
+        self._visibility.append(visibility)
+        self._timestamps.append(timestamp)
+        self._world_landmarks.append(world_landmarks)
+
+    def to_track(self, fps, width, height, meta=None):
+        landmarks = np.array(self._landmarks, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3)
+        world_landmarks = np.array(self._world_landmarks, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3)
+        visibility = np.array(self._visibility, dtype=np.float32).reshape(-1, NUM_LANDMARKS)
+        timestamps = None
+        if self._timestamps and None not in self._timestamps:
+            timestamps = np.array(self._timestamps, dtype=np.float64)
+        return LandmarkTrack(landmarks, visibility, fps, width, height, meta, timestamps, world_landmarks)
+
+
+def _file_digest(video_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(video_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def hash_video(video_path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    SHA-256 of the video contents.
+    The digest is memoised per (path, size, mtime) so unchanged files are only read once.
+    """
+    stat = os.stat(video_path)
+    stat_key = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    index_dir = os.path.join(cache_dir, 'index')
+    index_path = os.path.join(index_dir, hashlib.sha1(stat_key.encode()).hexdigest())
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            return f.read().strip()
+    digest = _file_digest(video_path)
+    os.makedirs(index_dir, exist_ok=True)
+    _write_atomic(index_path, digest)
+    return digest
+
+
+def _mediapipe_version():
+    try:
+        return metadata.version('mediapipe')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def cache_key(video_path, pose_config=None, cache_dir=DEFAULT_CACHE_DIR, roi_config=None, sampling_config=None):
+    """Key identifying the landmarks of a video under a pose model configuration and, if used, ROI and sampling settings."""
+    identity = {
+        'version': CACHE_VERSION,
+        'video': hash_video(video_path, cache_dir),
+        'pose_config': pose_config or DEFAULT_POSE_CONFIG,
+        'mediapipe': _mediapipe_version(),
+    }
+    if roi_config:
+        identity['roi_config'] = roi_config
+    if sampling_config:
+        identity['sampling_config'] = sampling_config
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+def load(key, cache_dir=DEFAULT_CACHE_DIR):
+    """Load a cached LandmarkTrack with memory-mapped arrays, or None on a miss."""
+    entry_dir = os.path.join(cache_dir, key)
+    meta_path = os.path.join(entry_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    landmarks = np.load(os.path.join(entry_dir, 'landmarks.npy'), mmap_mode='r')
+    visibility = np.load(os.path.join(entry_dir, 'visibility.npy'), mmap_mode='r')
+    timestamps = np.load(os.path.join(entry_dir, 'timestamps.npy'))
+    world_path = os.path.join(entry_dir, 'world_landmarks.npy')
+    world_landmarks = np.load(world_path, mmap_mode='r') if os.path.exists(world_path) else None
+    return LandmarkTrack(landmarks, visibility, meta['fps'], meta['width'], meta['height'], meta, timestamps,
+                         world_landmarks)
+
+
+def save(key, track, cache_dir=DEFAULT_CACHE_DIR):
+    """Write a LandmarkTrack to the cache. Entries appear atomically; an existing entry is kept."""
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(entry_dir):
+        return entry_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        np.save(os.path.join(tmp_dir, 'landmarks.npy'), np.asarray(track.landmarks, dtype=np.float32))
+        np.save(os.path.join(tmp_dir, 'visibility.npy'), np.asarray(track.visibility, dtype=np.float32))
+        np.save(os.path.join(tmp_dir, 'timestamps.npy'), np.asarray(track.timestamps, dtype=np.float64))
+        if track.world_landmarks is not None:
+            np.save(os.path.join(tmp_dir, 'world_landmarks.npy'), np.asarray(track.world_landmarks, dtype=np.float32))
+        meta = dict(track.meta, version=CACHE_VERSION, fps=track.fps, width=track.width,
+                    height=track.height, frame_count=len(track))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another process wrote the same entry first
+        if not os.path.exists(os.path.join(entry_dir, 'meta.json')):
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return entry_dir
@@ -0,0 +1,141 @@
+"""
+Live capture from a webcam or a network stream (RTSP, UDP, HTTP).
+
+A reader thread keeps grabbing frames as fast as the source delivers them and holds
+on to the newest one only, stamped with its capture time. Analysis always gets the
+newest frame, and a frame already older than the latency budget is skipped for the
+next one, so a slow analysis step drops frames instead of falling further behind.
+"""
+
+import os
+import threading
+import time
+
+# Oldest a frame may be, in seconds since it was grabbed, when analysis picks it up
+DEFAULT_LATENCY_BUDGET = 0.2
+# Longest release() waits for the reader thread, which a stalled stream can keep blocked in grab()
+RELEASE_TIMEOUT = 1.0
+
+
+def open_capture(source):
+    """VideoCapture for a camera index ('0', '1', ...), a stream URL or a video file."""
+    import cv2
+    source = str(source)
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not cap.isOpened():
+        raise IOError(f"Unable to open video source {source}")
+    # Keep the backend from queueing frames ahead of us where it supports it
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+class LatestFrameReader:
+    """
+    Reads a live source on a background thread, keeping only the newest frame.
+    Timestamps are time.monotonic() seconds taken when each frame was grabbed.
+    """
+
+    def __init__(self, source, latency_budget=DEFAULT_LATENCY_BUDGET):
+        import cv2
+        self.cap = open_capture(source)
+        self.latency_budget = latency_budget
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # Video files are replayed at their frame rate, as a camera would deliver them
+        self.frame_interval = 1 / self.fps if os.path.isfile(str(source)) and self.fps > 0 else None
+        # Frames grabbed from the source, and those never analysed because a newer one replaced them or they went stale
+        self.captured = 0
+        self.dropped = 0
+        self._frame = None
+        self._timestamp = None
+        self._ended = False
+        self._running = False
+        # Set once the reader thread has stopped, and when release() left the capture for it to close
+        self._stopped = False
+        self._abandoned = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self._read_source()
+        finally:
+            with self._condition:
+                self._stopped = True
+                if self._abandoned:
+                    self.cap.release()
+
+    def _read_source(self):
+        start = time.monotonic()
+        while self._running:
+            if self.frame_interval is not None:
+                time.sleep(max(0.0, start + self.captured * self.frame_interval - time.monotonic()))
+            # Stamp the frame when it is grabbed, before the slower decode in retrieve()
+            grabbed = self.cap.grab()
+            timestamp = time.monotonic()
+            ret, frame = self.cap.retrieve() if grabbed else (False, None)
+            with self._condition:
+                if not ret:
+                    self._ended = True
+                    self._condition.notify_all()
+                    return
+                self.captured += 1
+                if self._frame is not None:
+                    self.dropped += 1
+                self._frame, self._timestamp = frame, timestamp
+                self._condition.notify_all()
+
+    def read(self, timeout=None):
+        """
+        The newest frame not returned before, waiting for one if needed.
+        Frames older than the latency budget are dropped in favour of the next one.
+        Returns:
+        tuple: (frame, timestamp), or (None, None) when the source has ended or the timeout expired.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not self._condition.wait_for(lambda: self._frame is not None or self._ended, remaining):
+                    return None, None
+                if self._frame is None:
+                    return None, None
+                frame, timestamp = self._frame, self._timestamp
+                self._frame = None
+                if time.monotonic() - timestamp <= self.latency_budget:
+                    return frame, timestamp
+                self.dropped += 1
+
+    def frames(self):
+        """Yield (frame, timestamp) of the newest frames until the source ends."""
+        while True:
+            frame, timestamp = self.read()
+            if frame is None:
+                return
+            yield frame, timestamp
+
+    def release(self, timeout=RELEASE_TIMEOUT):
+        """
+        Stop reading and close the source. A reader thread still blocked in grab() after `timeout`
+        seconds is not waited for; it closes the capture itself once grab() returns.
+        """
+        self._running = False
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        with self._condition:
+            if self._stopped or not self._thread.is_alive():
+                self.cap.release()
+            else:
+                self._abandoned = True
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.release()
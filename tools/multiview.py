@@ -0,0 +1,194 @@
+"""
+Synchronized multi-camera pose tracks.
+
+The LESS protocol films a landing from the front and from the side. extract_views()
+runs pose inference on every view at the same time, one worker process and Pose graph
+per view, so the wall time stays close to that of the longest single view.
+sync_offsets() puts the views on one clock: the videos' own timestamps (cameras started
+together or hardware-synced), a flash visible in every view, or offsets measured
+elsewhere, e.g. from the audio. align_views() resamples every view onto the frames of a
+reference view. calculate_multiview_angles() then takes each joint angle from the view
+whose image plane contains it: flexion from the sagittal view, valgus and adduction from
+the frontal one.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tools import (ANGLE_NAMES, LEFT_ANKLE, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, MAX_TIMESTAMP_GAP, RIGHT_ANKLE,
+                   RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, _angles_between)
+from tools.extraction import frame_timestamp, load_landmarks
+from tools.landmark_cache import DEFAULT_CACHE_DIR, LandmarkTrack
+
+VIEWS = ['frontal', 'sagittal']
+SYNC_METHODS = ['timestamp', 'flash']
+# Views whose image plane each angle is measured in, in ANGLE_NAMES order
+ANGLE_VIEWS = ['sagittal'] * 4 + ['frontal'] * 4
+# Seconds from the start of each video searched for the sync flash
+FLASH_SEARCH_SECONDS = 10
+# Smallest rise in mean brightness, in grey levels, from one frame to the next that counts as the flash
+FLASH_MIN_JUMP = 20
+
+
+def _extract_view(video_path, pose_config, cache_dir, use_cache, roi_config, sampling_config):
+    return load_landmarks(video_path, pose_config, cache_dir, use_cache, roi_config=roi_config,
+                          sampling_config=sampling_config)
+
+
+def extract_views(video_paths, pose_config=None, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, roi_config=None,
+                  sampling_config=None, parallel=True):
+    """
+    Landmarks of every view, extracted concurrently in one spawned process per view.
+    Parameters:
+    video_paths (dict): View name (e.g. 'frontal', 'sagittal') to video path.
+    parallel (bool): False extracts the views one after the other in this process.
+    Returns:
+    dict: View name to its LandmarkTrack.
+    """
+    args = (pose_config, cache_dir, use_cache, roi_config, sampling_config)
+    if not parallel or len(video_paths) == 1:
+        return {view: _extract_view(path, *args) for view, path in video_paths.items()}
+    # Spawned workers so each one starts its own MediaPipe graph from a clean state
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(video_paths), mp_context=context) as executor:
+        futures = {view: executor.submit(_extract_view, path, *args) for view, path in video_paths.items()}
+        return {view: future.result() for view, future in futures.items()}
+
+
+def detect_flash(video_path, search_seconds=FLASH_SEARCH_SECONDS):
+    """
+    Time in seconds of a sync flash: the largest rise in mean brightness between two frames.
+    Returns:
+    float: Presentation time of the first bright frame, or None if no rise reaches FLASH_MIN_JUMP.
+    """
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    brightness, timestamps = [], []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        timestamp = frame_timestamp(cap)
+        if timestamp > search_seconds:
+            break
+        # Every 8th pixel is plenty for a mean
+        brightness.append(frame[::8, ::8].mean())
+        timestamps.append(timestamp)
+    cap.release()
+    if len(brightness) < 2:
+        return None
+    jumps = np.diff(brightness)
+    index = int(np.argmax(jumps))
+    return timestamps[index + 1] if jumps[index] >= FLASH_MIN_JUMP else None
+
+
+def sync_offsets(video_paths, method='timestamp', reference='sagittal'):
+    """
+    Seconds to add to the timestamps of every view to bring it onto the reference view's clock.
+    Parameters:
+    video_paths (dict): View name to video path.
+    method (str): 'timestamp' when the videos started together, 'flash' to line up a flash seen by every view.
+    Returns:
+    dict: View name to offset in seconds.
+    """
+    if method == 'timestamp':
+        return {view: 0.0 for view in video_paths}
+    if method != 'flash':
+        raise ValueError(f"Unknown sync method {method!r}, expected one of {SYNC_METHODS}")
+    flashes = {view: detect_flash(path) for view, path in video_paths.items()}
+    missing = [view for view, flash in flashes.items() if flash is None]
+    if missing:
+        raise ValueError(f"No sync flash found in the {', '.join(missing)} view")
+    return {view: flashes[reference] - flash for view, flash in flashes.items()}
+
+
+def resample_track(track, timestamps, offset=0.0):
+    """
+    Landmarks of a track at other times, linearly interpolated between its two nearest frames.
+    Parameters:
+    track (LandmarkTrack): The view to resample.
+    timestamps (np.ndarray): Times to sample at, on the clock the offset brings the track onto.
+    offset (float): Seconds added to the track's own timestamps.
+    Returns:
+    tuple: ((n, 33, 3) landmarks, (n, 33) visibility); NaN and 0 where the times are outside the track, or
+    either neighbouring frame has no detection or lies more than MAX_TIMESTAMP_GAP away.
+    """
+    own = np.asarray(track.timestamps) + offset
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    landmarks = np.full((len(timestamps),) + track.landmarks.shape[1:], np.nan, dtype=np.float32)
+    visibility = np.zeros((len(timestamps),) + track.visibility.shape[1:], dtype=np.float32)
+    if len(own) < 2:
+        return landmarks, visibility
+    after = np.clip(np.searchsorted(own, timestamps), 1, len(own) - 1)
+    before = after - 1
+    valid = ((timestamps >= own[0]) & (timestamps <= own[-1])
+             & (own[after] - own[before] <= MAX_TIMESTAMP_GAP) & track.detected[before] & track.detected[after])
+    before, after, at = before[valid], after[valid], timestamps[valid]
+    weight = ((at - own[before]) / (own[after] - own[before]))[:, None, None]
+    source = np.asarray(track.landmarks)
+    landmarks[valid] = source[before] + weight * (source[after] - source[before])
+    visibility[valid] = np.minimum(track.visibility[before], track.visibility[after])
+    return landmarks, visibility
+
+
+def align_views(tracks, offsets=None, reference='sagittal'):
+    """
+    Every view resampled onto the frames of the reference view.
+    Parameters:
+    tracks (dict): View name to LandmarkTrack.
+    offsets (dict): View name to seconds added to its timestamps, as from sync_offsets; 0 for missing views.
+    Returns:
+    dict: View name to a LandmarkTrack with the reference view's frames, fps and timestamps.
+    """
+    offsets = offsets or {}
+    base = tracks[reference]
+    timestamps = np.asarray(base.timestamps) + offsets.get(reference, 0.0)
+    aligned = {}
+    for view, track in tracks.items():
+        if view == reference and not offsets.get(view):
+            aligned[view] = track
+            continue
+        landmarks, visibility = resample_track(track, timestamps, offsets.get(view, 0.0))
+        aligned[view] = LandmarkTrack(landmarks, visibility, base.fps, track.width, track.height,
+                                      dict(track.meta, aligned_to=reference), base.timestamps)
+    return aligned
+
+
+def _image_plane(landmarks, width, height):
+    """x, y of landmarks in square units of the image width."""
+    points = np.asarray(landmarks, dtype=np.float64)[..., :2].copy()
+    if width and height:
+        points[..., 1] *= height / width
+    return points
+
+
+def calculate_multiview_angles(frontal, sagittal):
+    """
+    Joint angles with each one measured in the image plane of the view it lies in.
+    Parameters:
+    frontal, sagittal (LandmarkTrack): Views on the same frames, e.g. from align_views.
+    Returns:
+    np.ndarray: (n_frames, 8) angles in degrees, columns as ANGLE_NAMES and in the conventions of
+    calculate_pose_angles_batch: flexion from the sagittal view, valgus and adduction from the frontal view.
+    """
+    side = _image_plane(sagittal.landmarks, sagittal.width, sagittal.height)
+    front = _image_plane(frontal.landmarks, frontal.width, frontal.height)
+
+    def joints(points, *indices):
+        return [points[:, [left, right]] for left, right in indices]
+
+    shoulder, hip, knee, ankle = joints(side, (LEFT_SHOULDER, RIGHT_SHOULDER), (LEFT_HIP, RIGHT_HIP),
+                                        (LEFT_KNEE, RIGHT_KNEE), (LEFT_ANKLE, RIGHT_ANKLE))
+    angles = np.empty((len(side), len(ANGLE_NAMES)))
+    angles[:, 0:2] = _angles_between(hip - knee, ankle - knee)
+    angles[:, 2:4] = _angles_between(shoulder - hip, knee - hip)
+
+    hip, knee, ankle = joints(front, (LEFT_HIP, RIGHT_HIP), (LEFT_KNEE, RIGHT_KNEE), (LEFT_ANKLE, RIGHT_ANKLE))
+    # Femur vs tibia, and the thigh vs the downward vertical less 90, as in the single-view angles
+    angles[:, 4:6] = _angles_between(hip - knee, ankle - knee)
+    thigh = knee - hip
+    cosine_angle = np.clip(thigh[..., 1] / np.linalg.norm(thigh, axis=-1), -1.0, 1.0)
+    angles[:, 6:8] = np.degrees(np.arccos(cosine_angle)) - 90
+    return angles
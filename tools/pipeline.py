@@ -0,0 +1,242 @@
+"""
+Staged frame pipeline with bounded queues.
+
+Decoding, pose inference, analysis and encoding each run on their own threads and
+are connected by bounded queues, so OpenCV's decoder and encoder and the MediaPipe
+graph overlap instead of running strictly in turn. A full queue blocks the stage
+feeding it (back-pressure), results are reassembled in frame order, and every stage
+counts its items and the time it spent working, starved and blocked.
+"""
+
+import heapq
+import queue
+import threading
+import time
+
+from tools.profiling import NULL_PROFILER
+
+# Items held between two stages
+QUEUE_SIZE = 8
+# Seconds between checks for a stopped pipeline while blocked on a queue
+_POLL_INTERVAL = 0.1
+# Marks the end of the items sent to a queue
+_DONE = object()
+
+
+class Stage:
+    """
+    A pipeline step applying `fn` to each item on `workers` threads.
+    A stage with a single worker receives its items in order.
+    """
+
+    def __init__(self, name, fn, workers=1):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.items = 0
+        # Seconds summed over the workers: in fn, waiting for input, waiting for room downstream
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def _count(self, busy, starved, blocked):
+        with self._lock:
+            self.items += 1
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+
+    @property
+    def throughput(self):
+        """Items per second the stage can sustain with all its workers busy."""
+        return self.items * self.workers / self.busy if self.busy > 0 else float('inf')
+
+    def stats(self):
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items': self.items,
+            'busy_seconds': self.busy,
+            'starved_seconds': self.starved,
+            'blocked_seconds': self.blocked,
+            'throughput': self.throughput,
+        }
+
+
+class _OrderedReader:
+    """Reads (index, item) pairs from a queue and returns them in index order."""
+
+    def __init__(self, get):
+        self._get = get
+        self._buffer = []
+        self._next = 0
+        self._done = False
+
+    def __call__(self):
+        while True:
+            if self._buffer and self._buffer[0][0] == self._next:
+                self._next += 1
+                return heapq.heappop(self._buffer)
+            if self._done:
+                return _DONE
+            item = self._get()
+            if item is _DONE:
+                self._done = True
+            else:
+                heapq.heappush(self._buffer, item)
+
+
+class Pipeline:
+    """
+    Run the items of `source` through `stages` in order.
+    The source is iterated on its own thread as the first stage, named `source_name`.
+    Iterating over the pipeline yields the output of the last stage in source order.
+    `on_complete` is called once the whole source has gone through every stage.
+    A `profiler` records the wall time of every stage call and the depth of the queue
+    into each stage (named after the stage; 'output' feeds the caller).
+    """
+
+    def __init__(self, source, stages, source_name='decode', queue_size=QUEUE_SIZE, on_complete=None, profiler=NULL_PROFILER):
+        self.source = source
+        self.source_stage = Stage(source_name, None)
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.on_complete = on_complete
+        self.profiler = profiler
+        self._stop = threading.Event()
+        self._error = None
+        self._threads = []
+
+    def __iter__(self):
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        self._start(queues)
+        read = _OrderedReader(lambda: self._get(queues[-1]))
+        try:
+            while True:
+                item = read()
+                if item is _DONE:
+                    break
+                yield item[1]
+            if self._error is not None:
+                raise self._error
+        finally:
+            self.close()
+        if self.on_complete is not None:
+            self.on_complete()
+
+    def close(self):
+        """Stop all stages and wait for their threads."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        """Counters of every stage, the source first."""
+        return [stage.stats() for stage in [self.source_stage] + self.stages]
+
+    def _start(self, queues):
+        next_workers = [stage.workers for stage in self.stages] + [1]
+        # Queues are named after the stage they feed
+        queue_names = [stage.name for stage in self.stages] + ['output']
+        self._threads.append(threading.Thread(target=self._read_source, args=(queues[0], queue_names[0], next_workers[0]),
+                                              name=self.source_stage.name, daemon=True))
+        for i, stage in enumerate(self.stages):
+            stage._active = stage.workers
+            for worker in range(stage.workers):
+                get = lambda q=queues[i]: self._get(q)
+                if stage.workers == 1:
+                    get = _OrderedReader(get)
+                self._threads.append(threading.Thread(target=self._work, args=(stage, get, queues[i + 1], queue_names[i + 1], next_workers[i + 1]),
+                                                      name=f"{stage.name}-{worker}" if stage.workers > 1 else stage.name, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _read_source(self, out, out_name, n_next):
+        stage = self.source_stage
+        profiler = self.profiler
+        try:
+            items = iter(self.source)
+            index = 0
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                read = time.perf_counter()
+                profiler.record(stage.name, start, read)
+                if not self._put(out, (index, item)):
+                    break
+                profiler.queue_depth(out_name, out.qsize())
+                stage._count(read - start, 0.0, time.perf_counter() - read)
+                index += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(n_next):
+                self._put(out, _DONE)
+
+    def _work(self, stage, get, out, out_name, n_next):
+        profiler = self.profiler
+        try:
+            while True:
+                start = time.perf_counter()
+                item = get()
+                if item is _DONE:
+                    break
+                received = time.perf_counter()
+                result = (item[0], stage.fn(item[1]))
+                done = time.perf_counter()
+                profiler.record(stage.name, received, done)
+                if not self._put(out, result):
+                    break
+                profiler.queue_depth(out_name, out.qsize())
+                stage._count(done - received, received - start, time.perf_counter() - done)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with stage._lock:
+                stage._active -= 1
+                last = stage._active == 0
+            # The last worker to finish tells the next stage that nothing more is coming
+            if last:
+                for _ in range(n_next):
+                    self._put(out, _DONE)
+
+
+def format_stats(stats):
+    """Table of pipeline counters with the slowest stage marked as the bottleneck."""
+    bottleneck = min(stats, key=lambda stage: stage['throughput'])['stage']
+    lines = [f"{'stage':<12}{'workers':>8}{'items':>8}{'busy s':>9}{'starved s':>11}{'blocked s':>11}{'items/s':>10}"]
+    for stage in stats:
+        line = (f"{stage['stage']:<12}{stage['workers']:>8}{stage['items']:>8}{stage['busy_seconds']:>9.2f}"
+                f"{stage['starved_seconds']:>11.2f}{stage['blocked_seconds']:>11.2f}{stage['throughput']:>10.1f}")
+        if stage['stage'] == bottleneck:
+            line += "  <- bottleneck"
+        lines.append(line)
+    return '\n'.join(lines)
@@ -0,0 +1,213 @@
+"""
+Per-stage instrumentation of a processing run.
+
+A Profiler collects the wall time of every named stage call (decode, pose inference,
+angles, derivatives, rendering, encoding, ...), the depth of the pipeline queues, the
+frame count and the memory high-water mark. report() summarises them with wall time
+histograms, and save_trace() writes a Chrome trace that chrome://tracing and
+ui.perfetto.dev open. Code is instrumented against NULL_PROFILER by default, whose
+methods do nothing, so instrumentation costs next to nothing when profiling is off.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper edges in seconds of the wall time histogram buckets, 10 us to 10 s in 1-2-5 steps
+HISTOGRAM_EDGES = [scale * step for scale in (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0) for step in (1, 2, 5)] + [10.0]
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else None
+
+
+def _current_rss():
+    """Resident memory of this process in bytes, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def _peak_rss():
+    """Highest resident memory of this process so far in bytes, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _Span:
+    """Context manager timing one call of a stage."""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+
+
+class Profiler:
+    """
+    Collects stage wall times, queue depths, frames and memory of one run.
+    Stages may be recorded from any thread. With trace=True every call is also kept
+    as a trace event for save_trace().
+    """
+
+    enabled = True
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.frames = 0
+        self._durations = {}
+        self._queue_depths = {}
+        self._events = []
+        self._counters = []
+        self._thread_names = {}
+        self._peak_rss = _current_rss()
+        self._start = time.perf_counter()
+        self._end = None
+
+    def stage(self, name):
+        """Context manager recording the wall time of the enclosed block as one call of `name`."""
+        return _Span(self, name)
+
+    def record(self, name, start, end):
+        """Record one call of `name` between two time.perf_counter() readings."""
+        # dict.setdefault and list.append are atomic, so threads need no lock here
+        self._durations.setdefault(name, []).append(end - start)
+        if self.trace:
+            thread = threading.current_thread()
+            self._thread_names.setdefault(thread.ident, thread.name)
+            self._events.append((name, thread.ident, start, end - start))
+
+    def queue_depth(self, name, depth):
+        """Record the number of items waiting in queue `name`."""
+        self._queue_depths.setdefault(name, []).append(depth)
+        if self.trace:
+            self._counters.append((name, time.perf_counter(), depth))
+
+    def frame(self):
+        """Count a finished frame and sample the memory in use."""
+        self.frames += 1
+        rss = _current_rss()
+        if rss is not None and (self._peak_rss is None or rss > self._peak_rss):
+            self._peak_rss = rss
+
+    def stop(self):
+        """End the run; report() measures the wall time up to here."""
+        self._end = time.perf_counter()
+
+    def report(self):
+        """
+        Summary of the run.
+        Returns:
+        dict: Wall time, frames and fps of the run; per stage the call count, total, mean, percentiles
+        and a histogram of the call wall times in seconds (counts per bucket of 'histogram_edges',
+        the last bucket holding longer calls); per queue the mean and max depth; and the memory
+        high-water marks in bytes, of the run and of the whole process.
+        """
+        wall = (self._end or time.perf_counter()) - self._start
+        stages = {}
+        for name, durations in list(self._durations.items()):
+            durations = np.asarray(durations)
+            counts = np.histogram(durations, [0.0] + HISTOGRAM_EDGES + [np.inf])[0]
+            p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+            stages[name] = {
+                'calls': len(durations),
+                'total_seconds': float(durations.sum()),
+                'mean_seconds': float(durations.mean()),
+                'p50_seconds': float(p50),
+                'p95_seconds': float(p95),
+                'p99_seconds': float(p99),
+                'max_seconds': float(durations.max()),
+                'share_of_wall': float(durations.sum() / wall) if wall > 0 else 0.0,
+                'histogram': counts.tolist(),
+            }
+        queues = {name: {'samples': len(depths), 'mean_depth': float(np.mean(depths)), 'max_depth': int(np.max(depths))}
+                  for name, depths in list(self._queue_depths.items())}
+        return {
+            'wall_seconds': wall,
+            'frames': self.frames,
+            'fps': self.frames / wall if wall > 0 else 0.0,
+            'histogram_edges': HISTOGRAM_EDGES,
+            'stages': stages,
+            'queues': queues,
+            'memory': {'run_peak_rss_bytes': self._peak_rss, 'process_peak_rss_bytes': _peak_rss()},
+        }
+
+    def save_report(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def save_trace(self, path):
+        """Write the recorded calls and queue depths in the Chrome trace event format."""
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in self._thread_names.items()]
+        for name, tid, start, duration in self._events:
+            events.append({'name': name, 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': (start - self._start) * 1e6, 'dur': duration * 1e6})
+        for name, timestamp, depth in self._counters:
+            events.append({'name': f"queue {name}", 'ph': 'C', 'pid': pid, 'ts': (timestamp - self._start) * 1e6,
+                           'args': {'depth': depth}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+class NullProfiler:
+    """Profiler interface that records nothing."""
+
+    enabled = False
+    _span = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._span
+
+    def record(self, name, start, end):
+        pass
+
+    def queue_depth(self, name, depth):
+        pass
+
+    def frame(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def format_report(report):
+    """Table of the stages of a profiler report, slowest total first."""
+    lines = [f"{report['frames']} frames in {report['wall_seconds']:.2f} s ({report['fps']:.1f} fps)",
+             f"{'stage':<14}{'calls':>8}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}{'wall %':>8}"]
+    for name, stage in sorted(report['stages'].items(), key=lambda item: -item[1]['total_seconds']):
+        lines.append(f"{name:<14}{stage['calls']:>8}{stage['total_seconds']:>10.2f}{stage['mean_seconds'] * 1e3:>10.2f}"
+                     f"{stage['p95_seconds'] * 1e3:>10.2f}{stage['max_seconds'] * 1e3:>10.2f}{stage['share_of_wall'] * 100:>8.1f}")
+    for name, depths in report['queues'].items():
+        lines.append(f"queue {name}: mean depth {depths['mean_depth']:.1f}, max {depths['max_depth']}")
+    peak = report['memory']['run_peak_rss_bytes'] or report['memory']['process_peak_rss_bytes']
+    if peak is not None:
+        lines.append(f"peak memory {peak / 2 ** 20:.0f} MiB")
+    return '\n'.join(lines)
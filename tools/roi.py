@@ -0,0 +1,106 @@
+"""
+Region-of-interest cropping for pose inference.
+
+The athlete usually fills a small part of a high-resolution frame, yet the whole frame
+is colour-converted and handed to MediaPipe, which shrinks it to its 256 x 256 model
+input anyway. RoiTracker crops each frame to a box around the previous frame's
+landmarks and downscales the crop to about the model's input size before conversion.
+Landmarks found in the crop are mapped back to full-frame normalized coordinates, so
+everything downstream is unchanged.
+
+The box only moves when the landmarks get close to its edge, and every move restarts
+MediaPipe's own tracking, since the tracking and landmark smoothing inside the graph
+work in the coordinates of the image they were given.
+"""
+
+import numpy as np
+
+# Longest side of the image passed to MediaPipe: the 256 px landmark model input plus the margin around the pose
+ROI_INPUT_SIZE = 384
+# Space added around the landmarks on every side, as a fraction of their extent
+ROI_MARGIN = 0.25
+# The box is moved once a landmark comes closer to its edge than this fraction of the margin
+ROI_KEEP_MARGIN = 0.4
+# ... or shrunk once the landmarks cover less than this fraction of its side
+ROI_MIN_FILL = 0.35
+# Smallest box side in pixels
+ROI_MIN_SIDE = 64
+DEFAULT_ROI_CONFIG = {'input_size': ROI_INPUT_SIZE, 'margin': ROI_MARGIN}
+
+
+class RoiTracker:
+    """Crops frames around the pose found in the previous frame; the full frame is used until a pose is found."""
+
+    def __init__(self, input_size=ROI_INPUT_SIZE, margin=ROI_MARGIN):
+        self.input_size = input_size
+        self.margin = margin
+        # (x0, y0, x1, y1) in pixels of the full frame, None for the whole frame
+        self.box = None
+        self._crop_box = None
+        self._frame_shape = None
+
+    def crop(self, frame):
+        """
+        The part of `frame` to run pose inference on, downscaled to at most input_size pixels.
+        Returns:
+        np.ndarray: The cropped and resized BGR image.
+        """
+        height, width = frame.shape[:2]
+        self._frame_shape = (height, width)
+        x0, y0, x1, y1 = self.box if self.box is not None else (0, 0, width, height)
+        self._crop_box = (x0, y0, x1, y1)
+        image = frame[y0:y1, x0:x1]
+        scale = self.input_size / max(x1 - x0, y1 - y0)
+        if scale < 1:
+            import cv2
+            # Bilinear like the affine warp MediaPipe crops its model input with; INTER_AREA costs more than the model
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        return image
+
+    def to_frame(self, landmarks):
+        """Map (33, 3) landmarks normalized to the last crop back to normalized coordinates of the full frame."""
+        x0, y0, x1, y1 = self._crop_box
+        height, width = self._frame_shape
+        crop_width, crop_height = x1 - x0, y1 - y0
+        mapped = np.empty_like(landmarks)
+        mapped[:, 0] = (landmarks[:, 0] * crop_width + x0) / width
+        mapped[:, 1] = (landmarks[:, 1] * crop_height + y0) / height
+        # MediaPipe scales z like x
+        mapped[:, 2] = landmarks[:, 2] * crop_width / width
+        return mapped
+
+    def update(self, landmarks):
+        """
+        Place the box for the next frame around full-frame `landmarks` (None when no pose was found).
+        Returns:
+        bool: Whether the box moved.
+        """
+        previous = self.box
+        if landmarks is None:
+            self.box = None
+            return previous is not None
+        height, width = self._frame_shape
+        points = np.clip(landmarks[:, :2], 0, 1) * (width, height)
+        low, high = points.min(axis=0), points.max(axis=0)
+        extent = max(high - low)
+        if previous is not None:
+            x0, y0, x1, y1 = previous
+            keep = ROI_KEEP_MARGIN * self.margin * extent
+            # Sides on the border of the frame cannot move any further out
+            inside = ((x0 == 0 or low[0] - x0 >= keep) and (y0 == 0 or low[1] - y0 >= keep)
+                      and (x1 == width or x1 - high[0] >= keep) and (y1 == height or y1 - high[1] >= keep))
+            if inside and extent >= ROI_MIN_FILL * max(x1 - x0, y1 - y0):
+                return False
+        # Square box around the landmarks, shifted and clipped to stay inside the frame
+        side = max(extent * (1 + 2 * self.margin), ROI_MIN_SIDE)
+        center = (low + high) / 2
+        box_width, box_height = min(side, width), min(side, height)
+        x0 = int(np.clip(center[0] - box_width / 2, 0, width - box_width))
+        y0 = int(np.clip(center[1] - box_height / 2, 0, height - box_height))
+        box = (x0, y0, min(width, x0 + int(np.ceil(box_width))), min(height, y0 + int(np.ceil(box_height))))
+        # A box covering the whole frame is no crop at all
+        self.box = None if box == (0, 0, width, height) else box
+        return self.box != previous
+
+    def reset(self):
+        self.box = None
@@ -0,0 +1,110 @@
+"""
+Adaptive frame sampling for pose inference.
+
+Standing, take-off and the rise of a jump change slowly compared with high-speed frame
+rates, while the landing (initial contact to maximum knee flexion) needs every frame.
+AdaptiveSampler picks the next frame to run inference on from the ankle motion seen so
+far: keyframes every max_stride_seconds while the feet are still or rising, every frame
+from the moment they fall (contact is imminent) until hold_seconds after they stop, and
+every frame while no pose is found. The skipped frames are filled in by
+interpolate_skipped, so the derivatives still see a dense series.
+"""
+
+import collections
+
+import numpy as np
+
+from tools import LEFT_ANKLE, RIGHT_ANKLE
+from tools.events import CONTACT_VELOCITY_FRACTION, MIN_DESCENT_SPEED
+
+DEFAULT_SAMPLING_CONFIG = {
+    # Longest time between two inferred frames
+    'max_stride_seconds': 1 / 30,
+    # Frames are inferred at full rate for this long after the feet come to rest from a fall
+    'hold_seconds': 0.4,
+    # Shortest time the ankle velocity is measured over, so landmark jitter does not look like a fall
+    'velocity_seconds': 0.05,
+}
+
+
+class AdaptiveSampler:
+    """
+    Decides after every inferred frame how many frames to advance to the next one.
+    The settings are those of DEFAULT_SAMPLING_CONFIG: AdaptiveSampler(fps, **DEFAULT_SAMPLING_CONFIG).
+    """
+
+    def __init__(self, fps, max_stride_seconds, hold_seconds, velocity_seconds):
+        self.max_stride = max(1, int(round(fps * max_stride_seconds)))
+        self.hold_seconds = hold_seconds
+        self.velocity_seconds = velocity_seconds
+        # (timestamp, lowest ankle y) of recent inferred frames, oldest first
+        self._history = collections.deque()
+        self._peak_descent = 0.0
+        self._full_rate_until = -np.inf
+
+    def next_stride(self, landmarks, timestamp):
+        """
+        Frames to advance after inferring the frame at `timestamp` seconds.
+        Parameters:
+        landmarks (np.ndarray): (33, 3) landmarks of the frame in normalized image coordinates, None without a detection.
+        Returns:
+        int: 1 to infer the next frame too, up to max_stride.
+        """
+        if landmarks is None:
+            self._history.clear()
+            return 1
+        ankle = max(landmarks[LEFT_ANKLE, 1], landmarks[RIGHT_ANKLE, 1])
+        history = self._history
+        history.append((timestamp, ankle))
+        # Keep the newest sample that is at least velocity_seconds old as the velocity baseline
+        while len(history) > 2 and timestamp - history[1][0] >= self.velocity_seconds:
+            history.popleft()
+        start_time, start_ankle = history[0]
+        if timestamp - start_time < self.velocity_seconds:
+            return 1 if timestamp < self._full_rate_until else self.max_stride
+        descent = (ankle - start_ankle) / (timestamp - start_time)
+
+        if descent > MIN_DESCENT_SPEED:
+            # Falling: contact is coming, follow it frame by frame
+            self._peak_descent = max(self._peak_descent, descent)
+            return 1
+        if self._peak_descent > 0 and descent < CONTACT_VELOCITY_FRACTION * self._peak_descent:
+            # The fall has stopped: ground contact, keep full rate through the landing
+            self._peak_descent = 0.0
+            self._full_rate_until = timestamp + self.hold_seconds
+        if self._peak_descent > 0 or timestamp < self._full_rate_until:
+            return 1
+        return self.max_stride
+
+
+def interpolate_skipped(landmarks, visibility, timestamps, inferred, world_landmarks=None):
+    """
+    Fill the frames inference was not run on, in place, by linear interpolation in time
+    between the inferred frames around them (by frame index where the two share a timestamp).
+    Frames next to an inferred frame without a detection, or after the last inferred frame,
+    stay without a detection.
+    Parameters:
+    landmarks (np.ndarray): (n_frames, 33, 3) landmarks, NaN where not inferred or not detected.
+    visibility (np.ndarray): (n_frames, 33) visibility.
+    timestamps (np.ndarray): Frame times in seconds.
+    inferred (np.ndarray): Boolean mask of the frames inference was run on.
+    world_landmarks (np.ndarray): (n_frames, 33, 3) world landmarks, interpolated with the same weights.
+    """
+    inferred = np.asarray(inferred, dtype=bool)
+    keys = np.flatnonzero(inferred)
+    skipped = np.flatnonzero(~inferred)
+    position = np.searchsorted(keys, skipped)
+    # Only frames with an inferred frame on both sides
+    between = (position > 0) & (position < len(keys))
+    skipped, position = skipped[between], position[between]
+    before, after = keys[position - 1], keys[position]
+    detected = ~np.isnan(landmarks[before, 0, 0]) & ~np.isnan(landmarks[after, 0, 0])
+    skipped, before, after = skipped[detected], before[detected], after[detected]
+    span = timestamps[after] - timestamps[before]
+    timed = span > 0
+    weight = (skipped - before) / (after - before)
+    weight[timed] = (timestamps[skipped[timed]] - timestamps[before[timed]]) / span[timed]
+    landmarks[skipped] = landmarks[before] + weight[:, None, None] * (landmarks[after] - landmarks[before])
+    visibility[skipped] = np.minimum(visibility[before], visibility[after])
+    if world_landmarks is not None:
+        world_landmarks[skipped] = world_landmarks[before] + weight[:, None, None] * (world_landmarks[after] - world_landmarks[before])
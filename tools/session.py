@@ -0,0 +1,148 @@
+"""
+Columnar session export.
+
+One session per clip holds everything computed from its landmarks: frame index and
+timestamp, landmarks, the joint angle series, their derivatives and acceleration risk,
+plus the landing events and metadata. A session is a directory of .npy columns and a
+meta.json, written atomically like the landmark cache, and its columns are memory-mapped
+on load, so thousands of sessions can be opened without decoding video or parsing JSON.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from biomechanical import MISSING_RISK_CATEGORY, MISSING_RISK_CODE, RISK_CATEGORIES, score_acceleration_series
+from tools import ANGLE_NAMES, calculate_accelerations, calculate_jerks, calculate_pose_angles_batch, calculate_velocities
+from tools.events import detect_landing_events
+from tools.filters import create_landmark_filter, filter_landmarks
+
+# Bump when the columns or their layout change
+SESSION_VERSION = 1
+SESSION_SUFFIX = '.session'
+
+
+def compute_session(track, tables=None, landmark_filter=None):
+    """
+    Columns and metadata of a session from a LandmarkTrack.
+    The acceleration risk is scored against `tables` (config.ScoringTables), or the current scoring config.
+    With `landmark_filter` (see tools.filters.FILTER_NAMES) the landmarks column holds the filtered
+    landmarks the angles are computed from, as in the analysis; meta.json names the filter.
+    Returns:
+    tuple: (columns, meta); columns maps name to an array with one row per frame.
+    """
+    landmarks = np.asarray(track.landmarks)
+    timestamps = np.asarray(track.timestamps, dtype=np.float64)
+    smooth = create_landmark_filter(landmark_filter)
+    if smooth is not None:
+        landmarks = filter_landmarks(landmarks, timestamps, smooth)
+    angles = calculate_pose_angles_batch(landmarks)
+    angle_series = dict(zip(ANGLE_NAMES, angles.T))
+    missing = np.full(len(track), np.nan)
+
+    def stack(series):
+        return np.column_stack([series.get(joint, missing) for joint in ANGLE_NAMES]).astype(np.float32)
+
+    accelerations = calculate_accelerations(angle_series, track.fps, timestamps)
+    risk = score_acceleration_series({joint: accelerations.get(joint, missing) for joint in ANGLE_NAMES}, tables)
+    columns = {
+        'frame': np.arange(len(track), dtype=np.int32),
+        'timestamp': timestamps,
+        'detected': track.detected,
+        'landmarks': np.asarray(landmarks, dtype=np.float32),
+        'visibility': np.asarray(track.visibility, dtype=np.float32),
+        'angles': angles.astype(np.float32),
+        'velocities': stack(calculate_velocities(angle_series, track.fps, timestamps)),
+        'accelerations': stack(accelerations),
+        'jerks': stack(calculate_jerks(accelerations, track.fps, timestamps)),
+        'acceleration_risk_score': np.column_stack([risk[joint]['risk_score'] for joint in ANGLE_NAMES]).astype(np.float32),
+        'acceleration_risk_code': np.column_stack([risk[joint]['risk_code'] for joint in ANGLE_NAMES]),
+    }
+    meta = {
+        'video_path': track.meta.get('video_path'),
+        'fps': track.fps,
+        'width': track.width,
+        'height': track.height,
+        'joints': ANGLE_NAMES,
+        'landmark_filter': landmark_filter or 'none',
+        # acceleration_risk_code indexes risk_categories, except for missing_risk_code on frames without an acceleration
+        'risk_categories': RISK_CATEGORIES,
+        'missing_risk_code': MISSING_RISK_CODE,
+        'missing_risk_category': MISSING_RISK_CATEGORY,
+        'events': detect_landing_events(landmarks, angles, track.fps),
+    }
+    return columns, meta
+
+
+def save_session(path, columns, meta):
+    """Write a session directory. It appears atomically and replaces an existing session at `path`."""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(values))
+        meta = dict(meta, version=SESSION_VERSION, frame_count=len(columns['frame']), columns=list(columns))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp_dir, path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return path
+
+
+def export_session(track, path, tables=None, landmark_filter=None):
+    """Compute and write the session of a LandmarkTrack."""
+    columns, meta = compute_session(track, tables, landmark_filter)
+    return save_session(path, columns, meta)
+
+
+def session_path(sessions_dir, video_path):
+    """Session directory of a video, unique per absolute path so same-named clips do not collide."""
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    digest = hashlib.sha1(os.path.abspath(video_path).encode()).hexdigest()[:8]
+    return os.path.join(sessions_dir, f"{name}-{digest}{SESSION_SUFFIX}")
+
+
+class Session:
+    """A loaded session; columns are memory-mapped arrays available as attributes or items."""
+
+    def __init__(self, path, meta, columns):
+        self.path = path
+        self.meta = meta
+        self.columns = columns
+
+    def __len__(self):
+        return self.meta['frame_count']
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get('columns', {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+
+def load_session(path):
+    """Open a session with memory-mapped columns; column data is only read from disk when it is used."""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('version') != SESSION_VERSION:
+        raise ValueError(f"Session {path} has version {meta.get('version')}, expected {SESSION_VERSION}")
+    columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in meta['columns']}
+    return Session(path, meta, columns)
+
+
+def load_sessions(sessions_dir):
+    """Yield every session under a directory."""
+    for name in sorted(os.listdir(sessions_dir)):
+        if name.endswith(SESSION_SUFFIX):
+            yield load_session(os.path.join(sessions_dir, name))
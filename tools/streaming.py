@@ -0,0 +1,189 @@
+"""
+Streaming Savitzky-Golay derivatives.
+
+Keeps a ring buffer of the last `window_length` samples per joint and applies
+precomputed Savitzky-Golay coefficients, so the value for the newest frame costs
+the same whether the session is one second or one hour long. Live sources with
+dropped frames pass capture timestamps instead, and the polynomial is fitted to
+the real sample times of the window. A gap longer than tools.gap_threshold() of the
+recent sample intervals restarts the windows, as calculate_derivatives splits the
+series there.
+"""
+
+import collections
+import math
+
+import numpy as np
+
+from tools import gap_threshold
+
+
+class StreamingSavgol:
+    """Savitzky-Golay filter evaluated one sample at a time over several channels."""
+
+    def __init__(self, n_channels, window_length=31, polyorder=2, deriv=0, delta=1.0, pos=None):
+        """
+        Parameters:
+        n_channels (int): Number of parallel series (e.g. one per joint).
+        window_length (int): Odd number of samples in the filter window.
+        polyorder (int): Order of the fitted polynomial.
+        deriv (int): Order of the derivative to compute.
+        delta (float): Sample spacing, 1 / fps for angle series.
+        pos (int): Position inside the window the value is evaluated at. Defaults to the
+            newest sample (window_length - 1), which matches the last value of `savgol_filter`.
+            Use window_length // 2 to match its interior (centered) output instead.
+        """
+        if window_length % 2 == 0:
+            raise ValueError("window_length must be an odd integer")
+        if pos is None:
+            pos = window_length - 1
+        self.window_length = window_length
+        self.pos = pos
+        from scipy.signal import savgol_coeffs  # Slow to import, and only needed without timestamps
+        coeffs = savgol_coeffs(window_length, polyorder, deriv=deriv, delta=delta, pos=pos, use='dot')
+        # Doubled so the weights for any ring rotation are a contiguous slice
+        self._coeffs = np.concatenate([coeffs, coeffs])
+        self._buffer = np.zeros((window_length, n_channels))
+        self._head = 0
+        self.count = 0
+
+    def push(self, values):
+        """Add one sample per channel; returns the filtered values, or None until the window is full."""
+        window_length = self.window_length
+        self._buffer[self._head] = values
+        self._head = (self._head + 1) % window_length
+        self.count += 1
+        if self.count < window_length:
+            return None
+        # The oldest sample now sits at self._head
+        start = window_length - self._head
+        return self._coeffs[start:start + window_length] @ self._buffer
+
+    def reset(self):
+        """Forget all buffered samples."""
+        self._buffer[:] = 0
+        self._head = 0
+        self.count = 0
+
+
+class StreamingPolyfit:
+    """
+    Least-squares polynomial derivative at the newest sample, over several channels with irregular sample times.
+    With evenly spaced timestamps it gives the same values as StreamingSavgol at the newest position.
+    """
+
+    def __init__(self, n_channels, window_length=31, polyorder=2, deriv=0):
+        if window_length <= polyorder:
+            raise ValueError("window_length must be greater than polyorder")
+        self.window_length = window_length
+        self.polyorder = polyorder
+        self.deriv = deriv
+        self._buffer = np.zeros((window_length, n_channels))
+        self._times = np.zeros(window_length)
+        self._head = 0
+        self.count = 0
+
+    def push(self, values, timestamp):
+        """Add one sample per channel taken at `timestamp` seconds; returns the derivative, or None until the window is full."""
+        if self.count and not timestamp > self._times[self._head - 1]:
+            # A window of repeated times has no span to scale the derivative by
+            raise ValueError("timestamps must strictly increase")
+        self._buffer[self._head] = values
+        self._times[self._head] = timestamp
+        self._head = (self._head + 1) % self.window_length
+        self.count += 1
+        if self.count < self.window_length:
+            return None
+        # Times relative to the newest sample and scaled to the window span, for a well-conditioned fit.
+        # Least squares does not depend on the row order, so the ring buffer is used as is.
+        newest = self._times[self._head - 1]
+        span = newest - self._times[self._head]
+        x = (self._times - newest) / span
+        vandermonde = x[:, None] ** np.arange(self.polyorder + 1)
+        coeffs = np.linalg.lstsq(vandermonde, self._buffer, rcond=None)[0]
+        return coeffs[self.deriv] * math.factorial(self.deriv) / span ** self.deriv
+
+    def reset(self):
+        """Forget all buffered samples."""
+        self._buffer[:] = 0
+        self._times[:] = 0
+        self._head = 0
+        self.count = 0
+
+
+class StreamingDerivatives:
+    """Angular velocity, acceleration and jerk of a set of joint angle streams."""
+
+    def __init__(self, joints, fps=None, window_length=31, poly_order=2, max_gap=None):
+        """
+        Parameters:
+        joints (list): Joint names, in the order of the derivative values.
+        fps (float): Frame rate of evenly spaced frames; None when every push() passes its capture timestamp.
+        max_gap (float): Seconds between two timestamps that restart the derivatives. Defaults to
+            tools.gap_threshold() of the last window_length intervals, which follows the analysis rate.
+        """
+        self.joints = list(joints)
+        self.timestamped = fps is None
+        self.max_gap = max_gap
+        self._last_timestamp = None
+        # Recent intervals between pushes, for the default max_gap
+        self._intervals = collections.deque(maxlen=window_length)
+        n_joints = len(self.joints)
+        if self.timestamped:
+            self._velocity = StreamingPolyfit(n_joints, window_length, poly_order, deriv=1)
+            self._acceleration = StreamingPolyfit(n_joints, window_length, poly_order, deriv=2)
+            self._jerk = StreamingPolyfit(n_joints, window_length, poly_order, deriv=1)
+        else:
+            dt = 1 / fps
+            self._velocity = StreamingSavgol(n_joints, window_length, poly_order, deriv=1, delta=dt)
+            self._acceleration = StreamingSavgol(n_joints, window_length, poly_order, deriv=2, delta=dt)
+            # Jerk is the first derivative of the streamed accelerations, as in calculate_jerks
+            self._jerk = StreamingSavgol(n_joints, window_length, poly_order, deriv=1, delta=dt)
+
+    def push(self, angles, timestamp=None):
+        """
+        Add the angles of one frame.
+        Parameters:
+        angles (dict): Joint name to angle in degrees, as returned by calculate_pose_angles.
+        timestamp (float): Capture time of the frame in seconds, required when created without fps.
+        Returns:
+        tuple: (velocities, accelerations, jerks) dicts of joint name to the value at the newest
+        frame. A dict is empty until enough frames have been seen, also again after a gap of
+        more than max_gap seconds between two timestamps.
+        """
+        values = np.fromiter((angles[joint] for joint in self.joints), dtype=float, count=len(self.joints))
+        if self.timestamped:
+            if timestamp is None:
+                raise ValueError("timestamp is required when StreamingDerivatives is created without fps")
+            if self._last_timestamp is not None:
+                interval = timestamp - self._last_timestamp
+                max_gap = self.max_gap if self.max_gap is not None else gap_threshold(self._intervals)
+                if interval > max_gap:
+                    # No fit spans a detection dropout
+                    self._reset_fits()
+                # Dropouts as well, so the first intervals of a slow analysis rate are learnt
+                self._intervals.append(interval)
+            self._last_timestamp = timestamp
+            velocity = self._velocity.push(values, timestamp)
+            acceleration = self._acceleration.push(values, timestamp)
+            jerk = self._jerk.push(acceleration, timestamp) if acceleration is not None else None
+        else:
+            velocity = self._velocity.push(values)
+            acceleration = self._acceleration.push(values)
+            jerk = self._jerk.push(acceleration) if acceleration is not None else None
+        return self._as_dict(velocity), self._as_dict(acceleration), self._as_dict(jerk)
+
+    def reset(self):
+        """Forget all buffered frames."""
+        self._reset_fits()
+        self._intervals.clear()
+
+    def _reset_fits(self):
+        for fitter in (self._velocity, self._acceleration, self._jerk):
+            fitter.reset()
+        self._last_timestamp = None
+
+    def _as_dict(self, values):
+        if values is None:
+            return {}
+        return dict(zip(self.joints, values.tolist()))